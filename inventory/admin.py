@@ -1,5 +1,12 @@
 from django.contrib import admin
-from .models import Reagent, StockItem, InventoryTransaction, CostCenter, CostAllocation
+from .models import Reagent, ReagentLot, StockItem, InventoryTransaction, CostCenter, CostAllocation, InventoryValuation, \
+    InventoryAlert, InventoryAlertDigest, MonthlyTransactionRollup, MonthlyItemRollup, MonthlyCostCenterRollup, ScanRecord
+
+
+class ReagentLotInline(admin.TabularInline):
+    model = ReagentLot
+    extra = 0
+    readonly_fields = ['quantity', 'created_at']
 
 
 @admin.register(Reagent)
@@ -25,6 +32,7 @@ class ReagentAdmin(admin.ModelAdmin):
             'fields': ('notes',)
         }),
     )
+    inlines = [ReagentLotInline]
 
 
 @admin.register(StockItem)
@@ -55,3 +63,49 @@ class CostAllocationAdmin(admin.ModelAdmin):
     list_display = ['transaction', 'cost_center', 'allocated_cost', 'percentage', 'created_at']
     list_filter = ['cost_center', 'created_at']
     readonly_fields = ['created_at']
+
+
+@admin.register(InventoryValuation)
+class InventoryValuationAdmin(admin.ModelAdmin):
+    list_display = ['date', 'reagent_value', 'stock_value', 'total_value', 'transaction_count', 'reconciled_at']
+    readonly_fields = ['updated_at']
+
+
+@admin.register(InventoryAlert)
+class InventoryAlertAdmin(admin.ModelAdmin):
+    list_display = ['alert_type', 'item', 'quantity', 'minimum_quantity', 'expiry_date', 'created_at', 'resolved_at']
+    list_filter = ['alert_type', 'resolved_at']
+    search_fields = ['reagent__name', 'stock_item__name']
+    readonly_fields = ['created_at', 'updated_at', 'resolved_at']
+
+
+@admin.register(InventoryAlertDigest)
+class InventoryAlertDigestAdmin(admin.ModelAdmin):
+    list_display = ['user', 'date', 'alert_count', 'new_count', 'sent_at']
+    list_filter = ['date']
+
+
+@admin.register(MonthlyTransactionRollup)
+class MonthlyTransactionRollupAdmin(admin.ModelAdmin):
+    list_display = ['month', 'transaction_type', 'transaction_count', 'quantity', 'total_cost']
+    list_filter = ['transaction_type']
+
+
+@admin.register(MonthlyItemRollup)
+class MonthlyItemRollupAdmin(admin.ModelAdmin):
+    list_display = ['month', 'transaction_type', 'reagent', 'stock_item', 'transaction_count', 'quantity', 'total_cost']
+    list_filter = ['transaction_type']
+
+
+@admin.register(MonthlyCostCenterRollup)
+class MonthlyCostCenterRollupAdmin(admin.ModelAdmin):
+    list_display = ['month', 'cost_center', 'allocation_count', 'allocated_cost']
+    list_filter = ['cost_center']
+
+
+@admin.register(ScanRecord)
+class ScanRecordAdmin(admin.ModelAdmin):
+    list_display = ['key', 'code', 'transaction_type', 'quantity', 'performed_by', 'created_at']
+    list_filter = ['transaction_type', 'created_at']
+    search_fields = ['key', 'code']
+    readonly_fields = ['created_at']
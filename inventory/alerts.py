@@ -0,0 +1,231 @@
+"""
+Inventory alerts: low stock, expiring and expired reagents.
+
+Conditions are found with indexed SQL filters (see the headroom and expiry
+indexes on Reagent and StockItem) and stored as InventoryAlert rows, and
+only the alerts that changed are written. Items are refreshed when their
+stock moves or they are edited (after the transaction commits, see
+schedule_alert_refresh); a scheduled full refresh catches the passage of
+time. Dashboards read the open alert rows instead of scanning the
+inventory tables, and users who manage inventory receive one digest per
+day.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Max, Q
+from django.utils import timezone
+
+
+BATCH_SIZE = 500
+
+
+def _warning_days():
+    return getattr(settings, 'INVENTORY_EXPIRY_WARNING_DAYS', 30)
+
+
+def low_stock(queryset):
+    """Rows at or below their minimum quantity (uses the headroom index)."""
+    return queryset.alias(headroom=F('quantity') - F('minimum_quantity')).filter(headroom__lte=0)
+
+
+def expiring(queryset, today=None):
+    """Reagents in stock that expire within the warning period (or have expired)."""
+    today = today or timezone.localdate()
+    return queryset.filter(expiry_date__lte=today + timedelta(days=_warning_days()), quantity__gt=0)
+
+
+def _scoped(queryset, kind, items):
+    """Limit an item queryset to the ids of one kind in items (None means all items)."""
+    if items is None:
+        return queryset
+    return queryset.filter(id__in=list(items.get(kind, ())))
+
+
+def detect_alert_conditions(today=None, items=None):
+    """
+    Find every current alert condition with three indexed queries.
+
+    Args:
+        today: Optional date
+        items: Optional dictionary of 'reagent' / 'stock_item' to item ids
+               to limit the search to
+
+    Returns:
+        Dictionary of (alert_type, 'reagent' | 'stock_item', item id) to a
+        dictionary of the snapshot fields to store on the alert
+    """
+    from .models import Reagent, StockItem
+
+    today = today or timezone.localdate()
+    conditions = {}
+    for kind, model in (('reagent', Reagent), ('stock_item', StockItem)):
+        for pk, quantity, minimum in low_stock(_scoped(model.objects.order_by(), kind, items)).values_list(
+            'id', 'quantity', 'minimum_quantity'
+        ):
+            conditions[('low_stock', kind, pk)] = {
+                'quantity': quantity, 'minimum_quantity': minimum, 'expiry_date': None,
+            }
+    reagents = _scoped(Reagent.objects.order_by(), 'reagent', items)
+    for pk, quantity, minimum, expiry_date in expiring(reagents, today).values_list(
+        'id', 'quantity', 'minimum_quantity', 'expiry_date'
+    ):
+        alert_type = 'expired' if expiry_date < today else 'expiring'
+        conditions[(alert_type, 'reagent', pk)] = {
+            'quantity': quantity, 'minimum_quantity': minimum, 'expiry_date': expiry_date,
+        }
+    return conditions
+
+
+def _key(alert):
+    if alert.reagent_id:
+        return (alert.alert_type, 'reagent', alert.reagent_id)
+    return (alert.alert_type, 'stock_item', alert.stock_item_id)
+
+
+def refresh_inventory_alerts(today=None, items=None):
+    """
+    Bring the open alerts in line with current inventory.
+
+    New conditions open alerts, changed ones update their snapshot fields
+    and cleared ones are resolved; unchanged alerts are not written.
+
+    Args:
+        today: Optional date
+        items: Optional dictionary of 'reagent' / 'stock_item' to item ids
+               to refresh (all items if None)
+
+    Returns:
+        Dictionary with 'created', 'updated' and 'resolved' counts
+    """
+    from .models import InventoryAlert
+
+    now = timezone.now()
+    conditions = detect_alert_conditions(today, items)
+    fields = ['quantity', 'minimum_quantity', 'expiry_date']
+
+    alerts = InventoryAlert.objects.filter(resolved_at__isnull=True)
+    if items is not None:
+        alerts = alerts.filter(
+            Q(reagent_id__in=list(items.get('reagent', ()))) |
+            Q(stock_item_id__in=list(items.get('stock_item', ())))
+        )
+    with transaction.atomic():
+        open_alerts = {_key(alert): alert for alert in alerts.select_for_update()}
+        to_create = []
+        to_update = []
+        for key, values in conditions.items():
+            alert = open_alerts.get(key)
+            if alert is None:
+                alert_type, kind, pk = key
+                to_create.append(InventoryAlert(alert_type=alert_type, **{f'{kind}_id': pk}, **values))
+            elif any(getattr(alert, name) != values[name] for name in fields):
+                for name in fields:
+                    setattr(alert, name, values[name])
+                alert.updated_at = now
+                to_update.append(alert)
+        resolved = [alert.id for key, alert in open_alerts.items() if key not in conditions]
+
+        # A concurrent refresh of the same item may have opened the alert
+        # first; the open-alert unique constraints keep one of them.
+        InventoryAlert.objects.bulk_create(to_create, batch_size=BATCH_SIZE, ignore_conflicts=True)
+        InventoryAlert.objects.bulk_update(to_update, fields + ['updated_at'], batch_size=BATCH_SIZE)
+        for start in range(0, len(resolved), BATCH_SIZE):
+            InventoryAlert.objects.filter(id__in=resolved[start:start + BATCH_SIZE]).update(
+                resolved_at=now, updated_at=now
+            )
+    return {'created': len(to_create), 'updated': len(to_update), 'resolved': len(resolved)}
+
+
+def schedule_alert_refresh(reagent_ids=(), stock_item_ids=()):
+    """Refresh the alerts of some items once the current transaction commits."""
+    items = {
+        'reagent': {pk for pk in reagent_ids if pk},
+        'stock_item': {pk for pk in stock_item_ids if pk},
+    }
+    if items['reagent'] or items['stock_item']:
+        transaction.on_commit(lambda: refresh_inventory_alerts(items=items))
+
+
+def get_open_alerts(alert_type=None):
+    """Open alerts with their reagent or stock item selected."""
+    from .models import InventoryAlert
+
+    alerts = InventoryAlert.objects.filter(resolved_at__isnull=True).select_related('reagent', 'stock_item')
+    if alert_type:
+        alerts = alerts.filter(alert_type=alert_type)
+    return alerts
+
+
+def get_alert_counts():
+    """Number of open alerts per type in one grouped query."""
+    from .models import InventoryAlert
+
+    counts = dict(
+        InventoryAlert.objects.filter(resolved_at__isnull=True).order_by()
+        .values_list('alert_type').annotate(count=Count('id'))
+    )
+    return {alert_type: counts.get(alert_type, 0) for alert_type, label in InventoryAlert.ALERT_TYPE_CHOICES}
+
+
+def _digest_body(user, alerts, since):
+    lines = [f'Hello {user.get_full_name() or user.username},', '',
+             f'Open inventory alerts: {len(alerts)}.', '']
+    for alert in alerts:
+        item = alert.item
+        marker = '[new] ' if since is None or alert.created_at > since else ''
+        if alert.alert_type == 'low_stock':
+            detail = f'{alert.quantity} {item.unit} (minimum {alert.minimum_quantity})'
+        else:
+            detail = f'expires {alert.expiry_date:%Y-%m-%d}, {alert.quantity} {item.unit} in stock'
+        lines.append(f'{marker}{alert.get_alert_type_display()}: {item.name} - {detail}')
+    return '\n'.join(lines)
+
+
+def send_alert_digests(today=None):
+    """
+    Email each inventory manager one digest of the open alerts per day.
+
+    Recipients are active users with an email address who can manage
+    inventory. A user who already has today's digest is skipped, so the
+    job can be re-run safely; days without open alerts send nothing.
+
+    Returns:
+        Number of digests sent
+    """
+    from django.contrib.auth import get_user_model
+    from django.core.mail import EmailMessage, get_connection
+    from .models import InventoryAlertDigest
+
+    today = today or timezone.localdate()
+    alerts = list(get_open_alerts().order_by('alert_type', 'expiry_date', 'id'))
+    if not alerts:
+        return 0
+
+    users = list(
+        get_user_model().objects.filter(
+            Q(is_superuser=True) | Q(role__can_manage_inventory=True), is_active=True
+        ).exclude(email='').exclude(inventory_digests__date=today)
+    )
+    last_sent = dict(
+        InventoryAlertDigest.objects.filter(user__in=users).order_by()
+        .values_list('user_id').annotate(last=Max('sent_at'))
+    )
+
+    emails = []
+    digests = []
+    for user in users:
+        since = last_sent.get(user.id)
+        new_count = sum(1 for alert in alerts if since is None or alert.created_at > since)
+        emails.append(EmailMessage(
+            subject=f'Inventory alerts for {today:%Y-%m-%d}: {len(alerts)} open, {new_count} new',
+            body=_digest_body(user, alerts, since),
+            to=[user.email],
+        ))
+        digests.append(InventoryAlertDigest(user=user, date=today, alert_count=len(alerts), new_count=new_count))
+
+    with transaction.atomic():
+        InventoryAlertDigest.objects.bulk_create(digests, batch_size=BATCH_SIZE, ignore_conflicts=True)
+        get_connection().send_messages(emails)
+    return len(emails)
@@ -0,0 +1,225 @@
+"""
+Reagent consumption forecasts and reorder points for the whole catalog.
+
+Daily outbound quantities for every reagent come from one grouped query
+and are laid out as a reagents x days NumPy matrix. Additive exponential
+smoothing with a weekly season runs over all rows at once; the fitted
+level and season give the forecast demand, and the one-step errors give
+the safety stock. Results are cached under a version that is bumped
+whenever an inventory transaction is committed, so repeat reads cost one
+cache lookup until stock moves.
+"""
+import uuid
+from collections import namedtuple
+from datetime import datetime, time, timedelta
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+
+TRANSACTION_VERSION_KEY = 'inventory:transaction_version'
+
+# Weekly seasonality (laboratory workload follows the working week).
+SEASON_LENGTH = 7
+
+# Smoothing weights for the level and the seasonal components.
+ALPHA = 0.2
+GAMMA = 0.1
+
+# Days ahead used to find when current stock runs out.
+HORIZON_DAYS = 365
+
+CACHE_TIMEOUT = 24 * 60 * 60
+
+ReagentForecast = namedtuple('ReagentForecast', [
+    'reagent_id', 'name', 'unit', 'quantity', 'daily_rate', 'days_remaining',
+    'safety_stock', 'reorder_point', 'suggested_quantity', 'needs_reorder',
+])
+
+
+def _history_days():
+    return getattr(settings, 'INVENTORY_FORECAST_HISTORY_DAYS', 182)
+
+
+def _lead_days():
+    return getattr(settings, 'INVENTORY_REORDER_LEAD_DAYS', 14)
+
+
+def _cover_days():
+    return getattr(settings, 'INVENTORY_REORDER_COVER_DAYS', 30)
+
+
+def _service_z():
+    return getattr(settings, 'INVENTORY_SERVICE_LEVEL_Z', 1.65)
+
+
+def _transaction_version():
+    version = cache.get(TRANSACTION_VERSION_KEY)
+    if version is None:
+        cache.add(TRANSACTION_VERSION_KEY, uuid.uuid4().hex, timeout=None)
+        version = cache.get(TRANSACTION_VERSION_KEY)
+    return version
+
+
+def invalidate_forecasts():
+    """Discard cached forecasts once the current transaction commits."""
+    def _bump():
+        cache.set(TRANSACTION_VERSION_KEY, uuid.uuid4().hex, timeout=None)
+
+    transaction.on_commit(_bump)
+
+
+def load_daily_usage(reagent_ids, start, days):
+    """
+    Daily outbound quantities as a matrix, from one grouped query.
+
+    Args:
+        reagent_ids: Sequence of Reagent primary keys (matrix row order)
+        start: First day (date) of the history
+        days: Number of days (matrix columns)
+
+    Returns:
+        Float array of shape (len(reagent_ids), days)
+    """
+    from .models import InventoryTransaction
+
+    rows = {pk: i for i, pk in enumerate(reagent_ids)}
+    usage = np.zeros((len(reagent_ids), days), dtype=np.float64)
+    daily = InventoryTransaction.objects.filter(
+        transaction_type='out',
+        reagent__isnull=False,
+        transaction_date__gte=timezone.make_aware(datetime.combine(start, time.min)),
+        transaction_date__lt=timezone.make_aware(datetime.combine(start + timedelta(days=days), time.min))
+    ).annotate(day=TruncDate('transaction_date')).order_by().values_list('reagent_id', 'day').annotate(
+        total=Sum('quantity')
+    )
+    row_index, column_index, totals = [], [], []
+    for reagent_id, day, total in daily:
+        if reagent_id in rows:
+            row_index.append(rows[reagent_id])
+            column_index.append((day - start).days)
+            totals.append(float(total))
+    np.add.at(usage, (row_index, column_index), totals)
+    return usage
+
+
+def smooth(usage, season_length=SEASON_LENGTH, alpha=ALPHA, gamma=GAMMA):
+    """
+    Additive level + seasonal exponential smoothing over every row at once.
+
+    The first season initialises the level; the initial seasonal offsets
+    are each weekday's mean deviation over the whole history.
+
+    Args:
+        usage: Array of shape (series, days); days should span at least
+               two seasons
+
+    Returns:
+        Tuple of (level, season, residual sd) arrays; season has shape
+        (series, season_length) and is indexed by day number modulo
+        season_length
+    """
+    series, days = usage.shape
+    level = usage[:, :season_length].mean(axis=1)
+    full = days - days % season_length
+    if full:
+        weekly = usage[:, :full].reshape(series, -1, season_length).mean(axis=1)
+        season = weekly - weekly.mean(axis=1, keepdims=True)
+    else:
+        season = np.zeros((series, season_length))
+    squared_error = np.zeros(series)
+
+    for t in range(days):
+        s = t % season_length
+        observed = usage[:, t]
+        error = observed - (level + season[:, s])
+        squared_error += error * error
+        new_level = alpha * (observed - season[:, s]) + (1 - alpha) * level
+        season[:, s] = gamma * (observed - new_level) + (1 - gamma) * season[:, s]
+        level = new_level
+
+    return level, season, np.sqrt(squared_error / max(days, 1))
+
+
+def forecast_demand(level, season, start_day, horizon, season_length=SEASON_LENGTH):
+    """Forecast daily demand (never negative) for days start_day .. start_day + horizon - 1."""
+    columns = (start_day + np.arange(horizon)) % season_length
+    return np.maximum(level[:, None] + season[:, columns], 0.0)
+
+
+def compute_forecasts(today=None):
+    """
+    Forecast consumption and reorder quantities for all reagents.
+
+    Reorder point is the forecast demand over the lead time plus safety
+    stock (service-level z x residual sd x sqrt(lead time)). Reagents at or
+    below their reorder point get a suggested order covering the lead time
+    and the review period, less the stock on hand.
+
+    Returns:
+        List of ReagentForecast tuples ordered by days remaining (reagents
+        that never run out last)
+    """
+    from .models import Reagent
+
+    today = today or timezone.localdate()
+    days = _history_days()
+    lead, cover, z = _lead_days(), _cover_days(), _service_z()
+    start = today - timedelta(days=days)
+
+    reagents = list(Reagent.objects.order_by('id').values_list('id', 'name', 'unit', 'quantity'))
+    if not reagents:
+        return []
+    quantity = np.array([float(r[3]) for r in reagents])
+    usage = load_daily_usage([r[0] for r in reagents], start, days)
+    level, season, sd = smooth(usage)
+
+    demand = forecast_demand(level, season, days, HORIZON_DAYS)
+    cumulative = np.cumsum(demand, axis=1)
+    runs_out = cumulative >= quantity[:, None]
+    has_history = usage.any(axis=1)
+    runs_out &= has_history[:, None]
+    days_remaining = np.where(runs_out.any(axis=1), runs_out.argmax(axis=1), -1)
+
+    safety = z * sd * np.sqrt(lead)
+    reorder_point = cumulative[:, lead - 1] + safety if lead else safety
+    target = cumulative[:, max(lead + cover, 1) - 1] + safety
+    needs_reorder = has_history & (quantity <= reorder_point)
+    suggested = np.where(needs_reorder, np.ceil(np.maximum(target - quantity, 0.0)), 0.0)
+    daily_rate = demand[:, :SEASON_LENGTH].mean(axis=1)
+
+    forecasts = [
+        ReagentForecast(
+            pk, name, unit, reagents[i][3],
+            round(float(daily_rate[i]), 2),
+            int(days_remaining[i]) if days_remaining[i] >= 0 else None,
+            round(float(safety[i]), 2),
+            round(float(reorder_point[i]), 2),
+            float(suggested[i]),
+            bool(needs_reorder[i]),
+        )
+        for i, (pk, name, unit, _) in enumerate(reagents)
+    ]
+    forecasts.sort(key=lambda f: (f.days_remaining is None, f.days_remaining or 0, f.name))
+    return forecasts
+
+
+def get_forecasts():
+    """
+    Catalog forecasts, cached until the next inventory transaction or day.
+
+    Returns:
+        List of ReagentForecast tuples (see compute_forecasts)
+    """
+    today = timezone.localdate()
+    key = f'inventory:forecasts:{today.isoformat()}:{_transaction_version()}'
+    forecasts = cache.get(key)
+    if forecasts is None:
+        forecasts = compute_forecasts(today)
+        cache.set(key, forecasts, CACHE_TIMEOUT)
+    return forecasts
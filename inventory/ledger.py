@@ -0,0 +1,160 @@
+"""
+Reagent stock ledger.
+
+Usage is recorded in batches: the reagents involved are locked in id order
+(SELECT ... FOR UPDATE), usages and inventory transactions are written with
+bulk_create, and stock is decremented with F() expressions in a single
+UPDATE, so concurrent technicians never overwrite each other's changes.
+Reagents tracked by lot are drawn first-expired-first-out (inventory.lots),
+with one transaction per lot touched.
+"""
+from collections import namedtuple
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, DecimalField, F, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+
+BATCH_SIZE = 500
+
+ReagentUse = namedtuple('ReagentUse', ['test_assignment_id', 'reagent_id', 'quantity', 'notes'])
+ReagentUse.__new__.__defaults__ = ('',)
+
+_CENT = Decimal('0.01')
+
+
+def record_reagent_usages(usages, user=None):
+    """
+    Record many reagent usages and their stock movements in one transaction.
+    
+    Args:
+        usages: Iterable of ReagentUse tuples
+        user: User who used the reagents
+    
+    Returns:
+        List of created ReagentUsage instances, in input order
+    
+    Raises:
+        ValueError: If a quantity is not positive or a reagent or
+                    assignment does not exist
+        InsufficientStock: If a lot-tracked reagent lacks unexpired stock
+    """
+    from inventory.alerts import schedule_alert_refresh
+    from inventory.forecast import invalidate_forecasts
+    from inventory.lots import allocate_fefo, apply_lot_changes, refresh_reagent_lot_fields
+    from inventory.models import InventoryTransaction, Reagent
+    from inventory.rollups import apply_transaction_rollups
+    from inventory.valuation import apply_transactions
+    from tests.models import ReagentUsage, TestAssignment
+    from tests.utils import recompute_test_cost_statistics
+    
+    usages = [
+        use._replace(quantity=Decimal(str(use.quantity)))
+        for use in (ReagentUse(*use) for use in usages)
+    ]
+    if not usages:
+        return []
+    if any(use.quantity <= 0 for use in usages):
+        raise ValueError('Reagent quantities must be positive')
+    
+    reagent_ids = sorted({use.reagent_id for use in usages})
+    assignment_ids = {use.test_assignment_id for use in usages}
+    now = timezone.now()
+    
+    with transaction.atomic():
+        # Locking in id order keeps concurrent batches from deadlocking.
+        unit_costs = dict(
+            Reagent.objects.select_for_update().filter(id__in=reagent_ids).order_by('id').values_list(
+                'id', 'unit_cost'
+            )
+        )
+        assignments = {
+            row[0]: row[1:]
+            for row in TestAssignment.objects.filter(id__in=assignment_ids).values_list(
+                'id', 'test_id', 'status', 'test__code', 'sample__sample_id'
+            )
+        }
+        missing_reagents = set(reagent_ids) - set(unit_costs)
+        if missing_reagents:
+            raise ValueError(f'Unknown reagent(s): {sorted(missing_reagents)}')
+        missing_assignments = assignment_ids - set(assignments)
+        if missing_assignments:
+            raise ValueError(f'Unknown test assignment(s): {sorted(missing_assignments)}')
+        
+        allocations = allocate_fefo([(use.reagent_id, use.quantity) for use in usages])
+        
+        records = []
+        movements = []
+        used = {}
+        lot_changes = {}
+        for use, portions in zip(usages, allocations):
+            unit_cost = unit_costs[use.reagent_id]
+            total_cost = (use.quantity * unit_cost).quantize(_CENT) if unit_cost else None
+            test_id, status, test_code, sample_id = assignments[use.test_assignment_id]
+            records.append(ReagentUsage(
+                test_assignment_id=use.test_assignment_id,
+                reagent_id=use.reagent_id,
+                quantity_used=use.quantity,
+                unit_cost_at_usage=unit_cost,
+                total_cost=total_cost,
+                used_by=user,
+                notes=use.notes
+            ))
+            for lot_id, quantity in portions or [(None, use.quantity)]:
+                movements.append(InventoryTransaction(
+                    transaction_type='out',
+                    reagent_id=use.reagent_id,
+                    lot_id=lot_id,
+                    quantity=quantity,
+                    unit_cost=unit_cost,
+                    total_cost=(quantity * unit_cost).quantize(_CENT) if unit_cost else None,
+                    reason=f'Used for test {test_code} on sample {sample_id}',
+                    performed_by=user
+                ))
+                if lot_id is not None:
+                    lot_changes[lot_id] = lot_changes.get(lot_id, Decimal('0')) - quantity
+            used[use.reagent_id] = used.get(use.reagent_id, Decimal('0')) + use.quantity
+        
+        ReagentUsage.objects.bulk_create(records, batch_size=BATCH_SIZE)
+        InventoryTransaction.objects.bulk_create(movements, batch_size=BATCH_SIZE)
+        apply_transactions(movements)
+        apply_transaction_rollups(movements)
+        invalidate_forecasts()
+        schedule_alert_refresh(reagent_ids=reagent_ids)
+        
+        decimal = DecimalField(max_digits=10, decimal_places=2)
+        Reagent.objects.filter(id__in=reagent_ids).update(
+            quantity=F('quantity') - Case(
+                *[When(id=pk, then=Value(quantity)) for pk, quantity in used.items()],
+                output_field=decimal
+            ),
+            updated_at=now
+        )
+        apply_lot_changes(lot_changes)
+        if lot_changes:
+            refresh_reagent_lot_fields(
+                {use.reagent_id for use, portions in zip(usages, allocations) if portions}
+            )
+        
+        # Assignment cost is the sum of its usages, recomputed in SQL.
+        TestAssignment.objects.filter(id__in=assignment_ids).update(
+            actual_cost=Coalesce(
+                Subquery(
+                    ReagentUsage.objects.filter(test_assignment_id=OuterRef('pk')).order_by().values(
+                        'test_assignment_id'
+                    ).annotate(total=Sum('total_cost')).values('total')[:1],
+                    output_field=decimal
+                ),
+                Value(Decimal('0.00')),
+                output_field=decimal
+            )
+        )
+        # update() bypasses TestAssignment.save(), which keeps cost
+        # statistics of completed assignments current.
+        completed_tests = {row[0] for row in assignments.values() if row[1] == 'completed'}
+        if completed_tests:
+            recompute_test_cost_statistics(test_ids=completed_tests)
+    
+    return records
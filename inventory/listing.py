@@ -0,0 +1,187 @@
+"""Filtering, keyset pagination, running balances and export of inventory transactions."""
+import csv
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db.models import Case, DecimalField, ExpressionWrapper, F, Q, Sum, When, Window
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from results.listing import keyset_page
+
+from .valuation import TRANSACTION_SIGNS
+
+
+# Rows fetched per database round trip when exporting.
+CHUNK_SIZE = 2000
+
+# GET parameter to InventoryTransaction lookup for the equality filters.
+FILTER_LOOKUPS = {
+    'reagent': 'reagent_id',
+    'stock_item': 'stock_item_id',
+    'user': 'performed_by_id',
+}
+
+# (column header, InventoryTransaction lookup) in export order.
+EXPORT_COLUMNS = [
+    ('transaction_id', 'id'),
+    ('date', 'transaction_date'),
+    ('type', 'transaction_type'),
+    ('reagent', 'reagent__name'),
+    ('catalog_number', 'reagent__catalog_number'),
+    ('lot', 'lot__lot_number'),
+    ('stock_item', 'stock_item__name'),
+    ('item_code', 'stock_item__item_code'),
+    ('quantity', 'quantity'),
+    ('unit_cost', 'unit_cost'),
+    ('total_cost', 'total_cost'),
+    ('performed_by', 'performed_by__username'),
+    ('reason', 'reason'),
+]
+
+
+def get_filters(params):
+    """
+    Read the supported filters from a GET QueryDict.
+
+    Returns:
+        Dictionary of filter name to cleaned value (only those set)
+    """
+    from .models import InventoryTransaction
+
+    filters = {}
+    for name in FILTER_LOOKUPS:
+        value = params.get(name, '')
+        if value.isdigit():
+            filters[name] = int(value)
+    transaction_type = params.get('type', '')
+    if transaction_type in dict(InventoryTransaction.TRANSACTION_TYPE_CHOICES):
+        filters['type'] = transaction_type
+    for name in ('start_date', 'end_date'):
+        try:
+            value = parse_date(params.get(name, ''))
+        except ValueError:
+            value = None
+        if value:
+            filters[name] = value
+    return filters
+
+
+def apply_filters(queryset, filters):
+    """
+    Apply filters from get_filters().
+
+    Item, type and date filters together match the
+    (reagent, transaction_type, transaction_date) and
+    (stock_item, transaction_date) indexes.
+    """
+    for name, lookup in FILTER_LOOKUPS.items():
+        if name in filters:
+            queryset = queryset.filter(**{lookup: filters[name]})
+    if 'type' in filters:
+        queryset = queryset.filter(transaction_type=filters['type'])
+    if 'start_date' in filters:
+        queryset = queryset.filter(
+            transaction_date__gte=timezone.make_aware(datetime.combine(filters['start_date'], time.min))
+        )
+    if 'end_date' in filters:
+        queryset = queryset.filter(transaction_date__lt=timezone.make_aware(
+            datetime.combine(filters['end_date'] + timedelta(days=1), time.min)
+        ))
+    return queryset
+
+
+def transaction_page(queryset, after=None, before=None):
+    """One keyset page of transactions, newest first (see results.listing.keyset_page)."""
+    return keyset_page(queryset, 'transaction_date', after=after, before=before)
+
+
+def signed_quantity():
+    """Expression for a transaction's effect on its item's balance."""
+    decimal = DecimalField(max_digits=14, decimal_places=2)
+    return Case(
+        *[
+            When(transaction_type=t, then=ExpressionWrapper(F('quantity') * sign, output_field=decimal))
+            for t, sign in TRANSACTION_SIGNS.items() if sign < 0
+        ],
+        default=F('quantity'),
+        output_field=decimal
+    )
+
+
+def running_balances(transactions):
+    """
+    Item balance after each transaction on a page, whatever the filters.
+
+    The balance of every item on the page before the page's oldest row
+    comes from one grouped aggregate; the rows from there to the newest
+    row on the page get a running Sum window partitioned by item. The
+    window only scans the page's time span, but the aggregate reads each
+    item's whole history before the page through the item/date indexes,
+    so its cost grows with how far back the page is in that history.
+
+    Args:
+        transactions: InventoryTransactions shown on one page
+
+    Returns:
+        Dictionary of transaction id to balance
+    """
+    from .models import InventoryTransaction
+
+    transactions = list(transactions)
+    if not transactions:
+        return {}
+    oldest = min((t.transaction_date, t.id) for t in transactions)
+    newest = max((t.transaction_date, t.id) for t in transactions)
+    items = (
+        Q(reagent_id__in={t.reagent_id for t in transactions if t.reagent_id}) |
+        Q(stock_item_id__in={t.stock_item_id for t in transactions if t.stock_item_id})
+    )
+    before = Q(transaction_date__lt=oldest[0]) | Q(transaction_date=oldest[0], id__lt=oldest[1])
+    after = Q(transaction_date__gt=newest[0]) | Q(transaction_date=newest[0], id__gt=newest[1])
+    history = InventoryTransaction.objects.filter(items).order_by()
+
+    opening = {
+        (reagent_id, stock_item_id): total
+        for reagent_id, stock_item_id, total in history.filter(before).values_list(
+            'reagent_id', 'stock_item_id'
+        ).annotate(total=Sum(signed_quantity()))
+    }
+    span = history.exclude(before).exclude(after).annotate(
+        balance=Window(
+            Sum(signed_quantity()),
+            partition_by=[F('reagent_id'), F('stock_item_id')],
+            order_by=[F('transaction_date').asc(), F('id').asc()]
+        )
+    ).values_list('id', 'reagent_id', 'stock_item_id', 'balance')
+
+    wanted = {t.id for t in transactions}
+    return {
+        pk: (opening.get((reagent_id, stock_item_id), Decimal('0')) + balance).quantize(Decimal('0.01'))
+        for pk, reagent_id, stock_item_id, balance in span
+        if pk in wanted
+    }
+
+
+def export_queryset(filters):
+    """Transactions matching filters as tuples in EXPORT_COLUMNS order, oldest first."""
+    from .models import InventoryTransaction
+
+    return apply_filters(InventoryTransaction.objects.all(), filters).order_by(
+        'transaction_date', 'id'
+    ).values_list(*[field for header, field in EXPORT_COLUMNS])
+
+
+class _Echo:
+    """File-like object whose write() returns the line, for csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(rows):
+    """Yield CSV lines: a header, then one line per row."""
+    writer = csv.writer(_Echo())
+    yield writer.writerow([header for header, field in EXPORT_COLUMNS])
+    for row in rows.iterator(chunk_size=CHUNK_SIZE):
+        yield writer.writerow(row)
@@ -0,0 +1,187 @@
+"""
+Reagent lots and first-expired-first-out (FEFO) allocation.
+
+Consumption is allocated to the unexpired lots in stock in expiry order,
+read with one ordered query over the partial (reagent, expiry_date, id)
+index and locked for the rest of the transaction. Reagent totals are kept
+incrementally: quantities move with F() updates and the reagent's
+lot_number/expiry_date are re-pointed at its first-expiring lot in stock.
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, DecimalField, F, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+
+class InsufficientStock(ValueError):
+    """Raised when a reagent's unexpired lots cannot cover a usage."""
+
+
+def allocate_fefo(demands, today=None):
+    """
+    Split reagent demands across lots, first expiring first.
+    
+    Must run inside a transaction: the lots read are locked
+    (SELECT ... FOR UPDATE) until it commits. Nothing is written.
+    
+    Args:
+        demands: Sequence of (reagent id, quantity) tuples; demands for the
+                 same reagent are served in order
+        today: Optional date; lots expiring before it are skipped
+    
+    Returns:
+        List parallel to demands of [(lot id, quantity), ...]; an empty list
+        for reagents that have no lots at all (untracked reagents)
+    
+    Raises:
+        InsufficientStock: If a lot-tracked reagent runs out of usable stock
+    """
+    from inventory.models import ReagentLot
+    
+    today = today or timezone.localdate()
+    reagent_ids = {reagent_id for reagent_id, quantity in demands}
+    available = {}
+    for lot_id, reagent_id, quantity in ReagentLot.objects.select_for_update().filter(
+        reagent_id__in=reagent_ids,
+        quantity__gt=0,
+        expiry_date__gte=today
+    ).order_by('reagent_id', 'expiry_date', 'id').values_list('id', 'reagent_id', 'quantity'):
+        available.setdefault(reagent_id, []).append([lot_id, quantity])
+    
+    missing = reagent_ids - set(available)
+    tracked = set(
+        ReagentLot.objects.filter(reagent_id__in=missing).values_list('reagent_id', flat=True).distinct()
+    ) if missing else set()
+    
+    allocations = []
+    for reagent_id, quantity in demands:
+        lots = available.get(reagent_id)
+        if lots is None and reagent_id not in tracked:
+            allocations.append([])
+            continue
+        remaining = Decimal(str(quantity))
+        portions = []
+        for lot in lots or ():
+            if remaining <= 0:
+                break
+            take = min(lot[1], remaining)
+            if take > 0:
+                portions.append((lot[0], take))
+                lot[1] -= take
+                remaining -= take
+        if remaining > 0:
+            raise InsufficientStock(
+                f'Not enough unexpired stock for reagent {reagent_id} (short by {remaining})'
+            )
+        allocations.append(portions)
+    return allocations
+
+
+def apply_lot_changes(changes):
+    """
+    Move lot quantities with one UPDATE.
+    
+    Args:
+        changes: Dictionary of lot id to signed quantity change
+    """
+    from inventory.models import ReagentLot
+    
+    changes = {lot_id: change for lot_id, change in changes.items() if change}
+    if not changes:
+        return
+    ReagentLot.objects.filter(id__in=list(changes)).update(
+        quantity=F('quantity') + Case(
+            *[When(id=lot_id, then=Value(change)) for lot_id, change in changes.items()],
+            output_field=DecimalField(max_digits=10, decimal_places=2)
+        ),
+        updated_at=timezone.now()
+    )
+
+
+def refresh_reagent_lot_fields(reagent_ids):
+    """Point reagents' lot_number/expiry_date at their first-expiring lot in stock."""
+    from inventory.models import Reagent, ReagentLot
+    
+    head = ReagentLot.objects.filter(
+        reagent_id=OuterRef('pk'), quantity__gt=0
+    ).order_by('expiry_date', 'id')
+    Reagent.objects.filter(id__in=list(reagent_ids)).update(
+        lot_number=Coalesce(Subquery(head.values('lot_number')[:1]), F('lot_number')),
+        expiry_date=Coalesce(Subquery(head.values('expiry_date')[:1]), F('expiry_date')),
+    )
+
+
+def _move_lot(reagent, lot_number, change, transaction_type, expiry_date=None, user=None, reason=''):
+    from inventory.alerts import schedule_alert_refresh
+    from inventory.models import InventoryTransaction, Reagent, ReagentLot
+    
+    change = Decimal(str(change))
+    with transaction.atomic():
+        lot, created = ReagentLot.objects.select_for_update().get_or_create(
+            reagent=reagent,
+            lot_number=lot_number,
+            defaults={'expiry_date': expiry_date or reagent.expiry_date}
+        )
+        if lot.quantity + change < 0:
+            raise InsufficientStock(
+                f'Lot {lot.lot_number} holds {lot.quantity} {reagent.unit}; '
+                f'it cannot be reduced by {-change}'
+            )
+        updates = {'quantity': F('quantity') + change, 'updated_at': timezone.now()}
+        if expiry_date and not created:
+            updates['expiry_date'] = expiry_date
+        ReagentLot.objects.filter(pk=lot.pk).update(**updates)
+        if change:
+            Reagent.objects.filter(pk=reagent.pk).update(
+                quantity=F('quantity') + change, updated_at=timezone.now()
+            )
+            InventoryTransaction.objects.create(
+                transaction_type=transaction_type,
+                reagent=reagent,
+                lot=lot,
+                quantity=change,
+                unit_cost=reagent.unit_cost,
+                reason=reason,
+                performed_by=user
+            )
+        refresh_reagent_lot_fields([reagent.pk])
+        # The reagent's expiry may have moved even without a transaction.
+        schedule_alert_refresh(reagent_ids=[reagent.pk])
+    lot.refresh_from_db()
+    reagent.refresh_from_db(fields=['quantity', 'lot_number', 'expiry_date', 'updated_at'])
+    return lot
+
+
+def receive_lot(reagent, lot_number, quantity, expiry_date, user=None, reason='Lot received'):
+    """
+    Add received stock to a lot (created if new) and to the reagent total.
+    
+    Args:
+        reagent: Reagent instance
+        lot_number: Manufacturer lot number
+        quantity: Quantity received (may be 0 to register an empty lot)
+        expiry_date: Lot expiry date
+        user: Receiving user
+        reason: Transaction reason
+    
+    Returns:
+        The ReagentLot
+    """
+    if Decimal(str(quantity)) < 0:
+        raise ValueError('Received quantity cannot be negative')
+    return _move_lot(reagent, lot_number, quantity, 'in', expiry_date, user, reason)
+
+
+def adjust_lot(reagent, lot_number, change, expiry_date=None, user=None, reason='Manual quantity edit'):
+    """
+    Correct a lot's quantity by a signed change (e.g. after a stock count).
+    
+    Returns:
+        The ReagentLot
+    
+    Raises:
+        InsufficientStock: If the change would take the lot below zero
+    """
+    return _move_lot(reagent, lot_number, change, 'adjustment', expiry_date, user, reason)
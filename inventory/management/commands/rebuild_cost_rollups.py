@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from inventory.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = 'Recompute the monthly cost rollup tables from inventory transactions and cost allocations.'
+
+    def handle(self, *args, **options):
+        written = rebuild_rollups()
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {written['transactions']} transaction-type, {written['items']} item and "
+            f"{written['cost_centers']} cost center monthly rollups."
+        ))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from inventory.alerts import refresh_inventory_alerts, send_alert_digests
+
+
+class Command(BaseCommand):
+    help = 'Update the inventory alert table from current stock levels and expiry dates (run hourly).'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--digest',
+            action='store_true',
+            help="Also email today's alert digest to inventory managers (at most once per user per day)"
+        )
+
+    def handle(self, *args, **options):
+        changes = refresh_inventory_alerts()
+        self.stdout.write(self.style.SUCCESS(
+            f"Alerts opened: {changes['created']}, updated: {changes['updated']}, "
+            f"resolved: {changes['resolved']}."
+        ))
+        if options['digest']:
+            sent = send_alert_digests()
+            self.stdout.write(self.style.SUCCESS(f'Sent {sent} alert digests.'))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from inventory.valuation import reconcile_valuation
+
+
+class Command(BaseCommand):
+    help = "Recompute today's inventory valuation snapshot from the reagent and stock tables (run daily)."
+
+    def handle(self, *args, **options):
+        snapshot = reconcile_valuation()
+        self.stdout.write(self.style.SUCCESS(
+            f'Inventory value on {snapshot.date}: {snapshot.total_value} '
+            f'(reagents {snapshot.reagent_value}, stock {snapshot.stock_value}).'
+        ))
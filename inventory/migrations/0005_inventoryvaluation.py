@@ -0,0 +1,55 @@
+# Generated by Django 4.2.30 on 2026-10-19 07:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("inventory", "0004_merge_20251115_1217"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="InventoryValuation",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField(unique=True)),
+                (
+                    "reagent_value",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+                (
+                    "stock_value",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+                (
+                    "transaction_count",
+                    models.IntegerField(
+                        default=0, help_text="Transactions applied on this day"
+                    ),
+                ),
+                (
+                    "reconciled_at",
+                    models.DateTimeField(
+                        blank=True,
+                        help_text="Last recomputation from the inventory tables",
+                        null=True,
+                    ),
+                ),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "db_table": "inventory_valuations",
+                "ordering": ["-date"],
+            },
+        ),
+    ]
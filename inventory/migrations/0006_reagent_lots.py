@@ -0,0 +1,98 @@
+# Generated by Django 4.2.30 on 2026-10-19 07:39
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def create_initial_lots(apps, schema_editor):
+    """Move each reagent's single lot into the lots table."""
+    Reagent = apps.get_model("inventory", "Reagent")
+    ReagentLot = apps.get_model("inventory", "ReagentLot")
+
+    ReagentLot.objects.bulk_create(
+        [
+            ReagentLot(
+                reagent_id=reagent_id,
+                lot_number=lot_number or "-",
+                quantity=quantity,
+                expiry_date=expiry_date,
+            )
+            for reagent_id, lot_number, quantity, expiry_date in Reagent.objects.values_list(
+                "id", "lot_number", "quantity", "expiry_date"
+            ).iterator()
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("inventory", "0005_inventoryvaluation"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ReagentLot",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("lot_number", models.CharField(max_length=100)),
+                (
+                    "quantity",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=10),
+                ),
+                ("expiry_date", models.DateField()),
+                (
+                    "received_date",
+                    models.DateField(default=django.utils.timezone.localdate),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "reagent",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="lots",
+                        to="inventory.reagent",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "reagent_lots",
+                "ordering": ["expiry_date", "id"],
+            },
+        ),
+        migrations.AddField(
+            model_name="inventorytransaction",
+            name="lot",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="transactions",
+                to="inventory.reagentlot",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="reagentlot",
+            index=models.Index(
+                condition=models.Q(("quantity__gt", 0)),
+                fields=["reagent", "expiry_date", "id"],
+                name="reagent_lots_fefo_idx",
+            ),
+        ),
+        migrations.AlterUniqueTogether(
+            name="reagentlot",
+            unique_together={("reagent", "lot_number")},
+        ),
+        migrations.RunPython(create_initial_lots, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,214 @@
+# Generated by Django 4.2.30 on 2026-10-19 07:41
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+import django.db.models.deletion
+import django.db.models.expressions
+
+
+def open_initial_alerts(apps, schema_editor):
+    """Open alerts for current conditions, as inventory.alerts.refresh_inventory_alerts() does."""
+    Reagent = apps.get_model("inventory", "Reagent")
+    StockItem = apps.get_model("inventory", "StockItem")
+    InventoryAlert = apps.get_model("inventory", "InventoryAlert")
+
+    today = timezone.localdate()
+    horizon = today + timedelta(days=getattr(settings, "INVENTORY_EXPIRY_WARNING_DAYS", 30))
+    low_stock = models.Q(quantity__lte=models.F("minimum_quantity"))
+
+    alerts = []
+    for kind, model in (("reagent", Reagent), ("stock_item", StockItem)):
+        alerts += [
+            InventoryAlert(
+                alert_type="low_stock",
+                quantity=quantity,
+                minimum_quantity=minimum,
+                **{f"{kind}_id": pk},
+            )
+            for pk, quantity, minimum in model.objects.filter(low_stock).values_list(
+                "id", "quantity", "minimum_quantity"
+            )
+        ]
+    alerts += [
+        InventoryAlert(
+            alert_type="expired" if expiry_date < today else "expiring",
+            reagent_id=pk,
+            quantity=quantity,
+            minimum_quantity=minimum,
+            expiry_date=expiry_date,
+        )
+        for pk, quantity, minimum, expiry_date in Reagent.objects.filter(
+            expiry_date__lte=horizon, quantity__gt=0
+        ).values_list("id", "quantity", "minimum_quantity", "expiry_date")
+    ]
+    InventoryAlert.objects.bulk_create(alerts, batch_size=500)
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("inventory", "0006_reagent_lots"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="InventoryAlert",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "alert_type",
+                    models.CharField(
+                        choices=[
+                            ("low_stock", "Low Stock"),
+                            ("expiring", "Expiring Soon"),
+                            ("expired", "Expired"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                (
+                    "quantity",
+                    models.DecimalField(
+                        blank=True, decimal_places=2, max_digits=10, null=True
+                    ),
+                ),
+                (
+                    "minimum_quantity",
+                    models.DecimalField(
+                        blank=True, decimal_places=2, max_digits=10, null=True
+                    ),
+                ),
+                ("expiry_date", models.DateField(blank=True, null=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("resolved_at", models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                "db_table": "inventory_alerts",
+                "ordering": ["alert_type", "expiry_date", "id"],
+            },
+        ),
+        migrations.CreateModel(
+            name="InventoryAlertDigest",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField()),
+                ("alert_count", models.IntegerField(default=0)),
+                (
+                    "new_count",
+                    models.IntegerField(
+                        default=0, help_text="Alerts opened since the previous digest"
+                    ),
+                ),
+                ("sent_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "db_table": "inventory_alert_digests",
+                "ordering": ["-date"],
+            },
+        ),
+        migrations.AddIndex(
+            model_name="reagent",
+            index=models.Index(fields=["expiry_date"], name="reagents_expiry_date_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="reagent",
+            index=models.Index(
+                django.db.models.expressions.CombinedExpression(
+                    models.F("quantity"), "-", models.F("minimum_quantity")
+                ),
+                name="reagents_headroom_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="stockitem",
+            index=models.Index(
+                django.db.models.expressions.CombinedExpression(
+                    models.F("quantity"), "-", models.F("minimum_quantity")
+                ),
+                name="stock_items_headroom_idx",
+            ),
+        ),
+        migrations.AddField(
+            model_name="inventoryalertdigest",
+            name="user",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="inventory_digests",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.AddField(
+            model_name="inventoryalert",
+            name="reagent",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="alerts",
+                to="inventory.reagent",
+            ),
+        ),
+        migrations.AddField(
+            model_name="inventoryalert",
+            name="stock_item",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="alerts",
+                to="inventory.stockitem",
+            ),
+        ),
+        migrations.AlterUniqueTogether(
+            name="inventoryalertdigest",
+            unique_together={("user", "date")},
+        ),
+        migrations.AddIndex(
+            model_name="inventoryalert",
+            index=models.Index(
+                fields=["resolved_at", "alert_type"],
+                name="inventory_a_resolve_ac8ade_idx",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="inventoryalert",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(
+                    ("reagent__isnull", False), ("resolved_at__isnull", True)
+                ),
+                fields=("alert_type", "reagent"),
+                name="inventory_alerts_open_reagent_unique",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="inventoryalert",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(
+                    ("resolved_at__isnull", True), ("stock_item__isnull", False)
+                ),
+                fields=("alert_type", "stock_item"),
+                name="inventory_alerts_open_stock_unique",
+            ),
+        ),
+        migrations.RunPython(open_initial_alerts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,239 @@
+# Generated by Django 4.2.30 on 2026-10-19 07:45
+
+from django.db import migrations, models
+from django.db.models.functions import TruncMonth
+import django.db.models.deletion
+
+
+def populate_rollups(apps, schema_editor):
+    """Fill the rollups from existing data, as inventory.rollups.rebuild_rollups() does."""
+    InventoryTransaction = apps.get_model("inventory", "InventoryTransaction")
+    CostAllocation = apps.get_model("inventory", "CostAllocation")
+    MonthlyTransactionRollup = apps.get_model("inventory", "MonthlyTransactionRollup")
+    MonthlyItemRollup = apps.get_model("inventory", "MonthlyItemRollup")
+    MonthlyCostCenterRollup = apps.get_model("inventory", "MonthlyCostCenterRollup")
+
+    month = TruncMonth("transaction_date", output_field=models.DateField())
+    totals = {
+        "transaction_count": models.Count("id"),
+        "quantity": models.Sum("quantity"),
+        "total_cost": models.Sum("total_cost"),
+    }
+
+    def rows(queryset, *fields):
+        return queryset.annotate(month=month).order_by().values("month", *fields).annotate(**totals)
+
+    MonthlyTransactionRollup.objects.bulk_create(
+        [
+            MonthlyTransactionRollup(
+                month=row["month"],
+                transaction_type=row["transaction_type"],
+                transaction_count=row["transaction_count"],
+                quantity=row["quantity"] or 0,
+                total_cost=row["total_cost"] or 0,
+            )
+            for row in rows(InventoryTransaction.objects.all(), "transaction_type")
+        ],
+        batch_size=500,
+    )
+    MonthlyItemRollup.objects.bulk_create(
+        [
+            MonthlyItemRollup(
+                month=row["month"],
+                transaction_type=row["transaction_type"],
+                reagent_id=row["reagent_id"],
+                stock_item_id=row["stock_item_id"],
+                transaction_count=row["transaction_count"],
+                quantity=row["quantity"] or 0,
+                total_cost=row["total_cost"] or 0,
+            )
+            for row in rows(
+                InventoryTransaction.objects.filter(
+                    models.Q(reagent__isnull=False) | models.Q(stock_item__isnull=False)
+                ),
+                "transaction_type",
+                "reagent_id",
+                "stock_item_id",
+            )
+        ],
+        batch_size=500,
+    )
+    MonthlyCostCenterRollup.objects.bulk_create(
+        [
+            MonthlyCostCenterRollup(
+                month=row["month"],
+                cost_center_id=row["cost_center_id"],
+                allocation_count=row["allocation_count"],
+                allocated_cost=row["allocated_cost"] or 0,
+            )
+            for row in CostAllocation.objects.annotate(
+                month=TruncMonth("transaction__transaction_date", output_field=models.DateField())
+            )
+            .order_by()
+            .values("month", "cost_center_id")
+            .annotate(allocation_count=models.Count("id"), allocated_cost=models.Sum("allocated_cost"))
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("inventory", "0007_inventory_alerts"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MonthlyTransactionRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("month", models.DateField(help_text="First day of the month")),
+                (
+                    "transaction_type",
+                    models.CharField(
+                        choices=[
+                            ("in", "Stock In"),
+                            ("out", "Stock Out"),
+                            ("adjustment", "Adjustment"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("transaction_count", models.IntegerField(default=0)),
+                (
+                    "quantity",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+                (
+                    "total_cost",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+            ],
+            options={
+                "db_table": "inventory_monthly_transaction_rollups",
+                "ordering": ["-month", "transaction_type"],
+                "unique_together": {("month", "transaction_type")},
+            },
+        ),
+        migrations.CreateModel(
+            name="MonthlyItemRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("month", models.DateField(help_text="First day of the month")),
+                (
+                    "transaction_type",
+                    models.CharField(
+                        choices=[
+                            ("in", "Stock In"),
+                            ("out", "Stock Out"),
+                            ("adjustment", "Adjustment"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("transaction_count", models.IntegerField(default=0)),
+                (
+                    "quantity",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+                (
+                    "total_cost",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+                (
+                    "reagent",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="monthly_rollups",
+                        to="inventory.reagent",
+                    ),
+                ),
+                (
+                    "stock_item",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="monthly_rollups",
+                        to="inventory.stockitem",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "inventory_monthly_item_rollups",
+                "ordering": ["-month", "transaction_type"],
+            },
+        ),
+        migrations.CreateModel(
+            name="MonthlyCostCenterRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("month", models.DateField(help_text="First day of the month")),
+                ("allocation_count", models.IntegerField(default=0)),
+                (
+                    "allocated_cost",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+                (
+                    "cost_center",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="monthly_rollups",
+                        to="inventory.costcenter",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "inventory_monthly_cost_center_rollups",
+                "ordering": ["-month", "cost_center"],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="monthlyitemrollup",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("reagent__isnull", False)),
+                fields=("month", "transaction_type", "reagent"),
+                name="monthly_item_rollups_reagent_unique",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="monthlyitemrollup",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("stock_item__isnull", False)),
+                fields=("month", "transaction_type", "stock_item"),
+                name="monthly_item_rollups_stock_unique",
+            ),
+        ),
+        migrations.AlterUniqueTogether(
+            name="monthlycostcenterrollup",
+            unique_together={("cost_center", "month")},
+        ),
+        migrations.RunPython(populate_rollups, migrations.RunPython.noop),
+    ]
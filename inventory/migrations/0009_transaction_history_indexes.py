@@ -0,0 +1,32 @@
+# Generated by Django 4.2.30 on 2026-10-19 07:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("inventory", "0008_monthly_cost_rollups"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="inventorytransaction",
+            index=models.Index(
+                fields=["transaction_date", "id"], name="inv_txn_date_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="inventorytransaction",
+            index=models.Index(
+                fields=["reagent", "transaction_type", "transaction_date"],
+                name="inv_txn_reagent_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="inventorytransaction",
+            index=models.Index(
+                fields=["stock_item", "transaction_date"], name="inv_txn_stock_item_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,87 @@
+# Generated by Django 4.2.30 on 2026-10-19 07:50
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("inventory", "0009_transaction_history_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ScanRecord",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "key",
+                    models.CharField(
+                        help_text="Client idempotency key", max_length=100, unique=True
+                    ),
+                ),
+                (
+                    "code",
+                    models.CharField(
+                        help_text="Scanned catalog number or item code", max_length=100
+                    ),
+                ),
+                (
+                    "transaction_type",
+                    models.CharField(
+                        choices=[
+                            ("in", "Stock In"),
+                            ("out", "Stock Out"),
+                            ("adjustment", "Adjustment"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("quantity", models.DecimalField(decimal_places=2, max_digits=10)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "performed_by",
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "reagent",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="scans",
+                        to="inventory.reagent",
+                    ),
+                ),
+                (
+                    "stock_item",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="scans",
+                        to="inventory.stockitem",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "inventory_scan_records",
+                "ordering": ["-created_at"],
+            },
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 4.2.30 on 2026-10-19 07:52
+
+from django.db import migrations, models
+
+
+# Columns served by inventory.search. Django's istartswith/icontains
+# compile to UPPER(col::text) LIKE UPPER(...) on PostgreSQL, so the
+# indexes are on that expression: text_pattern_ops for prefixes and
+# pg_trgm for substrings.
+SEARCH_COLUMNS = {
+    'reagents': ('name', 'catalog_number', 'manufacturer'),
+    'stock_items': ('name', 'item_code', 'category'),
+}
+
+
+def create_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for table, columns in SEARCH_COLUMNS.items():
+        for column in columns:
+            schema_editor.execute(
+                f'CREATE INDEX IF NOT EXISTS {table}_{column}_prefix_idx '
+                f'ON {table} (UPPER({column}::text) text_pattern_ops)'
+            )
+            schema_editor.execute(
+                f'CREATE INDEX IF NOT EXISTS {table}_{column}_trgm_idx '
+                f'ON {table} USING gin (UPPER({column}::text) gin_trgm_ops)'
+            )
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table, columns in SEARCH_COLUMNS.items():
+        for column in columns:
+            schema_editor.execute(f'DROP INDEX IF EXISTS {table}_{column}_prefix_idx')
+            schema_editor.execute(f'DROP INDEX IF EXISTS {table}_{column}_trgm_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("inventory", "0010_scan_records"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="reagent",
+            index=models.Index(fields=["name", "id"], name="reagents_name_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="stockitem",
+            index=models.Index(fields=["name", "id"], name="stock_items_name_idx"),
+        ),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
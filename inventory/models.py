@@ -1,5 +1,6 @@
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 
 
 class Reagent(models.Model):
@@ -54,6 +55,48 @@ class Reagent(models.Model):
     class Meta:
         db_table = 'reagents'
         ordering = ['name']
+        indexes = [
+            models.Index(fields=['name', 'id'], name='reagents_name_idx'),
+            models.Index(fields=['expiry_date'], name='reagents_expiry_date_idx'),
+            # Matches the low-stock filter in inventory.alerts.
+            models.Index(models.F('quantity') - models.F('minimum_quantity'), name='reagents_headroom_idx'),
+        ]
+
+
+class ReagentLot(models.Model):
+    """
+    A received lot of a reagent.
+    
+    Reagent.quantity is the running total over its lots, and the reagent's
+    lot_number/expiry_date mirror its first-expiring lot in stock.
+    """
+    reagent = models.ForeignKey(Reagent, on_delete=models.CASCADE, related_name='lots')
+    lot_number = models.CharField(max_length=100)
+    quantity = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    expiry_date = models.DateField()
+    received_date = models.DateField(default=timezone.localdate)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.reagent.name} lot {self.lot_number}"
+    
+    @property
+    def is_expired(self):
+        return self.expiry_date < timezone.localdate()
+    
+    class Meta:
+        db_table = 'reagent_lots'
+        ordering = ['expiry_date', 'id']
+        unique_together = ['reagent', 'lot_number']
+        indexes = [
+            # First-expired-first-out scans only touch lots in stock.
+            models.Index(
+                fields=['reagent', 'expiry_date', 'id'],
+                condition=models.Q(quantity__gt=0),
+                name='reagent_lots_fefo_idx'
+            ),
+        ]
 
 
 class StockItem(models.Model):
@@ -87,6 +130,10 @@ class StockItem(models.Model):
     class Meta:
         db_table = 'stock_items'
         ordering = ['name']
+        indexes = [
+            models.Index(fields=['name', 'id'], name='stock_items_name_idx'),
+            models.Index(models.F('quantity') - models.F('minimum_quantity'), name='stock_items_headroom_idx'),
+        ]
 
 
 class InventoryTransaction(models.Model):
@@ -100,6 +147,7 @@ class InventoryTransaction(models.Model):
     transaction_type = models.CharField(max_length=20, choices=TRANSACTION_TYPE_CHOICES)
     reagent = models.ForeignKey(Reagent, on_delete=models.CASCADE, null=True, blank=True, related_name='transactions')
     stock_item = models.ForeignKey(StockItem, on_delete=models.CASCADE, null=True, blank=True, related_name='transactions')
+    lot = models.ForeignKey(ReagentLot, on_delete=models.SET_NULL, null=True, blank=True, related_name='transactions')
     quantity = models.DecimalField(max_digits=10, decimal_places=2)
     
     # Cost tracking
@@ -125,6 +173,35 @@ class InventoryTransaction(models.Model):
     class Meta:
         db_table = 'inventory_transactions'
         ordering = ['-transaction_date']
+        indexes = [
+            models.Index(fields=['transaction_date', 'id'], name='inv_txn_date_idx'),
+            models.Index(fields=['reagent', 'transaction_type', 'transaction_date'], name='inv_txn_reagent_idx'),
+            models.Index(fields=['stock_item', 'transaction_date'], name='inv_txn_stock_item_idx'),
+        ]
+
+
+class ScanRecord(models.Model):
+    """
+    A stock movement applied from a barcode scan batch.
+    
+    The client-generated idempotency key is unique, so a retried batch
+    finds its movements already recorded and does not apply them twice.
+    """
+    key = models.CharField(max_length=100, unique=True, help_text='Client idempotency key')
+    code = models.CharField(max_length=100, help_text='Scanned catalog number or item code')
+    transaction_type = models.CharField(max_length=20, choices=InventoryTransaction.TRANSACTION_TYPE_CHOICES)
+    quantity = models.DecimalField(max_digits=10, decimal_places=2)
+    reagent = models.ForeignKey(Reagent, on_delete=models.CASCADE, null=True, blank=True, related_name='scans')
+    stock_item = models.ForeignKey(StockItem, on_delete=models.CASCADE, null=True, blank=True, related_name='scans')
+    performed_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"{self.key}: {self.transaction_type} {self.quantity} x {self.code}"
+    
+    class Meta:
+        db_table = 'inventory_scan_records'
+        ordering = ['-created_at']
 
 
 class CostCenter(models.Model):
@@ -143,30 +220,15 @@ class CostCenter(models.Model):
         return f"{self.code} - {self.name}"
     
     def get_monthly_spending(self, year, month):
-        """Calculate total spending for a specific month."""
-        from datetime import datetime
-        start_date = datetime(year, month, 1)
-        if month == 12:
-            end_date = datetime(year + 1, 1, 1)
-        else:
-            end_date = datetime(year, month + 1, 1)
-        
-        total = self.cost_allocations.filter(
-            transaction__transaction_date__gte=start_date,
-            transaction__transaction_date__lt=end_date
-        ).aggregate(models.Sum('allocated_cost'))['allocated_cost__sum'] or 0
-        
-        return total
+        """Calculate total spending for a specific month (from the monthly rollups)."""
+        from datetime import date
+        rollup = self.monthly_rollups.filter(month=date(year, month, 1)).first()
+        return rollup.allocated_cost if rollup else 0
     
     def get_yearly_spending(self, year):
-        """Calculate total spending for a specific year."""
-        from datetime import datetime
-        start_date = datetime(year, 1, 1)
-        end_date = datetime(year + 1, 1, 1)
-        
-        total = self.cost_allocations.filter(
-            transaction__transaction_date__gte=start_date,
-            transaction__transaction_date__lt=end_date
+        """Calculate total spending for a specific year (from the monthly rollups)."""
+        total = self.monthly_rollups.filter(
+            month__year=year
         ).aggregate(models.Sum('allocated_cost'))['allocated_cost__sum'] or 0
         
         return total
@@ -192,3 +254,167 @@ class CostAllocation(models.Model):
     class Meta:
         db_table = 'cost_allocations'
         ordering = ['-created_at']
+
+
+class MonthlyTransactionRollup(models.Model):
+    """
+    Transaction totals per month and transaction type.
+    
+    This and the two rollups below are maintained by inventory.rollups as
+    transactions and cost allocations are written; rebuild them with the
+    rebuild_cost_rollups command.
+    """
+    month = models.DateField(help_text='First day of the month')
+    transaction_type = models.CharField(max_length=20, choices=InventoryTransaction.TRANSACTION_TYPE_CHOICES)
+    transaction_count = models.IntegerField(default=0)
+    quantity = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    total_cost = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    
+    def __str__(self):
+        return f"{self.month:%Y-%m} {self.transaction_type}: {self.total_cost}"
+    
+    class Meta:
+        db_table = 'inventory_monthly_transaction_rollups'
+        ordering = ['-month', 'transaction_type']
+        unique_together = ['month', 'transaction_type']
+
+
+class MonthlyItemRollup(models.Model):
+    """Transaction totals per month, transaction type and reagent or stock item."""
+    month = models.DateField(help_text='First day of the month')
+    transaction_type = models.CharField(max_length=20, choices=InventoryTransaction.TRANSACTION_TYPE_CHOICES)
+    reagent = models.ForeignKey(Reagent, on_delete=models.CASCADE, null=True, blank=True, related_name='monthly_rollups')
+    stock_item = models.ForeignKey(StockItem, on_delete=models.CASCADE, null=True, blank=True, related_name='monthly_rollups')
+    transaction_count = models.IntegerField(default=0)
+    quantity = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    total_cost = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    
+    def __str__(self):
+        return f"{self.month:%Y-%m} {self.transaction_type} {self.reagent or self.stock_item}: {self.total_cost}"
+    
+    class Meta:
+        db_table = 'inventory_monthly_item_rollups'
+        ordering = ['-month', 'transaction_type']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['month', 'transaction_type', 'reagent'],
+                condition=models.Q(reagent__isnull=False),
+                name='monthly_item_rollups_reagent_unique'
+            ),
+            models.UniqueConstraint(
+                fields=['month', 'transaction_type', 'stock_item'],
+                condition=models.Q(stock_item__isnull=False),
+                name='monthly_item_rollups_stock_unique'
+            ),
+        ]
+
+
+class MonthlyCostCenterRollup(models.Model):
+    """Allocated cost per month and cost center (by transaction date)."""
+    month = models.DateField(help_text='First day of the month')
+    cost_center = models.ForeignKey(CostCenter, on_delete=models.CASCADE, related_name='monthly_rollups')
+    allocation_count = models.IntegerField(default=0)
+    allocated_cost = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    
+    def __str__(self):
+        return f"{self.month:%Y-%m} {self.cost_center.code}: {self.allocated_cost}"
+    
+    class Meta:
+        db_table = 'inventory_monthly_cost_center_rollups'
+        ordering = ['-month', 'cost_center']
+        unique_together = ['cost_center', 'month']
+
+
+class InventoryValuation(models.Model):
+    """
+    Inventory value per day.
+    
+    Today's row is a running snapshot moved by every InventoryTransaction;
+    earlier rows hold the closing value of their day.
+    """
+    date = models.DateField(unique=True)
+    reagent_value = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    stock_value = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    transaction_count = models.IntegerField(default=0, help_text='Transactions applied on this day')
+    reconciled_at = models.DateTimeField(null=True, blank=True,
+                                         help_text='Last recomputation from the inventory tables')
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.date}: {self.total_value}"
+    
+    @property
+    def total_value(self):
+        return self.reagent_value + self.stock_value
+    
+    class Meta:
+        db_table = 'inventory_valuations'
+        ordering = ['-date']
+
+
+class InventoryAlert(models.Model):
+    """
+    An inventory problem (low stock, expiring or expired reagent).
+    
+    Rows are maintained by inventory.alerts.refresh_inventory_alerts(), run
+    on a schedule; an alert stays open until its condition clears and is
+    then kept with resolved_at set.
+    """
+    ALERT_TYPE_CHOICES = [
+        ('low_stock', 'Low Stock'),
+        ('expiring', 'Expiring Soon'),
+        ('expired', 'Expired'),
+    ]
+    
+    alert_type = models.CharField(max_length=20, choices=ALERT_TYPE_CHOICES)
+    reagent = models.ForeignKey(Reagent, on_delete=models.CASCADE, null=True, blank=True, related_name='alerts')
+    stock_item = models.ForeignKey(StockItem, on_delete=models.CASCADE, null=True, blank=True, related_name='alerts')
+    quantity = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    minimum_quantity = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    expiry_date = models.DateField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    resolved_at = models.DateTimeField(null=True, blank=True)
+    
+    def __str__(self):
+        return f"{self.get_alert_type_display()} - {self.item}"
+    
+    @property
+    def item(self):
+        return self.reagent or self.stock_item
+    
+    class Meta:
+        db_table = 'inventory_alerts'
+        ordering = ['alert_type', 'expiry_date', 'id']
+        indexes = [
+            models.Index(fields=['resolved_at', 'alert_type']),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['alert_type', 'reagent'],
+                condition=models.Q(resolved_at__isnull=True, reagent__isnull=False),
+                name='inventory_alerts_open_reagent_unique'
+            ),
+            models.UniqueConstraint(
+                fields=['alert_type', 'stock_item'],
+                condition=models.Q(resolved_at__isnull=True, stock_item__isnull=False),
+                name='inventory_alerts_open_stock_unique'
+            ),
+        ]
+
+
+class InventoryAlertDigest(models.Model):
+    """Record of the daily alert digest sent to a user (at most one per day)."""
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='inventory_digests')
+    date = models.DateField()
+    alert_count = models.IntegerField(default=0)
+    new_count = models.IntegerField(default=0, help_text='Alerts opened since the previous digest')
+    sent_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"{self.user} - {self.date}"
+    
+    class Meta:
+        db_table = 'inventory_alert_digests'
+        unique_together = ['user', 'date']
+        ordering = ['-date']
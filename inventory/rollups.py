@@ -0,0 +1,205 @@
+"""
+Monthly cost rollups.
+
+Cost reports read three small tables instead of aggregating the
+transaction and allocation tables for every month shown:
+
+- MonthlyTransactionRollup: per month and transaction type
+- MonthlyItemRollup: per month, transaction type and reagent/stock item
+- MonthlyCostCenterRollup: allocated cost per month and cost center
+
+New transactions and allocations are added to them as they are written
+(see inventory.signals and the usage ledger), inside the caller's
+database transaction when there is one. Months follow the local date of the transaction. Edits or
+deletions made outside the application (e.g. in the admin) are not
+tracked; `manage.py rebuild_cost_rollups` recomputes everything.
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, Count, DateField, DecimalField, F, IntegerField, Q, Sum, Value, When
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+
+BATCH_SIZE = 500
+
+_ZERO = Decimal('0.00')
+
+
+def month_of(value):
+    """First day of the (local) month of a date or datetime."""
+    if hasattr(value, 'hour'):
+        if timezone.is_aware(value):
+            value = timezone.localtime(value)
+        value = value.date()
+    return value.replace(day=1)
+
+
+def _key_filter(field, values):
+    values = set(values)
+    condition = Q(**{f'{field}__in': values - {None}})
+    if None in values:
+        condition |= Q(**{f'{field}__isnull': True})
+    return condition
+
+
+def _increment(model, key_fields, deltas, value_fields):
+    """
+    Add deltas to rollup rows, creating missing rows first.
+
+    Three queries per call whatever the number of rows: an INSERT that
+    ignores existing keys, a SELECT of the row ids and one UPDATE with a
+    CASE per value field, so concurrent writers never lose increments.
+
+    Args:
+        model: Rollup model
+        key_fields: Names (attnames) of the fields identifying a row
+        deltas: Dictionary of key tuple to a tuple of increments in
+                value_fields order
+        value_fields: Sequence of (field name, output field) pairs
+    """
+    deltas = {key: values for key, values in deltas.items() if any(values)}
+    if not deltas:
+        return
+    model.objects.bulk_create(
+        [model(**dict(zip(key_fields, key))) for key in deltas],
+        batch_size=BATCH_SIZE, ignore_conflicts=True
+    )
+    condition = Q()
+    for i, field in enumerate(key_fields):
+        condition &= _key_filter(field, (key[i] for key in deltas))
+    ids = {
+        tuple(row[1:]): row[0]
+        for row in model.objects.filter(condition).values_list('id', *key_fields)
+    }
+    updates = {}
+    for j, (field, output_field) in enumerate(value_fields):
+        updates[field] = Case(
+            *[
+                When(id=ids[key], then=F(field) + Value(values[j], output_field=output_field))
+                for key, values in deltas.items() if values[j]
+            ],
+            default=F(field),
+            output_field=output_field
+        )
+    model.objects.filter(id__in=[ids[key] for key in deltas]).update(**updates)
+
+
+def _money():
+    return DecimalField(max_digits=14, decimal_places=2)
+
+
+def apply_transaction_rollups(transactions):
+    """
+    Add new inventory transactions to the monthly type and item rollups.
+
+    Args:
+        transactions: Iterable of saved InventoryTransaction instances
+    """
+    from inventory.models import MonthlyItemRollup, MonthlyTransactionRollup
+
+    by_type = {}
+    by_item = {}
+    for txn in transactions:
+        month = month_of(txn.transaction_date or timezone.now())
+        change = (1, Decimal(str(txn.quantity)), Decimal(str(txn.total_cost or _ZERO)))
+        key = (month, txn.transaction_type)
+        by_type[key] = tuple(a + b for a, b in zip(by_type.get(key, (0, _ZERO, _ZERO)), change))
+        if txn.reagent_id or txn.stock_item_id:
+            key = (month, txn.transaction_type, txn.reagent_id, txn.stock_item_id)
+            by_item[key] = tuple(a + b for a, b in zip(by_item.get(key, (0, _ZERO, _ZERO)), change))
+
+    value_fields = [('transaction_count', IntegerField()), ('quantity', _money()), ('total_cost', _money())]
+    with transaction.atomic():
+        _increment(MonthlyTransactionRollup, ['month', 'transaction_type'], by_type, value_fields)
+        _increment(MonthlyItemRollup, ['month', 'transaction_type', 'reagent_id', 'stock_item_id'],
+                   by_item, value_fields)
+
+
+def apply_allocation_rollups(allocations):
+    """
+    Add new cost allocations to the monthly cost center rollup.
+
+    Args:
+        allocations: Iterable of saved CostAllocation instances (their
+                     transaction is read for its date)
+    """
+    from inventory.models import MonthlyCostCenterRollup
+
+    by_center = {}
+    for allocation in allocations:
+        key = (month_of(allocation.transaction.transaction_date), allocation.cost_center_id)
+        count, cost = by_center.get(key, (0, _ZERO))
+        by_center[key] = (count + 1, cost + Decimal(str(allocation.allocated_cost)))
+
+    with transaction.atomic():
+        _increment(MonthlyCostCenterRollup, ['month', 'cost_center_id'], by_center,
+                   [('allocation_count', IntegerField()), ('allocated_cost', _money())])
+
+
+def rebuild_rollups():
+    """
+    Recompute all rollup tables from transactions and allocations.
+
+    Returns:
+        Dictionary of rollup name to rows written
+    """
+    from inventory.models import (
+        CostAllocation, InventoryTransaction, MonthlyCostCenterRollup, MonthlyItemRollup,
+        MonthlyTransactionRollup,
+    )
+
+    month = TruncMonth('transaction_date', output_field=DateField())
+    totals = {
+        'transaction_count': Count('id'),
+        'quantity': Sum('quantity'),
+        'total_cost': Sum('total_cost'),
+    }
+
+    def rows(queryset, *fields):
+        return queryset.annotate(month=month).order_by().values('month', *fields).annotate(**totals)
+
+    with transaction.atomic():
+        MonthlyTransactionRollup.objects.all().delete()
+        MonthlyItemRollup.objects.all().delete()
+        MonthlyCostCenterRollup.objects.all().delete()
+
+        by_type = [
+            MonthlyTransactionRollup(
+                month=row['month'], transaction_type=row['transaction_type'],
+                transaction_count=row['transaction_count'], quantity=row['quantity'] or _ZERO,
+                total_cost=row['total_cost'] or _ZERO
+            )
+            for row in rows(InventoryTransaction.objects.all(), 'transaction_type')
+        ]
+        by_item = [
+            MonthlyItemRollup(
+                month=row['month'], transaction_type=row['transaction_type'],
+                reagent_id=row['reagent_id'], stock_item_id=row['stock_item_id'],
+                transaction_count=row['transaction_count'], quantity=row['quantity'] or _ZERO,
+                total_cost=row['total_cost'] or _ZERO
+            )
+            for row in rows(
+                InventoryTransaction.objects.filter(Q(reagent__isnull=False) | Q(stock_item__isnull=False)),
+                'transaction_type', 'reagent_id', 'stock_item_id'
+            )
+        ]
+        by_center = [
+            MonthlyCostCenterRollup(
+                month=row['month'], cost_center_id=row['cost_center_id'],
+                allocation_count=row['allocation_count'], allocated_cost=row['allocated_cost'] or _ZERO
+            )
+            for row in CostAllocation.objects.annotate(
+                month=TruncMonth('transaction__transaction_date', output_field=DateField())
+            ).order_by().values('month', 'cost_center_id').annotate(
+                allocation_count=Count('id'), allocated_cost=Sum('allocated_cost')
+            )
+        ]
+
+        MonthlyTransactionRollup.objects.bulk_create(by_type, batch_size=BATCH_SIZE)
+        MonthlyItemRollup.objects.bulk_create(by_item, batch_size=BATCH_SIZE)
+        MonthlyCostCenterRollup.objects.bulk_create(by_center, batch_size=BATCH_SIZE)
+
+    return {'transactions': len(by_type), 'items': len(by_item), 'cost_centers': len(by_center)}
+
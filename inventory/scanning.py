@@ -0,0 +1,322 @@
+"""
+Barcode scan batches: idempotent stock movements from scanners.
+
+A batch is applied in one transaction with a fixed number of queries:
+scanned codes are resolved against reagent catalog numbers and stock item
+codes with one UNION query, quantities move with CASE F() updates, and the
+InventoryTransaction rows are bulk-created. Every movement carries a
+client-generated idempotency key that is recorded (ScanRecord, unique) in
+the same transaction, so a batch retried after a timeout skips the
+movements that were already applied. A batch's receipts are applied
+before its issues. A batch is all or nothing: an unknown code or a
+shortfall rolls it back.
+"""
+from collections import namedtuple
+from decimal import Decimal, InvalidOperation
+
+from django.db import IntegrityError, transaction
+from django.db.models import Case, CharField, DateField, DecimalField, F, Value, When
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .lots import InsufficientStock
+
+
+BATCH_SIZE = 500
+
+# Largest batch accepted in one request.
+MAX_MOVEMENTS = 1000
+
+# Largest quantity the DecimalField(max_digits=10, decimal_places=2)
+# quantity columns can hold.
+MAX_QUANTITY = Decimal('99999999.99')
+
+# Attempts at a batch whose keys keep colliding with concurrent requests.
+MAX_ATTEMPTS = 3
+
+SCAN_TYPES = ('in', 'out')
+
+class ScanConflict(Exception):
+    """Raised when concurrent requests keep claiming a batch's keys."""
+
+
+ScanMovement = namedtuple('ScanMovement', [
+    'key', 'code', 'transaction_type', 'quantity', 'lot_number', 'expiry_date', 'reason',
+])
+
+
+def parse_movements(items):
+    """
+    Validate the movements of a JSON batch.
+
+    Each item needs 'key', 'code', 'type' ('in' or 'out') and a positive
+    'quantity'; reagent receipts may add 'lot_number' and 'expiry_date'
+    (defaulting to the reagent's current lot), and any item a 'reason'.
+
+    Returns:
+        List of ScanMovement tuples
+
+    Raises:
+        ValueError: If the batch or one of its movements is malformed
+    """
+    if not isinstance(items, list) or not items:
+        raise ValueError('movements must be a non-empty list')
+    if len(items) > MAX_MOVEMENTS:
+        raise ValueError(f'At most {MAX_MOVEMENTS} movements per batch')
+
+    movements = []
+    for i, item in enumerate(items):
+        if not isinstance(item, dict):
+            raise ValueError(f'Movement {i} must be an object')
+        key = str(item.get('key') or '').strip()
+        code = str(item.get('code') or '').strip()
+        if not key or len(key) > 100:
+            raise ValueError(f'Movement {i}: key is required (at most 100 characters)')
+        if not code:
+            raise ValueError(f'Movement {i}: code is required')
+        transaction_type = item.get('type')
+        if transaction_type not in SCAN_TYPES:
+            raise ValueError(f"Movement {i}: type must be one of {', '.join(SCAN_TYPES)}")
+        try:
+            quantity = Decimal(str(item.get('quantity')))
+        except InvalidOperation:
+            raise ValueError(f'Movement {i}: quantity must be a number')
+        if not quantity.is_finite() or quantity <= 0:
+            raise ValueError(f'Movement {i}: quantity must be positive')
+        if quantity > MAX_QUANTITY:
+            raise ValueError(f'Movement {i}: quantity must be at most {MAX_QUANTITY}')
+        quantity = quantity.quantize(Decimal('0.01'))
+        if not quantity:
+            raise ValueError(f'Movement {i}: quantity must be at least 0.01')
+        expiry_date = None
+        if item.get('expiry_date'):
+            try:
+                expiry_date = parse_date(str(item['expiry_date']))
+            except ValueError:
+                expiry_date = None
+            if expiry_date is None:
+                raise ValueError(f'Movement {i}: expiry_date must be YYYY-MM-DD')
+        movements.append(ScanMovement(
+            key, code, transaction_type, quantity,
+            str(item.get('lot_number') or '').strip(), expiry_date,
+            str(item.get('reason') or '')[:500],
+        ))
+
+    keys = [movement.key for movement in movements]
+    if len(set(keys)) != len(keys):
+        raise ValueError('Idempotency keys must be unique within a batch')
+    return movements
+
+
+def resolve_codes(codes):
+    """
+    Find the reagents and stock items for scanned codes in one query.
+
+    Returns:
+        Dictionary of code to (kind, id, unit cost, lot number, expiry
+        date), kind being 'reagent' or 'stock_item'
+
+    Raises:
+        ValueError: If a code is unknown or matches both a reagent and a
+                    stock item
+    """
+    from .models import Reagent, StockItem
+
+    codes = set(codes)
+    # Every column is an annotation, declared in the same order on both
+    # sides, so the two SELECT lists of the UNION line up.
+    reagents = Reagent.objects.filter(catalog_number__in=codes).order_by().annotate(
+        code=F('catalog_number'),
+        kind=Value('reagent', output_field=CharField()),
+        pk_value=F('id'),
+        cost=F('unit_cost'),
+        lot=F('lot_number'),
+        expiry=F('expiry_date'),
+    ).values_list('code', 'kind', 'pk_value', 'cost', 'lot', 'expiry')
+    stock_items = StockItem.objects.filter(item_code__in=codes).order_by().annotate(
+        code=F('item_code'),
+        kind=Value('stock_item', output_field=CharField()),
+        pk_value=F('id'),
+        cost=F('cost_per_unit'),
+        lot=Value('', output_field=CharField()),
+        expiry=Value(None, output_field=DateField()),
+    ).values_list('code', 'kind', 'pk_value', 'cost', 'lot', 'expiry')
+
+    items = {}
+    for code, *item in reagents.union(stock_items, all=True):
+        if code in items:
+            raise ValueError(f'Code {code} matches both a reagent and a stock item')
+        items[code] = tuple(item)
+    unknown = codes - set(items)
+    if unknown:
+        raise ValueError(f"Unknown code(s): {', '.join(sorted(unknown))}")
+    return items
+
+
+def _move_quantities(model, changes, now):
+    """Apply signed quantity changes to many rows with one UPDATE."""
+    changes = {pk: change for pk, change in changes.items() if change}
+    if not changes:
+        return
+    model.objects.filter(id__in=list(changes)).update(
+        quantity=F('quantity') + Case(
+            *[When(id=pk, then=Value(change)) for pk, change in changes.items()],
+            output_field=DecimalField(max_digits=10, decimal_places=2)
+        ),
+        updated_at=now
+    )
+
+
+def _receive_lots(receipts):
+    """
+    Create missing lots for reagent receipts.
+
+    Args:
+        receipts: Dictionary of (reagent id, lot number) to expiry date
+
+    Returns:
+        Dictionary of (reagent id, lot number) to lot id
+    """
+    from .models import ReagentLot
+
+    if not receipts:
+        return {}
+    ReagentLot.objects.bulk_create(
+        [
+            ReagentLot(reagent_id=reagent_id, lot_number=lot_number, quantity=0, expiry_date=expiry_date)
+            for (reagent_id, lot_number), expiry_date in receipts.items()
+        ],
+        batch_size=BATCH_SIZE, ignore_conflicts=True
+    )
+    return {
+        (reagent_id, lot_number): lot_id
+        for lot_id, reagent_id, lot_number in ReagentLot.objects.filter(
+            reagent_id__in={key[0] for key in receipts},
+            lot_number__in={key[1] for key in receipts}
+        ).values_list('id', 'reagent_id', 'lot_number')
+    }
+
+
+def _apply(movements, user):
+    from .alerts import schedule_alert_refresh
+    from .forecast import invalidate_forecasts
+    from .lots import allocate_fefo, apply_lot_changes, refresh_reagent_lot_fields
+    from .models import InventoryTransaction, Reagent, ScanRecord, StockItem
+    from .rollups import apply_transaction_rollups
+    from .valuation import apply_transactions
+
+    now = timezone.now()
+    with transaction.atomic():
+        done = set(ScanRecord.objects.filter(key__in=[m.key for m in movements]).values_list('key', flat=True))
+        pending = [m for m in movements if m.key not in done]
+        if not pending:
+            return [], [m.key for m in movements]
+
+        items = resolve_codes(m.code for m in pending)
+        # Claiming the keys first makes a concurrent retry of the same
+        # batch fail on the unique key instead of applying it again.
+        ScanRecord.objects.bulk_create([
+            ScanRecord(
+                key=m.key, code=m.code, transaction_type=m.transaction_type, quantity=m.quantity,
+                **{f'{items[m.code][0]}_id': items[m.code][1]}, performed_by=user
+            )
+            for m in pending
+        ], batch_size=BATCH_SIZE)
+
+        receipts = {}
+        for m in pending:
+            kind, pk, cost, lot_number, expiry_date = items[m.code]
+            if kind == 'reagent' and m.transaction_type == 'in':
+                receipts.setdefault((pk, m.lot_number or lot_number), m.expiry_date or expiry_date)
+        lots = _receive_lots(receipts)
+        # Receipts reach their lots before issues are allocated, so a batch
+        # may issue stock it receives itself, whatever the scan order.
+        received = {}
+        for m in pending:
+            kind, pk, cost, lot_number, expiry_date = items[m.code]
+            if kind == 'reagent' and m.transaction_type == 'in':
+                lot_id = lots[(pk, m.lot_number or lot_number)]
+                received[lot_id] = received.get(lot_id, Decimal('0')) + m.quantity
+        apply_lot_changes(received)
+        issues = [m for m in pending if items[m.code][0] == 'reagent' and m.transaction_type == 'out']
+        allocations = dict(zip(
+            (m.key for m in issues),
+            allocate_fefo([(items[m.code][1], m.quantity) for m in issues])
+        ))
+
+        movements_out = []
+        quantities = {'reagent': {}, 'stock_item': {}}
+        issued_from_lots = {}
+        for m in pending:
+            kind, pk, cost, lot_number, expiry_date = items[m.code]
+            sign = 1 if m.transaction_type == 'in' else -1
+            if kind == 'reagent' and m.transaction_type == 'in':
+                portions = [(lots[(pk, m.lot_number or lot_number)], m.quantity)]
+            else:
+                portions = allocations.get(m.key) or [(None, m.quantity)]
+            for lot_id, quantity in portions:
+                movements_out.append(InventoryTransaction(
+                    transaction_type=m.transaction_type,
+                    quantity=quantity,
+                    lot_id=lot_id,
+                    unit_cost=cost,
+                    total_cost=(quantity * cost).quantize(Decimal('0.01')) if cost else None,
+                    reason=m.reason or f'Barcode scan {m.key}',
+                    performed_by=user,
+                    **{f'{kind}_id': pk}
+                ))
+                if lot_id is not None and sign < 0:
+                    issued_from_lots[lot_id] = issued_from_lots.get(lot_id, Decimal('0')) - quantity
+            quantities[kind][pk] = quantities[kind].get(pk, Decimal('0')) + sign * m.quantity
+
+        _move_quantities(Reagent, quantities['reagent'], now)
+        _move_quantities(StockItem, quantities['stock_item'], now)
+        apply_lot_changes(issued_from_lots)
+        issued = {
+            kind: [pk for pk, change in changes.items() if change < 0] for kind, changes in quantities.items()
+        }
+        short = list(
+            Reagent.objects.filter(id__in=issued['reagent'], quantity__lt=0).values_list('name', flat=True)
+        ) + list(
+            StockItem.objects.filter(id__in=issued['stock_item'], quantity__lt=0).values_list('name', flat=True)
+        )
+        if short:
+            raise InsufficientStock(f"Not enough stock of: {', '.join(sorted(short))}")
+        if received or issued_from_lots:
+            refresh_reagent_lot_fields({pk for pk in quantities['reagent']})
+
+        InventoryTransaction.objects.bulk_create(movements_out, batch_size=BATCH_SIZE)
+        apply_transactions(movements_out)
+        apply_transaction_rollups(movements_out)
+        invalidate_forecasts()
+        schedule_alert_refresh(quantities['reagent'], quantities['stock_item'])
+
+    return [m.key for m in pending], [m.key for m in movements if m.key in done]
+
+
+def apply_scan_batch(movements, user=None):
+    """
+    Apply a batch of scanned stock movements exactly once.
+
+    Args:
+        movements: List of ScanMovement tuples (see parse_movements)
+        user: User performing the scans
+
+    Returns:
+        Tuple of (applied keys, duplicate keys); duplicates were applied
+        by an earlier request and are skipped
+
+    Raises:
+        ValueError: If a code is unknown or ambiguous
+        InsufficientStock: If an issue exceeds the stock (or, for
+                           lot-tracked reagents, the unexpired stock)
+        ScanConflict: If the keys are still contended after MAX_ATTEMPTS
+    """
+    for attempt in range(MAX_ATTEMPTS):
+        try:
+            return _apply(movements, user)
+        except IntegrityError:
+            # Some keys were claimed by a concurrent request that has now
+            # committed; re-reading reports them as duplicates.
+            continue
+    raise ScanConflict('The batch conflicts with concurrent scans; retry it')
@@ -0,0 +1,134 @@
+"""
+Indexed search and autocomplete over reagents and stock items.
+
+Queries shorter than MIN_CONTAINS_LENGTH match the start of a field
+(case-insensitive prefix); longer ones also match anywhere in it. On
+PostgreSQL both forms are served by indexes on UPPER(field): a
+text_pattern_ops B-tree for prefixes and a pg_trgm GIN index for
+substrings (see migration 0011). Autocomplete answers are cached per
+normalized query under a version that changes whenever a reagent or
+stock item is saved or deleted, so hot prefixes cost one cache read.
+"""
+import hashlib
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+
+
+SEARCH_VERSION_KEY = 'inventory:search_version'
+
+# Fields searched per item kind; the first is the display name, the second the code.
+SEARCH_FIELDS = {
+    'reagent': ('name', 'catalog_number', 'manufacturer'),
+    'stock_item': ('name', 'item_code', 'category'),
+}
+
+# Trigram indexes only help from three characters on.
+MIN_CONTAINS_LENGTH = 3
+
+AUTOCOMPLETE_LIMIT = 10
+
+CACHE_TIMEOUT = 5 * 60
+
+
+def _models():
+    from .models import Reagent, StockItem
+    return {'reagent': Reagent, 'stock_item': StockItem}
+
+
+def normalize(query):
+    """Collapse whitespace; autocomplete answers are shared across case."""
+    return ' '.join((query or '').split())
+
+
+def search_filter(kind, query, contains=None):
+    """
+    Q object matching query in an item kind's search fields.
+
+    Args:
+        kind: 'reagent' or 'stock_item'
+        query: Search text
+        contains: Match anywhere in the fields rather than at the start
+                  (defaults to True from MIN_CONTAINS_LENGTH characters)
+    """
+    if contains is None:
+        contains = len(query) >= MIN_CONTAINS_LENGTH
+    lookup = 'icontains' if contains else 'istartswith'
+    condition = Q()
+    for field in SEARCH_FIELDS[kind]:
+        condition |= Q(**{f'{field}__{lookup}': query})
+    return condition
+
+
+def search(kind, queryset, query):
+    """Filter a reagent or stock item queryset by search text."""
+    query = normalize(query)
+    if not query:
+        return queryset
+    return queryset.filter(search_filter(kind, query))
+
+
+def get_search_version():
+    version = cache.get(SEARCH_VERSION_KEY)
+    if version is None:
+        cache.add(SEARCH_VERSION_KEY, uuid.uuid4().hex, timeout=None)
+        version = cache.get(SEARCH_VERSION_KEY)
+    return version
+
+
+def bump_search_version():
+    """Invalidate cached autocomplete answers once the transaction commits."""
+    def _bump():
+        cache.set(SEARCH_VERSION_KEY, uuid.uuid4().hex, timeout=None)
+
+    transaction.on_commit(_bump)
+
+
+def _suggestions(kind, query, limit):
+    """Prefix matches first, then (for longer queries) substring matches."""
+    model = _models()[kind]
+    name_field, code_field, detail_field = SEARCH_FIELDS[kind]
+    columns = ('id', name_field, code_field, detail_field)
+
+    rows = list(
+        model.objects.filter(search_filter(kind, query, contains=False)).order_by(name_field, 'id')
+        .values_list(*columns)[:limit]
+    )
+    if len(rows) < limit and len(query) >= MIN_CONTAINS_LENGTH:
+        rows += list(
+            model.objects.filter(search_filter(kind, query, contains=True)).exclude(
+                id__in=[row[0] for row in rows]
+            ).order_by(name_field, 'id').values_list(*columns)[:limit - len(rows)]
+        )
+    return [
+        {'type': kind, 'id': pk, 'name': name, 'code': code, 'detail': detail}
+        for pk, name, code, detail in rows
+    ]
+
+
+def autocomplete(query, kinds=('reagent', 'stock_item'), limit=AUTOCOMPLETE_LIMIT):
+    """
+    Suggestions for a search box, cached per query.
+
+    Args:
+        query: Text typed so far
+        kinds: Item kinds to search
+        limit: Maximum suggestions per kind
+
+    Returns:
+        List of dictionaries with 'type', 'id', 'name', 'code' and 'detail'
+    """
+    query = normalize(query)
+    if not query:
+        return []
+    digest = hashlib.sha1(f"{','.join(kinds)}|{limit}|{query.lower()}".encode()).hexdigest()
+    key = f'inventory:autocomplete:{get_search_version()}:{digest}'
+    suggestions = cache.get(key)
+    if suggestions is None:
+        suggestions = []
+        for kind in kinds:
+            suggestions += _suggestions(kind, query, limit)
+        cache.set(key, suggestions, CACHE_TIMEOUT)
+    return suggestions
@@ -0,0 +1,51 @@
+"""Signal handlers for the inventory app."""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import CostAllocation, InventoryTransaction, Reagent, StockItem
+
+
+@receiver(post_save, sender=InventoryTransaction)
+def apply_transaction_value(sender, instance, created, **kwargs):
+    """Move today's valuation snapshot by a new transaction's value."""
+    if created:
+        from .forecast import invalidate_forecasts
+        from .rollups import apply_transaction_rollups
+        from .valuation import apply_transactions
+        from .alerts import schedule_alert_refresh
+        apply_transactions([instance])
+        apply_transaction_rollups([instance])
+        invalidate_forecasts()
+        schedule_alert_refresh([instance.reagent_id], [instance.stock_item_id])
+
+
+@receiver(post_save, sender=CostAllocation)
+def apply_allocation_cost(sender, instance, created, **kwargs):
+    """Add a new allocation to its cost center's monthly rollup."""
+    if created:
+        from .rollups import apply_allocation_rollups
+        apply_allocation_rollups([instance])
+
+
+@receiver(post_save, sender=Reagent)
+@receiver(post_save, sender=StockItem)
+@receiver(post_delete, sender=Reagent)
+@receiver(post_delete, sender=StockItem)
+def invalidate_item_search(sender, **kwargs):
+    """Drop cached autocomplete answers when a searchable item changes."""
+    from .search import bump_search_version
+    bump_search_version()
+
+
+@receiver(post_save, sender=Reagent)
+def refresh_reagent_alerts(sender, instance, **kwargs):
+    """Re-check a reagent's alerts after edits to its minimum or expiry."""
+    from .alerts import schedule_alert_refresh
+    schedule_alert_refresh(reagent_ids=[instance.pk])
+
+
+@receiver(post_save, sender=StockItem)
+def refresh_stock_item_alerts(sender, instance, **kwargs):
+    """Re-check a stock item's alerts after edits to its quantity or minimum."""
+    from .alerts import schedule_alert_refresh
+    schedule_alert_refresh(stock_item_ids=[instance.pk])
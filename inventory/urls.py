@@ -8,9 +8,16 @@ urlpatterns = [
     path('reagents/', views.reagent_list, name='reagent_list'),
     path('reagents/create/', views.reagent_create, name='reagent_create'),
     path('reagents/<int:pk>/edit/', views.reagent_edit, name='reagent_edit'),
+    path('reagents/<int:pk>/lots/', views.reagent_lots, name='reagent_lots'),
     path('stock/', views.stock_list, name='stock_list'),
     path('stock/create/', views.stock_create, name='stock_create'),
     path('stock/<int:pk>/edit/', views.stock_edit, name='stock_edit'),
     path('transactions/', views.transaction_list, name='transaction_list'),
+    path('transactions/export/', views.export_transactions, name='export_transactions'),
+    path('api/scans/', views.scan_batch, name='scan_batch'),
+    path('api/autocomplete/', views.autocomplete, name='autocomplete'),
+    path('valuation/', views.inventory_valuation, name='inventory_valuation'),
+    path('forecast/', views.reorder_forecast, name='reorder_forecast'),
+    path('budget/', views.budget_status, name='budget_status'),
     path('low-stock/', views.low_stock_alerts, name='low_stock_alerts'),
 ]
@@ -1,29 +1,29 @@
 """Utility functions for inventory cost management."""
 from decimal import Decimal
-from datetime import datetime, timedelta
+from datetime import date, timedelta
 from django.db.models import Sum, Q
 from django.utils import timezone
 
 
 def calculate_total_inventory_value():
-    """Calculate total value of all inventory (reagents and stock items)."""
-    from inventory.models import Reagent, StockItem
-    
-    reagent_value = Reagent.objects.aggregate(
-        total=Sum('quantity') * Sum('unit_cost')
-    )['total'] or Decimal('0.00')
+    """
+    Calculate total value of all inventory (reagents and stock items).
     
-    stock_value = StockItem.objects.aggregate(
-        total=Sum('quantity') * Sum('cost_per_unit')
-    )['total'] or Decimal('0.00')
+    This is the sum of quantity x unit cost over both tables; dashboards
+    should read inventory.valuation.get_current_valuation() instead.
+    """
+    from inventory.valuation import compute_inventory_value
     
-    return reagent_value + stock_value
+    return compute_inventory_value()['total_value']
 
 
 def get_monthly_costs(year, month, cost_center=None):
     """
     Get total costs for a specific month.
     
+    Reads the monthly rollup tables (inventory.rollups), so a long trend
+    costs one small query per month rather than scans of the transactions.
+    
     Args:
         year: Year
         month: Month (1-12)
@@ -32,50 +32,24 @@ def get_monthly_costs(year, month, cost_center=None):
     Returns:
         Dictionary with cost breakdown
     """
-    from inventory.models import InventoryTransaction, CostAllocation
-    
-    start_date = datetime(year, month, 1)
-    if month == 12:
-        end_date = datetime(year + 1, 1, 1)
-    else:
-        end_date = datetime(year, month + 1, 1)
+    from inventory.models import MonthlyTransactionRollup
     
-    # Get transactions for the period
-    transactions = InventoryTransaction.objects.filter(
-        transaction_date__gte=start_date,
-        transaction_date__lt=end_date
+    by_type = dict(
+        MonthlyTransactionRollup.objects.filter(
+            month=date(year, month, 1)
+        ).values_list('transaction_type', 'total_cost')
     )
     
-    # Calculate costs
-    total_costs = transactions.aggregate(
-        total=Sum('total_cost')
-    )['total'] or Decimal('0.00')
-    
-    # Break down by transaction type
-    stock_in = transactions.filter(transaction_type='in').aggregate(
-        total=Sum('total_cost')
-    )['total'] or Decimal('0.00')
-    
-    stock_out = transactions.filter(transaction_type='out').aggregate(
-        total=Sum('total_cost')
-    )['total'] or Decimal('0.00')
-    
     # Get cost center allocation if specified
     if cost_center:
-        allocated = CostAllocation.objects.filter(
-            cost_center=cost_center,
-            transaction__transaction_date__gte=start_date,
-            transaction__transaction_date__lt=end_date
-        ).aggregate(
-            total=Sum('allocated_cost')
-        )['total'] or Decimal('0.00')
+        allocated = Decimal(cost_center.get_monthly_spending(year, month))
     else:
         allocated = None
     
     return {
-        'total_costs': total_costs,
-        'stock_in_costs': stock_in,
-        'stock_out_costs': stock_out,
+        'total_costs': sum(by_type.values(), Decimal('0.00')),
+        'stock_in_costs': by_type.get('in', Decimal('0.00')),
+        'stock_out_costs': by_type.get('out', Decimal('0.00')),
         'cost_center_allocated': allocated,
         'period': f"{year}-{month:02d}",
     }
@@ -138,24 +112,19 @@ def get_reagent_consumption_report(reagent, start_date=None, end_date=None):
 
 
 def get_low_stock_alerts():
-    """Get all reagents and stock items that are low or expiring."""
-    from inventory.models import Reagent, StockItem
-    from django.db.models import F
-    
-    low_reagents = Reagent.objects.filter(
-        quantity__lte=F('minimum_quantity')
-    )
-    
-    expiring_reagents = [r for r in Reagent.objects.all() if r.is_expiring_soon]
+    """
+    Get all reagents and stock items that are low or expiring.
     
-    low_stock_items = StockItem.objects.filter(
-        quantity__lte=F('minimum_quantity')
-    )
+    The filters run in SQL on indexed expressions; pages that only need the
+    current alerts should read inventory.alerts.get_open_alerts() instead.
+    """
+    from inventory.models import Reagent, StockItem
+    from inventory.alerts import expiring, low_stock
     
     return {
-        'low_stock_reagents': low_reagents,
-        'expiring_reagents': expiring_reagents,
-        'low_stock_items': low_stock_items,
+        'low_stock_reagents': low_stock(Reagent.objects.all()),
+        'expiring_reagents': expiring(Reagent.objects.all()).order_by('expiry_date'),
+        'low_stock_items': low_stock(StockItem.objects.all()),
     }
 
 
@@ -235,3 +204,78 @@ def get_cost_center_budget_status(cost_center, year=None, month=None):
             'percentage_used': yearly_percentage,
         },
     }
+
+
+def _period_status(budget, spent, elapsed_fraction=None):
+    """Budget figures for one period, with an optional burn-rate projection."""
+    budget = budget or Decimal('0.00')
+    spent = spent or Decimal('0.00')
+    status = {
+        'budget': budget,
+        'spent': spent,
+        'remaining': budget - spent,
+        'percentage_used': (spent / budget * 100) if budget > 0 else 0,
+    }
+    if elapsed_fraction is not None:
+        projected = (spent / Decimal(str(elapsed_fraction))).quantize(Decimal('0.01')) if elapsed_fraction else spent
+        status['projected'] = projected
+        status['projected_over'] = budget > 0 and projected > budget
+    return status
+
+
+def _elapsed_fraction(start, end, today):
+    """Share of the period [start, end) that has passed by the end of today."""
+    if today < start:
+        return 0
+    if today >= end:
+        return 1
+    return ((today - start).days + 1) / (end - start).days
+
+
+def get_portfolio_budget_status(year=None, month=None, project=False):
+    """
+    Get budget vs actual spending for every active cost center at once.
+    
+    Monthly and yearly spending come from one conditional aggregation over
+    the monthly cost center rollups, so the query count does not grow with
+    the number of cost centers.
+    
+    Args:
+        year: Optional year (defaults to current)
+        month: Optional month (defaults to current)
+        project: Also project spending to the end of each period at the
+                 burn rate so far
+    
+    Returns:
+        List of dictionaries shaped like get_cost_center_budget_status(),
+        with 'id' and 'code' added (and 'projected'/'projected_over' in
+        each period when project is set)
+    """
+    from inventory.models import CostCenter
+    
+    today = timezone.localdate()
+    year = year or today.year
+    month = month or today.month
+    month_start = date(year, month, 1)
+    
+    centers = CostCenter.objects.filter(is_active=True).annotate(
+        monthly_spent=Sum('monthly_rollups__allocated_cost', filter=Q(monthly_rollups__month=month_start)),
+        yearly_spent=Sum('monthly_rollups__allocated_cost', filter=Q(monthly_rollups__month__year=year)),
+    ).order_by('code')
+    
+    month_elapsed = year_elapsed = None
+    if project:
+        month_end = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+        month_elapsed = _elapsed_fraction(month_start, month_end, today)
+        year_elapsed = _elapsed_fraction(date(year, 1, 1), date(year + 1, 1, 1), today)
+    
+    return [
+        {
+            'id': center.id,
+            'code': center.code,
+            'cost_center': center.name,
+            'monthly': _period_status(center.monthly_budget, center.monthly_spent, month_elapsed),
+            'yearly': _period_status(center.yearly_budget, center.yearly_spent, year_elapsed),
+        }
+        for center in centers
+    ]
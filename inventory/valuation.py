@@ -0,0 +1,164 @@
+"""
+Inventory valuation.
+
+The value of the inventory is the sum of quantity x unit cost over reagents
+and stock items. Instead of aggregating both tables on every dashboard
+load, today's InventoryValuation row is kept as a running snapshot: each
+InventoryTransaction moves it by its signed value with an F() update. A
+daily reconcile (manage.py snapshot_inventory_valuation) recomputes the
+exact value, which also absorbs purchases priced differently from an
+item's current unit cost.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import DecimalField, ExpressionWrapper, F, Sum
+from django.utils import timezone
+
+
+_ZERO = Decimal('0.00')
+
+# Sign of a transaction's quantity in the inventory balance; adjustment
+# quantities are signed changes.
+TRANSACTION_SIGNS = {'in': 1, 'out': -1, 'adjustment': 1}
+
+
+def _value_sum(quantity, cost):
+    return Sum(ExpressionWrapper(
+        F(quantity) * F(cost),
+        output_field=DecimalField(max_digits=20, decimal_places=4)
+    ))
+
+
+def compute_inventory_value():
+    """
+    Exact inventory value from the item tables (one aggregate per table).
+    
+    Returns:
+        Dictionary with 'reagent_value', 'stock_value' and 'total_value'
+    """
+    from inventory.models import Reagent, StockItem
+    
+    reagent_value = Reagent.objects.aggregate(
+        total=_value_sum('quantity', 'unit_cost')
+    )['total'] or _ZERO
+    stock_value = StockItem.objects.aggregate(
+        total=_value_sum('quantity', 'cost_per_unit')
+    )['total'] or _ZERO
+    
+    reagent_value = Decimal(reagent_value).quantize(Decimal('0.01'))
+    stock_value = Decimal(stock_value).quantize(Decimal('0.01'))
+    return {
+        'reagent_value': reagent_value,
+        'stock_value': stock_value,
+        'total_value': reagent_value + stock_value,
+    }
+
+
+def transaction_value(inventory_transaction):
+    """Signed change in inventory value caused by a transaction."""
+    value = inventory_transaction.total_cost
+    if value is None:
+        if inventory_transaction.unit_cost is None:
+            return _ZERO
+        value = Decimal(str(inventory_transaction.quantity)) * inventory_transaction.unit_cost
+    return TRANSACTION_SIGNS.get(inventory_transaction.transaction_type, 0) * value
+
+
+def _today_snapshot():
+    """Today's valuation row, carried forward from the latest row (or computed) if missing."""
+    from inventory.models import InventoryValuation
+    
+    today = timezone.localdate()
+    snapshot = InventoryValuation.objects.filter(date=today).first()
+    if snapshot is not None:
+        return snapshot
+    
+    previous = InventoryValuation.objects.filter(date__lt=today).order_by('-date').first()
+    if previous is not None:
+        values = {'reagent_value': previous.reagent_value, 'stock_value': previous.stock_value}
+    else:
+        exact = compute_inventory_value()
+        values = {
+            'reagent_value': exact['reagent_value'],
+            'stock_value': exact['stock_value'],
+            'reconciled_at': timezone.now(),
+        }
+    try:
+        with transaction.atomic():
+            return InventoryValuation.objects.create(date=today, **values)
+    except IntegrityError:
+        # Created concurrently by another worker.
+        return InventoryValuation.objects.get(date=today)
+
+
+def apply_valuation_change(reagent_value=_ZERO, stock_value=_ZERO, transactions=0):
+    """Move today's snapshot by the given amounts with one F() update."""
+    from inventory.models import InventoryValuation
+    
+    snapshot = _today_snapshot()
+    InventoryValuation.objects.filter(pk=snapshot.pk).update(
+        reagent_value=F('reagent_value') + reagent_value,
+        stock_value=F('stock_value') + stock_value,
+        transaction_count=F('transaction_count') + transactions,
+        updated_at=timezone.now()
+    )
+
+
+def apply_transactions(transactions):
+    """
+    Apply InventoryTransactions to today's snapshot.
+    
+    Called for every saved transaction (see inventory.signals) and
+    explicitly after bulk_create, which sends no signals.
+    
+    Args:
+        transactions: Iterable of new InventoryTransaction instances
+    """
+    reagent_value = stock_value = _ZERO
+    count = 0
+    for inventory_transaction in transactions:
+        value = transaction_value(inventory_transaction)
+        if inventory_transaction.reagent_id:
+            reagent_value += value
+        else:
+            stock_value += value
+        count += 1
+    if count:
+        apply_valuation_change(reagent_value, stock_value, count)
+
+
+def get_current_valuation():
+    """Today's valuation snapshot (an InventoryValuation instance)."""
+    return _today_snapshot()
+
+
+def reconcile_valuation():
+    """
+    Recompute today's snapshot exactly from the inventory tables.
+    
+    Returns:
+        The updated InventoryValuation
+    """
+    from inventory.models import InventoryValuation
+    
+    with transaction.atomic():
+        snapshot = _today_snapshot()
+        exact = compute_inventory_value()
+        InventoryValuation.objects.filter(pk=snapshot.pk).update(
+            reagent_value=exact['reagent_value'],
+            stock_value=exact['stock_value'],
+            reconciled_at=timezone.now(),
+            updated_at=timezone.now()
+        )
+    snapshot.refresh_from_db()
+    return snapshot
+
+
+def get_valuation_history(days=30):
+    """Daily valuation rows of the last `days` days, oldest first."""
+    from inventory.models import InventoryValuation
+    
+    since = timezone.localdate() - timedelta(days=days - 1)
+    return list(InventoryValuation.objects.filter(date__gte=since).order_by('date'))
@@ -1,24 +1,26 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from datetime import date, timedelta
+from django.db import transaction
+from decimal import Decimal
 from .models import Reagent, StockItem, InventoryTransaction
+from .lots import InsufficientStock, adjust_lot, receive_lot
+from .valuation import apply_valuation_change, get_current_valuation, get_valuation_history
 
 
 @login_required
 def inventory_dashboard(request):
-    """Inventory dashboard with key metrics."""
-    low_stock_reagents = Reagent.objects.filter(quantity__lte=models.F('minimum_quantity')).count()
-    low_stock_items = StockItem.objects.filter(quantity__lte=models.F('minimum_quantity')).count()
-    expiring_soon = Reagent.objects.filter(
-        expiry_date__lte=date.today() + timedelta(days=30)
-    ).count()
+    """Inventory dashboard with key metrics, read from the open alerts."""
+    from .alerts import get_alert_counts, get_open_alerts
     
+    counts = get_alert_counts()
     context = {
-        'low_stock_reagents': low_stock_reagents,
-        'low_stock_items': low_stock_items,
-        'expiring_soon': expiring_soon,
-        'total_low_stock': low_stock_reagents + low_stock_items,
+        'total_reagents': Reagent.objects.count(),
+        'total_stock_items': StockItem.objects.count(),
+        'low_stock_count': counts['low_stock'],
+        'expiring_soon_count': counts['expiring'] + counts['expired'],
+        'low_stock': get_open_alerts('low_stock')[:10],
+        'expiring_soon': get_open_alerts().filter(alert_type__in=['expiring', 'expired']).order_by('expiry_date')[:10],
     }
     
     return render(request, 'inventory/dashboard.html', context)
@@ -27,38 +29,46 @@ def inventory_dashboard(request):
 @login_required
 def reagent_list(request):
     """List all reagents."""
-    reagents = Reagent.objects.all()
+    from django.core.paginator import Paginator
+    from .search import search as search_items
     
     # Filters
     search = request.GET.get('search', '')
-    if search:
-        from django.db.models import Q
-        reagents = reagents.filter(
-            Q(name__icontains=search) |
-            Q(catalog_number__icontains=search) |
-            Q(manufacturer__icontains=search)
-        )
+    reagents = search_items('reagent', Reagent.objects.order_by('name', 'id'), search)
     
-    return render(request, 'inventory/reagent_list.html', {'reagents': reagents})
+    # Pagination
+    paginator = Paginator(reagents, 50)
+    page_obj = paginator.get_page(request.GET.get('page'))
+    
+    context = {
+        'reagents': page_obj,
+        'page_obj': page_obj,
+        'search': search,
+    }
+    
+    return render(request, 'inventory/reagent_list.html', context)
 
 
 @login_required
 def reagent_create(request):
     """Create new reagent."""
     if request.method == 'POST':
-        reagent = Reagent.objects.create(
-            name=request.POST['name'],
-            catalog_number=request.POST['catalog_number'],
-            manufacturer=request.POST['manufacturer'],
-            lot_number=request.POST['lot_number'],
-            quantity=request.POST['quantity'],
-            unit=request.POST['unit'],
-            minimum_quantity=request.POST['minimum_quantity'],
-            expiry_date=request.POST['expiry_date'],
-            storage_location=request.POST['storage_location'],
-            hazard_class=request.POST.get('hazard_class', ''),
-            notes=request.POST.get('notes', '')
-        )
+        with transaction.atomic():
+            reagent = Reagent.objects.create(
+                name=request.POST['name'],
+                catalog_number=request.POST['catalog_number'],
+                manufacturer=request.POST['manufacturer'],
+                lot_number=request.POST['lot_number'],
+                quantity=0,
+                unit=request.POST['unit'],
+                minimum_quantity=request.POST['minimum_quantity'],
+                expiry_date=request.POST['expiry_date'],
+                storage_location=request.POST['storage_location'],
+                hazard_class=request.POST.get('hazard_class', ''),
+                notes=request.POST.get('notes', '')
+            )
+            receive_lot(reagent, reagent.lot_number, request.POST['quantity'], reagent.expiry_date,
+                        user=request.user, reason='Opening stock')
         messages.success(request, 'Reagent added successfully.')
         return redirect('inventory:reagent_list')
     
@@ -74,53 +84,100 @@ def reagent_edit(request, pk):
         reagent.name = request.POST['name']
         reagent.catalog_number = request.POST['catalog_number']
         reagent.manufacturer = request.POST['manufacturer']
-        reagent.lot_number = request.POST['lot_number']
-        reagent.quantity = request.POST['quantity']
         reagent.unit = request.POST['unit']
         reagent.minimum_quantity = request.POST['minimum_quantity']
-        reagent.expiry_date = request.POST['expiry_date']
         reagent.storage_location = request.POST['storage_location']
         reagent.hazard_class = request.POST.get('hazard_class', '')
         reagent.notes = request.POST.get('notes', '')
-        reagent.save()
+        
+        # Lot, quantity and expiry edits apply to the named lot; the
+        # reagent's own copies of them are maintained from its lots.
+        lot_number = request.POST['lot_number']
+        expiry_date = request.POST['expiry_date']
+        change = Decimal(request.POST['quantity']) - reagent.quantity
+        try:
+            with transaction.atomic():
+                reagent.save(update_fields=[
+                    'name', 'catalog_number', 'manufacturer', 'unit', 'minimum_quantity',
+                    'storage_location', 'hazard_class', 'notes', 'updated_at',
+                ])
+                if change or lot_number != reagent.lot_number or expiry_date != reagent.expiry_date.isoformat():
+                    adjust_lot(reagent, lot_number, change, expiry_date=expiry_date, user=request.user)
+        except InsufficientStock as e:
+            messages.error(request, f'{e}. Adjust the other lots from the Lots page.')
+            return render(request, 'inventory/reagent_form.html', {'reagent': reagent, 'action': 'Edit'})
         messages.success(request, 'Reagent updated successfully.')
         return redirect('inventory:reagent_list')
     
     return render(request, 'inventory/reagent_form.html', {'reagent': reagent, 'action': 'Edit'})
 
 
+@login_required
+def reagent_lots(request, pk):
+    """List a reagent's lots, first to expire first, and receive new stock."""
+    reagent = get_object_or_404(Reagent, pk=pk)
+    
+    if request.method == 'POST':
+        if not request.user.has_permission('can_manage_inventory'):
+            messages.error(request, 'You do not have permission to receive stock.')
+            return redirect('inventory:reagent_lots', pk=pk)
+        try:
+            quantity = Decimal(request.POST['quantity'])
+            receive_lot(reagent, request.POST['lot_number'].strip(), quantity, request.POST['expiry_date'],
+                        user=request.user)
+        except (ArithmeticError, ValueError, KeyError) as e:
+            messages.error(request, f'Could not receive lot: {e}')
+        else:
+            messages.success(request, f'Received {quantity} {reagent.unit} of lot {request.POST["lot_number"]}.')
+        return redirect('inventory:reagent_lots', pk=pk)
+    
+    context = {
+        'reagent': reagent,
+        'lots': reagent.lots.order_by('expiry_date', 'id'),
+    }
+    
+    return render(request, 'inventory/reagent_lots.html', context)
+
+
 @login_required
 def stock_list(request):
     """List all stock items."""
-    items = StockItem.objects.all()
+    from django.core.paginator import Paginator
+    from .search import search as search_items
     
     search = request.GET.get('search', '')
-    if search:
-        from django.db.models import Q
-        items = items.filter(
-            Q(name__icontains=search) |
-            Q(item_code__icontains=search) |
-            Q(category__icontains=search)
-        )
+    items = search_items('stock_item', StockItem.objects.order_by('name', 'id'), search)
+    
+    # Pagination
+    paginator = Paginator(items, 50)
+    page_obj = paginator.get_page(request.GET.get('page'))
     
-    return render(request, 'inventory/stock_list.html', {'items': items})
+    context = {
+        'items': page_obj,
+        'page_obj': page_obj,
+        'search': search,
+    }
+    
+    return render(request, 'inventory/stock_list.html', context)
 
 
 @login_required
 def stock_create(request):
     """Create new stock item."""
     if request.method == 'POST':
-        item = StockItem.objects.create(
-            name=request.POST['name'],
-            item_code=request.POST['item_code'],
-            category=request.POST['category'],
-            quantity=request.POST['quantity'],
-            unit=request.POST['unit'],
-            minimum_quantity=request.POST['minimum_quantity'],
-            supplier=request.POST.get('supplier', ''),
-            cost_per_unit=request.POST.get('cost_per_unit') or None,
-            notes=request.POST.get('notes', '')
-        )
+        with transaction.atomic():
+            item = StockItem.objects.create(
+                name=request.POST['name'],
+                item_code=request.POST['item_code'],
+                category=request.POST['category'],
+                quantity=request.POST['quantity'],
+                unit=request.POST['unit'],
+                minimum_quantity=request.POST['minimum_quantity'],
+                supplier=request.POST.get('supplier', ''),
+                cost_per_unit=request.POST.get('cost_per_unit') or None,
+                notes=request.POST.get('notes', '')
+            )
+            _record_quantity_change(item, Decimal('0'), request.user, 'in', 'Opening stock')
         messages.success(request, 'Stock item added successfully.')
         return redirect('inventory:stock_list')
     
@@ -133,6 +190,8 @@ def stock_edit(request, pk):
     item = get_object_or_404(StockItem, pk=pk)
     
     if request.method == 'POST':
+        previous_quantity = item.quantity
+        previous_cost = item.cost_per_unit or Decimal('0')
         item.name = request.POST['name']
         item.item_code = request.POST['item_code']
         item.category = request.POST['category']
@@ -142,7 +201,13 @@ def stock_edit(request, pk):
         item.supplier = request.POST.get('supplier', '')
         item.cost_per_unit = request.POST.get('cost_per_unit') or None
         item.notes = request.POST.get('notes', '')
-        item.save()
+        with transaction.atomic():
+            item.save()
+            # Revalue the stock already held before recording the quantity change.
+            cost_change = Decimal(str(item.cost_per_unit or 0)) - previous_cost
+            if cost_change:
+                apply_valuation_change(stock_value=previous_quantity * cost_change)
+            _record_quantity_change(item, previous_quantity, request.user)
         messages.success(request, 'Stock item updated successfully.')
         return redirect('inventory:stock_list')
     
@@ -151,29 +216,192 @@ def stock_edit(request, pk):
 
 @login_required
 def transaction_list(request):
-    """List inventory transactions."""
-    transactions = InventoryTransaction.objects.select_related(
-        'reagent', 'stock_item', 'performed_by'
-    ).order_by('-transaction_date')[:100]
+    """List inventory transactions, newest first, with filters and keyset pagination."""
+    from results.listing import filter_query
+    from users.models import User
+    from .listing import apply_filters, get_filters, running_balances, transaction_page
+    
+    filters = get_filters(request.GET)
+    transactions = apply_filters(InventoryTransaction.objects.all(), filters)
+    page = transaction_page(
+        transactions.select_related('reagent', 'stock_item', 'lot', 'performed_by'),
+        after=request.GET.get('after'),
+        before=request.GET.get('before')
+    )
+    balances = running_balances(page['items'])
+    for trans in page['items']:
+        trans.balance = balances.get(trans.id)
+    
+    context = {
+        'transactions': page['items'],
+        'page': page,
+        'filters': filters,
+        'query': filter_query(request.GET),
+        'transaction_types': InventoryTransaction.TRANSACTION_TYPE_CHOICES,
+        'reagents': Reagent.objects.order_by('name').values_list('id', 'name'),
+        'stock_items': StockItem.objects.order_by('name').values_list('id', 'name'),
+        'users': User.objects.filter(is_active=True).order_by('first_name', 'last_name', 'username'),
+    }
     
-    return render(request, 'inventory/transaction_list.html', {'transactions': transactions})
+    return render(request, 'inventory/transaction_list.html', context)
 
 
 @login_required
-def low_stock_alerts(request):
-    """Show low stock and expiring items."""
-    from django.db.models import F
+def export_transactions(request):
+    """Stream the transactions matching the list filters as CSV."""
+    from django.http import StreamingHttpResponse
+    from .listing import export_queryset, get_filters, stream_csv
+    
+    response = StreamingHttpResponse(
+        stream_csv(export_queryset(get_filters(request.GET))), content_type='text/csv'
+    )
+    response['Content-Disposition'] = 'attachment; filename="inventory_transactions.csv"'
+    return response
+
+
+@login_required
+def scan_batch(request):
+    """
+    JSON API for barcode scanners: apply a batch of stock movements.
+    
+    POST {"movements": [{"key": ..., "code": ..., "type": "in"|"out",
+    "quantity": ..., "lot_number": ..., "expiry_date": ..., "reason": ...}]}.
+    Retrying a batch with the same keys does not apply it twice.
+    """
+    import json
+    from django.http import JsonResponse
+    from .lots import InsufficientStock
+    from .scanning import ScanConflict, apply_scan_batch, parse_movements
+    
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'error': 'POST required'}, status=405)
+    if not request.user.has_permission('can_manage_inventory'):
+        return JsonResponse({'success': False, 'error': 'Permission denied'}, status=403)
+    try:
+        payload = json.loads(request.body)
+    except (ValueError, UnicodeDecodeError):
+        return JsonResponse({'success': False, 'error': 'Request body must be JSON'}, status=400)
+    if not isinstance(payload, dict):
+        return JsonResponse({'success': False, 'error': 'Request body must be a JSON object'}, status=400)
+    try:
+        movements = parse_movements(payload.get('movements'))
+        applied, duplicates = apply_scan_batch(movements, user=request.user)
+    except (InsufficientStock, ScanConflict) as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=409)
+    except ValueError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+    
+    return JsonResponse({'success': True, 'applied': applied, 'duplicates': duplicates})
+
+
+@login_required
+def autocomplete(request):
+    """
+    JSON suggestions for the reagent and stock item search boxes.
     
-    low_reagents = Reagent.objects.filter(quantity__lte=F('minimum_quantity'))
-    low_stock = StockItem.objects.filter(quantity__lte=F('minimum_quantity'))
-    expiring = Reagent.objects.filter(
-        expiry_date__lte=date.today() + timedelta(days=30)
-    ).order_by('expiry_date')
+    GET ?q=<text>&type=reagent|stock_item (both kinds when type is omitted).
+    """
+    from django.http import JsonResponse
+    from .search import SEARCH_FIELDS, autocomplete as suggest
     
+    kind = request.GET.get('type', '')
+    if kind and kind not in SEARCH_FIELDS:
+        return JsonResponse({'success': False, 'error': 'Unknown type'}, status=400)
+    kinds = (kind,) if kind else tuple(SEARCH_FIELDS)
+    
+    return JsonResponse({'success': True, 'results': suggest(request.GET.get('q', ''), kinds=kinds)})
+
+
+@login_required
+def inventory_valuation(request):
+    """Current inventory value and its daily history."""
+    days = request.GET.get('days', '')
+    history = get_valuation_history(days=min(int(days), 366) if days.isdigit() and int(days) else 30)
+    
+    context = {
+        'valuation': get_current_valuation(),
+        'history': list(reversed(history)),
+    }
+    
+    return render(request, 'inventory/valuation.html', context)
+
+
+@login_required
+def reorder_forecast(request):
+    """Forecast consumption, days of stock left and reorder suggestions for all reagents."""
+    from django.conf import settings
+    from .forecast import get_forecasts
+    
+    forecasts = get_forecasts()
+    if request.GET.get('reorder') == '1':
+        forecasts = [f for f in forecasts if f.needs_reorder]
+    
+    context = {
+        'forecasts': forecasts,
+        'reorder_only': request.GET.get('reorder') == '1',
+        'lead_days': settings.INVENTORY_REORDER_LEAD_DAYS,
+        'cover_days': settings.INVENTORY_REORDER_COVER_DAYS,
+    }
+    
+    return render(request, 'inventory/reorder_forecast.html', context)
+
+
+@login_required
+def budget_status(request):
+    """Monthly and yearly budget status for all active cost centers."""
+    from django.utils import timezone
+    from .utils import get_portfolio_budget_status
+    
+    today = timezone.localdate()
+    year = request.GET.get('year', '')
+    month = request.GET.get('month', '')
+    year = int(year) if year.isdigit() and 2000 <= int(year) <= 2100 else today.year
+    month = int(month) if month.isdigit() and 1 <= int(month) <= 12 else today.month
+    project = request.GET.get('project') == '1'
+    
+    context = {
+        'centers': get_portfolio_budget_status(year, month, project=project),
+        'year': year,
+        'month': month,
+        'months': range(1, 13),
+        'project': project,
+    }
+    
+    return render(request, 'inventory/budget_status.html', context)
+
+
+@login_required
+def low_stock_alerts(request):
+    """Show low stock and expiring items from the open alerts."""
+    from .alerts import get_open_alerts
+    
+    alerts = list(get_open_alerts())
     context = {
-        'low_reagents': low_reagents,
-        'low_stock': low_stock,
-        'expiring': expiring,
+        'low_stock_reagents': [a for a in alerts if a.alert_type == 'low_stock' and a.reagent_id],
+        'low_stock_items': [a for a in alerts if a.alert_type == 'low_stock' and a.stock_item_id],
+        'expiring': sorted((a for a in alerts if a.alert_type != 'low_stock'), key=lambda a: a.expiry_date),
     }
     
     return render(request, 'inventory/low_stock_alerts.html', context)
+
+
+def _record_quantity_change(item, previous_quantity, user, transaction_type='adjustment',
+                            reason='Manual quantity edit'):
+    """
+    Record a form edit of a stock item's quantity as an inventory transaction.
+    
+    Adjustments store the signed change; the transaction also moves the
+    valuation snapshot (see inventory.signals). Reagent quantities are
+    changed through their lots instead (inventory.lots).
+    """
+    change = Decimal(str(item.quantity)) - Decimal(str(previous_quantity))
+    if not change:
+        return None
+    return InventoryTransaction.objects.create(
+        transaction_type=transaction_type,
+        stock_item=item,
+        quantity=change,
+        unit_cost=Decimal(str(item.cost_per_unit)) if item.cost_per_unit else None,
+        reason=reason,
+        performed_by=user
+    )
@@ -40,6 +40,7 @@ INSTALLED_APPS = [
     'results.apps.ResultsConfig',
     'inventory.apps.InventoryConfig',
     'instruments.apps.InstrumentsConfig',
+    'qc.apps.QcConfig',
     'reports.apps.ReportsConfig',
     'audit.apps.AuditConfig',
     'users.apps.UsersConfig',
@@ -100,6 +101,47 @@ else:
     }
 
 
+# Cache
+# The test catalog, inventory forecasts and search autocomplete keep version
+# stamps here that every web and worker process must see, so the default is
+# the database (the table is created by migrations). Redis or Memcached can be
+# configured instead; a per-process backend such as LocMemCache is flagged by
+# a system check.
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.db.DatabaseCache'),
+        'LOCATION': config('CACHE_LOCATION', default='lims_cache'),
+    }
+}
+
+# Seconds a worker may keep its test catalog before re-checking the database,
+# even if no version bump has been seen.
+TEST_CATALOG_MAX_AGE = config('TEST_CATALOG_MAX_AGE', default=300, cast=int)
+
+# Days of completed assignments used to measure per-test throughput for
+# queue-aware expected completion estimates.
+COMPLETION_ESTIMATE_WINDOW_DAYS = config('COMPLETION_ESTIMATE_WINDOW_DAYS', default=14, cast=int)
+
+# Processes rendering PDF result reports, and how long a download waits for
+# a report that is not cached yet.
+REPORT_PDF_WORKERS = config('REPORT_PDF_WORKERS', default=2, cast=int)
+REPORT_PDF_TIMEOUT = config('REPORT_PDF_TIMEOUT', default=30, cast=int)
+
+# Reagents expiring within this many days raise an inventory alert.
+INVENTORY_EXPIRY_WARNING_DAYS = config('INVENTORY_EXPIRY_WARNING_DAYS', default=30, cast=int)
+
+# Reagent consumption forecasts: days of history smoothed, supplier lead
+# time, days of use each order should cover, and the service-level z
+# score used for safety stock.
+INVENTORY_FORECAST_HISTORY_DAYS = config('INVENTORY_FORECAST_HISTORY_DAYS', default=182, cast=int)
+INVENTORY_REORDER_LEAD_DAYS = config('INVENTORY_REORDER_LEAD_DAYS', default=14, cast=int)
+INVENTORY_REORDER_COVER_DAYS = config('INVENTORY_REORDER_COVER_DAYS', default=30, cast=int)
+INVENTORY_SERVICE_LEVEL_Z = config('INVENTORY_SERVICE_LEVEL_Z', default=1.65, cast=float)
+
+# Days of QC history used for Westgard rules and control mean/SD statistics.
+QC_LOOKBACK_DAYS = config('QC_LOOKBACK_DAYS', default=90, cast=int)
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
@@ -14,6 +14,7 @@ urlpatterns = [
     path('results/', include('results.urls')),
     path('inventory/', include('inventory.urls')),
     path('instruments/', include('instruments.urls')),
+    path('qc/', include('qc.urls')),
     path('reports/', include('reports.urls')),
     path('audit/', include('audit.urls')),
     path('auth/', include('users.urls')),
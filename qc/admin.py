@@ -0,0 +1,38 @@
+from django.contrib import admin
+from .models import ControlMaterial, ControlTarget, QCRun, QCResult
+
+
+class ControlTargetInline(admin.TabularInline):
+    model = ControlTarget
+    extra = 0
+    readonly_fields = ['mean', 'sd', 'n', 'stats_updated_at']
+
+
+class QCResultInline(admin.TabularInline):
+    model = QCResult
+    extra = 0
+    readonly_fields = ['measured_at', 'z_score', 'violations', 'is_rejected']
+
+
+@admin.register(ControlMaterial)
+class ControlMaterialAdmin(admin.ModelAdmin):
+    list_display = ['name', 'level', 'lot_number', 'manufacturer', 'expiry_date', 'is_active']
+    list_filter = ['is_active', 'manufacturer']
+    search_fields = ['name', 'lot_number']
+    inlines = [ControlTargetInline]
+
+
+@admin.register(ControlTarget)
+class ControlTargetAdmin(admin.ModelAdmin):
+    list_display = ['material', 'parameter', 'target_mean', 'target_sd', 'mean', 'sd', 'n']
+    list_filter = ['material']
+    search_fields = ['material__name', 'parameter__name']
+    readonly_fields = ['mean', 'sd', 'n', 'stats_updated_at']
+
+
+@admin.register(QCRun)
+class QCRunAdmin(admin.ModelAdmin):
+    list_display = ['test', 'instrument', 'run_date', 'status', 'performed_by']
+    list_filter = ['status', 'test']
+    readonly_fields = ['status']
+    inlines = [QCResultInline]
@@ -0,0 +1,27 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from qc.models import QCRun
+from qc.utils import evaluate_runs, refresh_target_statistics
+
+
+class Command(BaseCommand):
+    help = 'Re-evaluate Westgard rules for recent QC runs and refresh control statistics.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=1,
+            help='Evaluate runs from the last N days (default: 1).',
+        )
+
+    def handle(self, *args, **options):
+        since = timezone.now() - timedelta(days=options['days'])
+        run_ids = list(QCRun.objects.filter(run_date__gte=since).values_list('id', flat=True))
+        refresh_target_statistics()
+        counts = evaluate_runs(run_ids)
+        summary = ', '.join(f'{count} {status}' for status, count in sorted(counts.items())) or 'none'
+        self.stdout.write(self.style.SUCCESS(f'Evaluated {len(run_ids)} QC run(s): {summary}.'))
@@ -0,0 +1,233 @@
+# Generated by Django 4.2.30 on 2026-10-19 07:35
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("instruments", "0003_instrumentborrowing"),
+        ("tests", "0009_testparameter_delta_absolute_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ControlMaterial",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=200)),
+                (
+                    "level",
+                    models.CharField(
+                        blank=True,
+                        help_text='e.g., "Level 1", "Low", "High"',
+                        max_length=50,
+                    ),
+                ),
+                ("lot_number", models.CharField(max_length=100)),
+                ("manufacturer", models.CharField(blank=True, max_length=200)),
+                ("expiry_date", models.DateField(blank=True, null=True)),
+                ("is_active", models.BooleanField(default=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "db_table": "qc_control_materials",
+                "ordering": ["name", "level"],
+            },
+        ),
+        migrations.CreateModel(
+            name="ControlTarget",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "target_mean",
+                    models.DecimalField(
+                        blank=True,
+                        decimal_places=4,
+                        help_text="Assigned mean; leave blank to use observed runs",
+                        max_digits=15,
+                        null=True,
+                    ),
+                ),
+                (
+                    "target_sd",
+                    models.DecimalField(
+                        blank=True,
+                        decimal_places=4,
+                        help_text="Assigned SD; leave blank to use observed runs",
+                        max_digits=15,
+                        null=True,
+                    ),
+                ),
+                ("mean", models.FloatField(blank=True, null=True)),
+                ("sd", models.FloatField(blank=True, null=True)),
+                ("n", models.IntegerField(default=0)),
+                ("stats_updated_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "material",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="targets",
+                        to="qc.controlmaterial",
+                    ),
+                ),
+                (
+                    "parameter",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="qc_targets",
+                        to="tests.testparameter",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "qc_control_targets",
+                "ordering": ["parameter", "material"],
+                "unique_together": {("material", "parameter")},
+            },
+        ),
+        migrations.CreateModel(
+            name="QCRun",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "run_date",
+                    models.DateTimeField(
+                        db_index=True, default=django.utils.timezone.now
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "Pending"),
+                            ("accepted", "Accepted"),
+                            ("warning", "Accepted with Warning"),
+                            ("rejected", "Rejected"),
+                        ],
+                        default="pending",
+                        max_length=20,
+                    ),
+                ),
+                ("notes", models.TextField(blank=True)),
+                (
+                    "instrument",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="qc_runs",
+                        to="instruments.instrument",
+                    ),
+                ),
+                (
+                    "performed_by",
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="qc_runs",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "test",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="qc_runs",
+                        to="tests.test",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "qc_runs",
+                "ordering": ["-run_date"],
+            },
+        ),
+        migrations.CreateModel(
+            name="QCResult",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("value", models.DecimalField(decimal_places=4, max_digits=15)),
+                (
+                    "measured_at",
+                    models.DateTimeField(
+                        help_text="Copy of the run date, for series queries"
+                    ),
+                ),
+                ("z_score", models.FloatField(blank=True, null=True)),
+                (
+                    "violations",
+                    models.CharField(
+                        blank=True,
+                        help_text="Comma-separated Westgard rules",
+                        max_length=100,
+                    ),
+                ),
+                ("is_rejected", models.BooleanField(default=False)),
+                (
+                    "run",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="results",
+                        to="qc.qcrun",
+                    ),
+                ),
+                (
+                    "target",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="results",
+                        to="qc.controltarget",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "qc_results",
+                "indexes": [
+                    models.Index(
+                        fields=["target", "measured_at"],
+                        name="qc_results_target__e3d723_idx",
+                    )
+                ],
+                "unique_together": {("run", "target")},
+            },
+        ),
+    ]
@@ -0,0 +1,120 @@
+from django.db import models
+from django.conf import settings
+from django.utils import timezone
+from tests.models import Test, TestParameter
+
+
+class ControlMaterial(models.Model):
+    """A control material lot (e.g. a level 1 chemistry control)."""
+    name = models.CharField(max_length=200)
+    level = models.CharField(max_length=50, blank=True, help_text='e.g., "Level 1", "Low", "High"')
+    lot_number = models.CharField(max_length=100)
+    manufacturer = models.CharField(max_length=200, blank=True)
+    expiry_date = models.DateField(null=True, blank=True)
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"{self.name} {self.level} (Lot {self.lot_number})".replace('  ', ' ')
+    
+    class Meta:
+        db_table = 'qc_control_materials'
+        ordering = ['name', 'level']
+
+
+class ControlTarget(models.Model):
+    """
+    Expected mean and SD of a control material for one parameter.
+    
+    Assigned values (target_mean/target_sd) take precedence; otherwise the
+    cached statistics of recent accepted runs are used.
+    """
+    material = models.ForeignKey(ControlMaterial, on_delete=models.CASCADE, related_name='targets')
+    parameter = models.ForeignKey(TestParameter, on_delete=models.CASCADE, related_name='qc_targets')
+    target_mean = models.DecimalField(max_digits=15, decimal_places=4, null=True, blank=True,
+                                      help_text='Assigned mean; leave blank to use observed runs')
+    target_sd = models.DecimalField(max_digits=15, decimal_places=4, null=True, blank=True,
+                                    help_text='Assigned SD; leave blank to use observed runs')
+    
+    # Cached statistics of recent accepted results
+    mean = models.FloatField(null=True, blank=True)
+    sd = models.FloatField(null=True, blank=True)
+    n = models.IntegerField(default=0)
+    stats_updated_at = models.DateTimeField(null=True, blank=True)
+    
+    def __str__(self):
+        return f"{self.material} - {self.parameter.name}"
+    
+    @property
+    def effective_mean(self):
+        return float(self.target_mean) if self.target_mean is not None else self.mean
+    
+    @property
+    def effective_sd(self):
+        return float(self.target_sd) if self.target_sd is not None else self.sd
+    
+    class Meta:
+        db_table = 'qc_control_targets'
+        unique_together = ['material', 'parameter']
+        ordering = ['parameter', 'material']
+
+
+class QCRun(models.Model):
+    """One analytical run of control materials for a test."""
+    
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('accepted', 'Accepted'),
+        ('warning', 'Accepted with Warning'),
+        ('rejected', 'Rejected'),
+    ]
+    
+    test = models.ForeignKey(Test, on_delete=models.CASCADE, related_name='qc_runs')
+    instrument = models.ForeignKey(
+        'instruments.Instrument',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='qc_runs'
+    )
+    run_date = models.DateTimeField(default=timezone.now, db_index=True)
+    performed_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='qc_runs'
+    )
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    notes = models.TextField(blank=True)
+    
+    def __str__(self):
+        return f"QC {self.test.code} {self.run_date:%Y-%m-%d %H:%M} ({self.get_status_display()})"
+    
+    @property
+    def blocks_release(self):
+        return self.status == 'rejected'
+    
+    class Meta:
+        db_table = 'qc_runs'
+        ordering = ['-run_date']
+
+
+class QCResult(models.Model):
+    """A control value measured in a run, with its Westgard evaluation."""
+    run = models.ForeignKey(QCRun, on_delete=models.CASCADE, related_name='results')
+    target = models.ForeignKey(ControlTarget, on_delete=models.CASCADE, related_name='results')
+    value = models.DecimalField(max_digits=15, decimal_places=4)
+    measured_at = models.DateTimeField(help_text='Copy of the run date, for series queries')
+    z_score = models.FloatField(null=True, blank=True)
+    violations = models.CharField(max_length=100, blank=True, help_text='Comma-separated Westgard rules')
+    is_rejected = models.BooleanField(default=False)
+    
+    def __str__(self):
+        return f"{self.target}: {self.value}"
+    
+    class Meta:
+        db_table = 'qc_results'
+        unique_together = ['run', 'target']
+        indexes = [
+            models.Index(fields=['target', 'measured_at']),
+        ]
@@ -0,0 +1,215 @@
+from datetime import timedelta
+from decimal import Decimal
+
+import numpy as np
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from . import westgard
+
+
+def _evaluate(z, starts=None, groups=None):
+    """Evaluate one control series whose points are all in different runs, unless given."""
+    z = np.array(z, dtype=np.float64)
+    if starts is None:
+        starts = np.zeros(len(z), dtype=bool)
+        starts[:1] = True
+    if groups is None:
+        groups = np.arange(len(z))
+    return westgard.evaluate(z, starts, groups)
+
+
+def _violated(violations, index):
+    return {rule for rule in westgard.RULES if violations[rule][index]}
+
+
+class StreakLengthTests(SimpleTestCase):
+
+    def test_counts_consecutive_true_values(self):
+        lengths = westgard.streak_lengths([True, True, False, True, True, True], [True] + [False] * 5)
+        self.assertEqual(lengths.tolist(), [1, 2, 0, 1, 2, 3])
+
+    def test_resets_at_series_start(self):
+        lengths = westgard.streak_lengths([True, True, True, True], [True, False, True, False])
+        self.assertEqual(lengths.tolist(), [1, 2, 1, 2])
+
+    def test_empty(self):
+        self.assertEqual(westgard.streak_lengths([], []).tolist(), [])
+
+
+class WestgardRuleTests(SimpleTestCase):
+
+    def test_in_control_values_violate_nothing(self):
+        violations = _evaluate([0.5, -1.0, 1.5, -1.9])
+        for i in range(4):
+            self.assertEqual(_violated(violations, i), set())
+        self.assertFalse(westgard.rejected(violations).any())
+
+    def test_1_2s_is_a_warning_only(self):
+        violations = _evaluate([0.0, 2.5])
+        self.assertEqual(_violated(violations, 1), {westgard.RULE_1_2S})
+        self.assertFalse(westgard.rejected(violations)[1])
+
+    def test_1_3s_rejects(self):
+        violations = _evaluate([0.0, -3.2])
+        self.assertIn(westgard.RULE_1_3S, _violated(violations, 1))
+        self.assertTrue(westgard.rejected(violations)[1])
+
+    def test_2_2s_across_runs(self):
+        violations = _evaluate([2.1, 2.4])
+        self.assertNotIn(westgard.RULE_2_2S, _violated(violations, 0))
+        self.assertIn(westgard.RULE_2_2S, _violated(violations, 1))
+        self.assertTrue(westgard.rejected(violations)[1])
+
+    def test_2_2s_needs_the_same_side(self):
+        violations = _evaluate([2.1, -2.4])
+        self.assertNotIn(westgard.RULE_2_2S, _violated(violations, 1))
+
+    def test_2_2s_does_not_span_series(self):
+        violations = _evaluate([2.1, 2.4], starts=[True, True])
+        self.assertNotIn(westgard.RULE_2_2S, _violated(violations, 1))
+
+    def test_4_1s(self):
+        violations = _evaluate([1.2, 1.5, 1.1, 1.3])
+        self.assertNotIn(westgard.RULE_4_1S, _violated(violations, 2))
+        self.assertIn(westgard.RULE_4_1S, _violated(violations, 3))
+
+        violations = _evaluate([1.2, 1.5, 0.5, 1.3])
+        self.assertNotIn(westgard.RULE_4_1S, _violated(violations, 3))
+
+    def test_10x(self):
+        violations = _evaluate([-0.4] * 10)
+        self.assertNotIn(westgard.RULE_10X, _violated(violations, 8))
+        self.assertIn(westgard.RULE_10X, _violated(violations, 9))
+
+        violations = _evaluate([-0.4] * 5 + [0.4] + [-0.4] * 4)
+        self.assertNotIn(westgard.RULE_10X, _violated(violations, 9))
+
+    def test_history_of_one_series_is_independent_of_another(self):
+        # Two series back to back: the second starts a new history.
+        z = [0.5] * 9 + [0.5] * 9
+        starts = [True] + [False] * 8 + [True] + [False] * 8
+        violations = _evaluate(z, starts=starts)
+        self.assertFalse(violations[westgard.RULE_10X].any())
+
+    def test_r_4s_within_a_run(self):
+        # Two materials of the same parameter measured in the same run.
+        violations = _evaluate([2.5, -2.3], starts=[True, True], groups=[7, 7])
+        self.assertIn(westgard.RULE_R_4S, _violated(violations, 0))
+        self.assertIn(westgard.RULE_R_4S, _violated(violations, 1))
+        self.assertTrue(westgard.rejected(violations).all())
+
+    def test_r_4s_not_across_runs(self):
+        violations = _evaluate([2.5, -2.3], starts=[True, True], groups=[7, 8])
+        self.assertFalse(violations[westgard.RULE_R_4S].any())
+        self.assertFalse(westgard.rejected(violations).any())
+
+    def test_2_2s_across_materials_within_a_run(self):
+        violations = _evaluate([2.2, 2.6], starts=[True, True], groups=[3, 3])
+        self.assertIn(westgard.RULE_2_2S, _violated(violations, 0))
+        self.assertIn(westgard.RULE_2_2S, _violated(violations, 1))
+
+    def test_unknown_z_scores_never_violate(self):
+        violations = _evaluate([np.nan, np.nan, 2.5], groups=[1, 1, 2])
+        self.assertEqual(_violated(violations, 0), set())
+        self.assertEqual(_violated(violations, 1), set())
+        self.assertEqual(_violated(violations, 2), {westgard.RULE_1_2S})
+
+    def test_empty_batch(self):
+        violations = _evaluate([])
+        self.assertEqual(set(violations), set(westgard.RULES))
+        self.assertEqual(len(westgard.rejected(violations)), 0)
+
+    def test_describe(self):
+        violations = _evaluate([2.1, 3.4])
+        self.assertEqual(westgard.describe(violations, 1), '1-2s,1-3s,2-2s')
+
+
+class QCReleaseTests(TestCase):
+    """QC runs evaluated over history, and their effect on result release."""
+
+    @classmethod
+    def setUpTestData(cls):
+        from samples.models import Sample
+        from tests.models import Test, TestAssignment, TestParameter
+        from users.models import User
+        from .models import ControlMaterial, ControlTarget
+
+        cls.user = User.objects.create_superuser('reviewer', 'reviewer@example.com', 'password')
+        cls.test = Test.objects.create(name='Glucose', code='GLU', category='biochemistry', turnaround_time=4)
+        cls.parameter = TestParameter.objects.create(test=cls.test, name='Glucose', code='GLU', unit='mmol/L')
+        material = ControlMaterial.objects.create(name='Chem control', level='Level 1', lot_number='C1')
+        cls.target = ControlTarget.objects.create(
+            material=material, parameter=cls.parameter, target_mean=Decimal('100'), target_sd=Decimal('1')
+        )
+        cls.assignments = [
+            TestAssignment.objects.create(
+                sample=Sample.objects.create(sample_id=f'QC-S{i}', sample_type='blood'), test=cls.test
+            )
+            for i in range(3)
+        ]
+
+    def _run(self, value, hours_ago=0):
+        from .utils import record_qc_run
+
+        return record_qc_run(
+            self.test.id, {self.target.id: Decimal(value)}, user=self.user,
+            run_date=timezone.now() - timedelta(hours=hours_ago)
+        )
+
+    def _submit(self, assignments, qc_run_id=None):
+        from results.models import TestResult
+        from results.utils import save_worklist_results
+
+        entries = {a.id: {self.parameter.id: {'value_numeric': Decimal('5.0')}} for a in assignments}
+        with self.captureOnCommitCallbacks(execute=True):
+            save_worklist_results(self.test.id, entries, self.user, submit=True, qc_run_id=qc_run_id)
+        return list(
+            TestResult.objects.filter(test_assignment__in=assignments).order_by('id').values_list('id', flat=True)
+        )
+
+    def test_rules_use_history_across_runs(self):
+        self.assertEqual(self._run('102.5', hours_ago=2).status, 'warning')
+        run = self._run('102.4', hours_ago=1)
+        self.assertEqual(run.status, 'rejected')
+        self.assertIn(westgard.RULE_2_2S, run.results.get().violations.split(','))
+
+    def test_results_link_to_the_latest_run_whatever_its_status(self):
+        self._run('100.2', hours_ago=2)
+        rejected = self._run('104', hours_ago=1)
+        self.assertEqual(rejected.status, 'rejected')
+
+        result_ids = self._submit(self.assignments[:1])
+
+        from results.models import TestResult
+        self.assertEqual(TestResult.objects.get(id=result_ids[0]).qc_run_id, rejected.id)
+
+    def test_bulk_review_blocks_results_of_a_rejected_run(self):
+        from results.review import review_results_bulk
+
+        accepted = self._run('100.3', hours_ago=2)
+        rejected = self._run('96', hours_ago=1)
+        passed = self._submit(self.assignments[:1], qc_run_id=accepted.id)
+        blocked = self._submit(self.assignments[1:])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            outcome = review_results_bulk(passed + blocked, approve=True, user=self.user)
+
+        self.assertEqual(outcome['reviewed'], passed)
+        self.assertEqual(sorted(outcome['blocked']), blocked)
+
+        from results.models import TestResult
+        self.assertEqual(
+            set(TestResult.objects.filter(id__in=blocked).values_list('status', flat=True)), {'pending_review'}
+        )
+        self.assertEqual(rejected.patient_results.count(), 2)
+
+    def test_rejecting_results_of_a_rejected_run_is_allowed(self):
+        from results.review import review_results_bulk
+
+        self._run('104')
+        result_ids = self._submit(self.assignments[:1])
+        with self.captureOnCommitCallbacks(execute=True):
+            outcome = review_results_bulk(result_ids, approve=False, user=self.user)
+        self.assertEqual(outcome['reviewed'], result_ids)
+        self.assertEqual(outcome['blocked'], [])
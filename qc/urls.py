@@ -0,0 +1,11 @@
+from django.urls import path
+from . import views
+
+app_name = 'qc'
+
+urlpatterns = [
+    path('', views.qc_dashboard, name='qc_dashboard'),
+    path('record/<int:test_id>/', views.record_run, name='record_run'),
+    path('runs/<int:pk>/', views.run_detail, name='run_detail'),
+    path('chart/<int:target_id>/', views.levey_jennings, name='levey_jennings'),
+]
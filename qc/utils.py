@@ -0,0 +1,223 @@
+"""Recording and Westgard evaluation of QC runs."""
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+
+from . import westgard
+
+
+BATCH_SIZE = 500
+
+
+def _lookback():
+    """History considered for rules and statistics (10x needs nine earlier points)."""
+    return timedelta(days=getattr(settings, 'QC_LOOKBACK_DAYS', 90))
+
+
+def refresh_target_statistics(target_ids=None, exclude_run_ids=()):
+    """
+    Recompute the cached mean/SD of control targets from accepted results.
+    
+    One grouped aggregate query (count, sum and sum of squares) covers all
+    targets; rejected results and results older than QC_LOOKBACK_DAYS are
+    left out.
+    
+    Args:
+        target_ids: Optional iterable of ControlTarget primary keys (all if None)
+        exclude_run_ids: QCRun primary keys to leave out (runs being evaluated)
+    
+    Returns:
+        Number of targets updated
+    """
+    from .models import ControlTarget, QCResult
+    
+    targets = ControlTarget.objects.all()
+    if target_ids is not None:
+        targets = targets.filter(id__in=list(target_ids))
+    targets = list(targets.only('id'))
+    if not targets:
+        return 0
+    
+    stats = {
+        row['target_id']: row
+        for row in QCResult.objects.filter(
+            target_id__in=[t.id for t in targets],
+            is_rejected=False,
+            measured_at__gte=timezone.now() - _lookback()
+        ).exclude(run_id__in=list(exclude_run_ids)).order_by().values('target_id').annotate(
+            n=Count('id'), total=Sum('value'), squares=Sum(F('value') * F('value'))
+        )
+    }
+    
+    now = timezone.now()
+    for target in targets:
+        row = stats.get(target.id)
+        n = row['n'] if row else 0
+        target.n = n
+        target.mean = float(row['total']) / n if n else None
+        target.sd = None
+        if n > 1:
+            variance = (float(row['squares']) - n * target.mean ** 2) / (n - 1)
+            # A zero SD cannot produce z-scores.
+            target.sd = float(np.sqrt(variance)) if variance > 0 else None
+        target.stats_updated_at = now
+    ControlTarget.objects.bulk_update(targets, ['mean', 'sd', 'n', 'stats_updated_at'], batch_size=BATCH_SIZE)
+    return len(targets)
+
+
+def record_qc_run(test_id, values, user=None, instrument_id=None, run_date=None, notes=''):
+    """
+    Store a QC run and evaluate it immediately.
+    
+    Args:
+        test_id: Test primary key
+        values: Dictionary of ControlTarget id to measured value
+        user: User who performed the run
+        instrument_id: Optional Instrument primary key
+        run_date: Optional run datetime (defaults to now)
+        notes: Optional notes
+    
+    Returns:
+        The evaluated QCRun
+    """
+    from .models import QCResult, QCRun
+    
+    run_date = run_date or timezone.now()
+    with transaction.atomic():
+        run = QCRun.objects.create(
+            test_id=test_id,
+            instrument_id=instrument_id,
+            run_date=run_date,
+            performed_by=user,
+            notes=notes
+        )
+        QCResult.objects.bulk_create([
+            QCResult(run=run, target_id=target_id, value=value, measured_at=run_date)
+            for target_id, value in values.items()
+            if value is not None
+        ], batch_size=BATCH_SIZE)
+        evaluate_runs([run.id])
+    run.refresh_from_db(fields=['status'])
+    return run
+
+
+def evaluate_runs(run_ids):
+    """
+    Evaluate the Westgard rules for many QC runs in one vectorized pass.
+    
+    The control series of every target measured in these runs is read with
+    one ordered query (earlier accepted points give the rules their
+    history), z-scores come from each target's assigned or cached mean/SD,
+    and the verdicts are written back with bulk_update and one UPDATE per
+    run status.
+    
+    Args:
+        run_ids: Iterable of QCRun primary keys
+    
+    Returns:
+        Dictionary of run status to number of runs
+    """
+    from .models import ControlTarget, QCResult, QCRun
+    
+    run_ids = list(dict.fromkeys(int(pk) for pk in run_ids))
+    runs = dict(QCRun.objects.filter(id__in=run_ids).values_list('id', 'run_date'))
+    if not runs:
+        return {}
+    
+    target_ids = set(
+        QCResult.objects.filter(run_id__in=list(runs)).values_list('target_id', flat=True)
+    )
+    targets = {t.id: t for t in ControlTarget.objects.filter(id__in=target_ids)}
+    if any(t.effective_sd is None for t in targets.values()):
+        refresh_target_statistics(
+            [t.id for t in targets.values() if t.effective_sd is None], exclude_run_ids=list(runs)
+        )
+        targets = {t.id: t for t in ControlTarget.objects.filter(id__in=target_ids)}
+    
+    rows = list(
+        QCResult.objects.filter(
+            Q(is_rejected=False) | Q(run_id__in=list(runs)),
+            target_id__in=target_ids,
+            measured_at__gte=min(runs.values()) - _lookback(),
+            measured_at__lte=max(runs.values())
+        ).order_by('target_id', 'measured_at', 'id').values_list(
+            'id', 'run_id', 'target_id', 'target__parameter_id', 'value'
+        )
+    )
+    
+    result_ids = np.array([row[0] for row in rows], dtype=np.int64)
+    run_col = np.array([row[1] for row in rows], dtype=np.int64)
+    target_col = np.array([row[2] for row in rows], dtype=np.int64)
+    parameter_col = np.array([row[3] for row in rows], dtype=np.int64)
+    values = np.array([float(row[4]) for row in rows], dtype=np.float64)
+    
+    def per_target(attribute):
+        lookup = {
+            pk: np.nan if getattr(t, attribute) is None else getattr(t, attribute)
+            for pk, t in targets.items()
+        }
+        return np.array([lookup[pk] for pk in target_col.tolist()], dtype=np.float64)
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        z = (values - per_target('effective_mean')) / per_target('effective_sd')
+    z[~np.isfinite(z)] = np.nan
+    
+    starts = np.ones(len(rows), dtype=bool)
+    starts[1:] = target_col[1:] != target_col[:-1]
+    # One group per (run, parameter) for the within-run rules.
+    groups = run_col * (int(parameter_col.max()) + 1 if len(rows) else 1) + parameter_col
+    
+    violations = westgard.evaluate(z, starts, groups)
+    is_rejected = westgard.rejected(violations)
+    
+    to_update = []
+    run_status = {pk: 'accepted' for pk in runs}
+    for i in np.flatnonzero(np.isin(run_col, list(runs))).tolist():
+        described = westgard.describe(violations, i)
+        to_update.append(QCResult(
+            id=int(result_ids[i]),
+            z_score=None if np.isnan(z[i]) else round(float(z[i]), 4),
+            violations=described,
+            is_rejected=bool(is_rejected[i]),
+        ))
+        run_id = int(run_col[i])
+        if is_rejected[i]:
+            run_status[run_id] = 'rejected'
+        elif described and run_status[run_id] == 'accepted':
+            run_status[run_id] = 'warning'
+    
+    by_status = {}
+    for run_id, status in run_status.items():
+        by_status.setdefault(status, []).append(run_id)
+    
+    with transaction.atomic():
+        QCResult.objects.bulk_update(to_update, ['z_score', 'violations', 'is_rejected'], batch_size=BATCH_SIZE)
+        for status, ids in by_status.items():
+            QCRun.objects.filter(id__in=ids).update(status=status)
+    refresh_target_statistics(target_ids)
+    
+    return {status: len(ids) for status, ids in by_status.items()}
+
+
+def get_recent_runs(test_id, hours=24):
+    """
+    QC runs of a test that patient results can be linked to, newest first.
+    
+    Runs are offered whatever their status: linking a result to a rejected
+    run is what blocks its release.
+    """
+    from .models import QCRun
+    
+    return QCRun.objects.filter(
+        test_id=test_id,
+        run_date__gte=timezone.now() - timedelta(hours=hours)
+    ).select_related('instrument').order_by('-run_date', '-id')
+
+
+def latest_run_id(test_id, hours=24):
+    """Primary key of the newest recent QC run of a test, or None."""
+    return get_recent_runs(test_id, hours).values_list('id', flat=True).first()
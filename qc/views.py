@@ -0,0 +1,175 @@
+from django.shortcuts import render, redirect, get_object_or_404
+from django.contrib.auth.decorators import login_required
+from django.contrib import messages
+from django.http import Http404
+from instruments.models import Instrument
+from tests.catalog import get_catalog
+from results.utils import parse_numeric
+from .models import ControlTarget, QCResult, QCRun
+from .utils import record_qc_run
+
+
+# Points shown on a Levey-Jennings chart
+CHART_POINTS = 30
+CHART_WIDTH = 800
+CHART_HEIGHT = 320
+
+
+@login_required
+def qc_dashboard(request):
+    """Recent QC runs and the current statistics of every control target."""
+    runs = QCRun.objects.select_related('test', 'instrument', 'performed_by')
+    
+    status_filter = request.GET.get('status', '')
+    if status_filter:
+        runs = runs.filter(status=status_filter)
+    test_filter = request.GET.get('test', '')
+    if test_filter.isdigit():
+        runs = runs.filter(test_id=int(test_filter))
+    
+    targets = ControlTarget.objects.filter(material__is_active=True).select_related(
+        'material', 'parameter__test'
+    ).order_by('parameter__test__code', 'parameter__order', 'material__level')
+    
+    context = {
+        'runs': runs[:50],
+        'targets': targets,
+        'tests': get_catalog().active_tests(),
+        'statuses': QCRun.STATUS_CHOICES,
+        'status_filter': status_filter,
+        'test_filter': test_filter,
+    }
+    
+    return render(request, 'qc/qc_dashboard.html', context)
+
+
+@login_required
+def record_run(request, test_id):
+    """Enter the control values of one QC run for a test."""
+    test = get_catalog().get(test_id)
+    if test is None:
+        raise Http404('Test not found')
+    targets = list(
+        ControlTarget.objects.filter(
+            parameter__test_id=test_id,
+            material__is_active=True
+        ).select_related('material', 'parameter').order_by('parameter__order', 'material__level')
+    )
+    
+    if request.method == 'POST':
+        if not request.user.has_permission('can_enter_results'):
+            messages.error(request, 'You do not have permission to record QC runs.')
+            return redirect('qc:qc_dashboard')
+        
+        values = {}
+        try:
+            for target in targets:
+                value = parse_numeric(request.POST.get(f'value_{target.id}', ''))
+                if value is not None:
+                    values[target.id] = value
+        except ValueError as e:
+            messages.error(request, str(e))
+            return redirect('qc:record_run', test_id=test_id)
+        if not values:
+            messages.error(request, 'Enter at least one control value.')
+            return redirect('qc:record_run', test_id=test_id)
+        
+        instrument_id = request.POST.get('instrument', '')
+        run = record_qc_run(
+            test_id, values, request.user,
+            instrument_id=int(instrument_id) if instrument_id.isdigit() else None,
+            notes=request.POST.get('notes', '')
+        )
+        if run.status == 'rejected':
+            messages.error(request, 'QC run rejected; patient results linked to it cannot be released.')
+        elif run.status == 'warning':
+            messages.warning(request, 'QC run accepted with a 1-2s warning.')
+        else:
+            messages.success(request, 'QC run accepted.')
+        return redirect('qc:run_detail', pk=run.pk)
+    
+    context = {
+        'test': test,
+        'targets': targets,
+        'instruments': Instrument.objects.filter(status='operational'),
+    }
+    
+    return render(request, 'qc/record_run.html', context)
+
+
+@login_required
+def run_detail(request, pk):
+    """Control values of a QC run with their Westgard evaluation."""
+    run = get_object_or_404(
+        QCRun.objects.select_related('test', 'instrument', 'performed_by'), pk=pk
+    )
+    results = run.results.select_related('target__material', 'target__parameter').order_by(
+        'target__parameter__order', 'target__material__level'
+    )
+    
+    context = {
+        'run': run,
+        'results': results,
+        'patient_results': run.patient_results.select_related(
+            'test_assignment__sample'
+        ).order_by('test_assignment__sample__sample_id')[:100],
+    }
+    
+    return render(request, 'qc/run_detail.html', context)
+
+
+@login_required
+def levey_jennings(request, target_id):
+    """Levey-Jennings chart of the recent control values of one target."""
+    target = get_object_or_404(
+        ControlTarget.objects.select_related('material', 'parameter__test'), pk=target_id
+    )
+    points = list(
+        QCResult.objects.filter(target=target).select_related('run').order_by('-measured_at', '-id')[:CHART_POINTS]
+    )
+    points.reverse()
+    
+    context = {
+        'target': target,
+        'points': points,
+        'chart': _chart(points, target.effective_mean, target.effective_sd),
+        'width': CHART_WIDTH,
+        'height': CHART_HEIGHT,
+    }
+    
+    return render(request, 'qc/levey_jennings.html', context)
+
+
+def _chart(points, mean, sd):
+    """SVG coordinates for a Levey-Jennings chart (None without a mean and SD)."""
+    if mean is None or not sd or not points:
+        return None
+    
+    margin = 40
+    plot_height = CHART_HEIGHT - 2 * margin
+    step = (CHART_WIDTH - 2 * margin) / max(len(points) - 1, 1)
+    
+    def y_of(z):
+        z = max(-4.0, min(4.0, z))
+        return round(margin + (4 - z) / 8 * plot_height, 1)
+    
+    lines = [
+        {'label': f'{level:+d}SD' if level else 'Mean', 'y': y_of(level), 'level': abs(level)}
+        for level in range(-3, 4)
+    ]
+    markers = []
+    for i, point in enumerate(points):
+        z = (float(point.value) - mean) / sd
+        markers.append({
+            'x': round(margin + i * step, 1),
+            'y': y_of(z),
+            'point': point,
+            'state': 'rejected' if point.is_rejected else ('warning' if point.violations else 'ok'),
+        })
+    return {
+        'lines': lines,
+        'markers': markers,
+        'polyline': ' '.join(f"{m['x']},{m['y']}" for m in markers),
+        'left': margin,
+        'right': CHART_WIDTH - margin,
+    }
@@ -0,0 +1,116 @@
+"""
+Vectorized Westgard multirule evaluation.
+
+Control results are laid out as one flat array of z-scores holding every
+control series (one per ControlTarget) back to back in time order. Each
+rule is a handful of array operations over the whole batch, so a day's
+runs across all analytes are evaluated in one pass instead of walking
+each series point by point.
+"""
+import numpy as np
+
+
+RULE_1_2S = '1-2s'
+RULE_1_3S = '1-3s'
+RULE_2_2S = '2-2s'
+RULE_R_4S = 'R-4s'
+RULE_4_1S = '4-1s'
+RULE_10X = '10x'
+
+RULES = (RULE_1_2S, RULE_1_3S, RULE_2_2S, RULE_R_4S, RULE_4_1S, RULE_10X)
+
+# 1-2s is a warning; every other rule rejects the run.
+WARNING_RULES = frozenset([RULE_1_2S])
+REJECTION_RULES = frozenset(RULES) - WARNING_RULES
+
+
+def streak_lengths(condition, starts):
+    """
+    Length of the run of consecutive True values ending at each position.
+
+    Args:
+        condition: bool array
+        starts: bool array, True where a new series begins (streaks reset)
+
+    Returns:
+        int array (0 where condition is False)
+    """
+    condition = np.asarray(condition, dtype=bool)
+    index = np.arange(len(condition))
+    breaks = np.where(~condition, index, -1)
+    resets = np.where(starts, index - 1, -1)
+    last_break = np.maximum.accumulate(np.maximum(breaks, resets)) if len(index) else index
+    return np.where(condition, index - last_break, 0)
+
+
+def _series_streak(z, starts, length, limit):
+    """True where the last `length` points of a series are all beyond +limit or all beyond -limit."""
+    with np.errstate(invalid='ignore'):
+        high = streak_lengths(z > limit, starts) >= length
+        low = streak_lengths(z < -limit, starts) >= length
+    return high | low
+
+
+def evaluate(z, starts, groups):
+    """
+    Apply the Westgard rules to a batch of control results.
+
+    Rules are evaluated independently (not only after a 1-2s warning):
+    1-3s, 2-2s, 4-1s and 10x look back along each control series, while
+    R-4s (and 2-2s across materials) compare the materials measured for the
+    same parameter in the same run.
+
+    Args:
+        z: float array of z-scores (NaN when mean/SD are unknown, which
+           never violates a rule), ordered by series then time
+        starts: bool array, True at the first point of each series
+        groups: int array identifying the (run, parameter) of each point
+
+    Returns:
+        Dictionary of rule name to bool array of violations
+    """
+    z = np.asarray(z, dtype=np.float64)
+    starts = np.asarray(starts, dtype=bool)
+    groups = np.asarray(groups)
+
+    with np.errstate(invalid='ignore'):
+        beyond_2s = np.abs(z) > 2
+        violations = {
+            RULE_1_2S: beyond_2s,
+            RULE_1_3S: np.abs(z) > 3,
+            RULE_2_2S: _series_streak(z, starts, 2, 2),
+            RULE_4_1S: _series_streak(z, starts, 4, 1),
+            RULE_10X: _series_streak(z, starts, 10, 0),
+        }
+
+        # Within-run rules: reduce per (run, parameter) group and broadcast back.
+        if len(z):
+            keys, inverse = np.unique(groups, return_inverse=True)
+            inverse = inverse.reshape(-1)
+            filled = np.nan_to_num(z, nan=0.0)
+            highest = np.full(len(keys), -np.inf)
+            lowest = np.full(len(keys), np.inf)
+            np.maximum.at(highest, inverse, filled)
+            np.minimum.at(lowest, inverse, filled)
+            above = np.bincount(inverse, weights=z > 2, minlength=len(keys))
+            below = np.bincount(inverse, weights=z < -2, minlength=len(keys))
+
+            violations[RULE_R_4S] = ((highest > 2) & (lowest < -2))[inverse] & beyond_2s
+            violations[RULE_2_2S] = violations[RULE_2_2S] \
+                | ((above[inverse] >= 2) & (z > 2)) | ((below[inverse] >= 2) & (z < -2))
+        else:
+            violations[RULE_R_4S] = np.zeros(0, dtype=bool)
+    return violations
+
+
+def describe(violations, index):
+    """Comma-separated names of the rules violated at one position."""
+    return ','.join(rule for rule in RULES if violations[rule][index])
+
+
+def rejected(violations):
+    """bool array, True where any rejection rule is violated."""
+    result = np.zeros(len(violations[RULE_1_3S]), dtype=bool)
+    for rule in REJECTION_RULES:
+        result |= violations[rule]
+    return result
@@ -1,3 +1,10 @@
 from django.contrib import admin
+from .models import TurnaroundRollup
 
-# Reports don't require admin configuration
+
+@admin.register(TurnaroundRollup)
+class TurnaroundRollupAdmin(admin.ModelAdmin):
+    list_display = ['day', 'dimension', 'key', 'count', 'wait_p50', 'processing_p50',
+                   'total_p50', 'total_p90', 'total_p99']
+    list_filter = ['dimension', 'day']
+    search_fields = ['key']
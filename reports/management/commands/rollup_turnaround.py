@@ -0,0 +1,21 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from reports.tat import update_turnaround_rollups
+
+
+class Command(BaseCommand):
+    help = 'Update the daily turnaround-time rollups used by the turnaround report.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--since',
+            type=date.fromisoformat,
+            default=None,
+            help='First day to recompute (YYYY-MM-DD). Defaults to the last rolled-up day.',
+        )
+
+    def handle(self, *args, **options):
+        days = update_turnaround_rollups(since=options['since'])
+        self.stdout.write(self.style.SUCCESS(f'Rolled up {days} day(s).'))
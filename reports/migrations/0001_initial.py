@@ -0,0 +1,75 @@
+# Generated by Django 4.2.30 on 2026-10-19 07:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="TurnaroundRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "day",
+                    models.DateField(help_text="Day the assignments were completed"),
+                ),
+                (
+                    "dimension",
+                    models.CharField(
+                        choices=[
+                            ("test", "Test"),
+                            ("category", "Test Category"),
+                            ("priority", "Sample Priority"),
+                            ("lab", "Processing Lab"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                (
+                    "key",
+                    models.CharField(
+                        help_text="Test id, category, priority or lab id",
+                        max_length=100,
+                    ),
+                ),
+                ("count", models.IntegerField(default=0)),
+                ("wait_p50", models.FloatField(blank=True, null=True)),
+                ("wait_p90", models.FloatField(blank=True, null=True)),
+                ("wait_p99", models.FloatField(blank=True, null=True)),
+                ("processing_p50", models.FloatField(blank=True, null=True)),
+                ("processing_p90", models.FloatField(blank=True, null=True)),
+                ("processing_p99", models.FloatField(blank=True, null=True)),
+                ("total_p50", models.FloatField(blank=True, null=True)),
+                ("total_p90", models.FloatField(blank=True, null=True)),
+                ("total_p99", models.FloatField(blank=True, null=True)),
+                ("wait_histogram", models.JSONField(default=list)),
+                ("processing_histogram", models.JSONField(default=list)),
+                ("total_histogram", models.JSONField(default=list)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "db_table": "turnaround_rollups",
+                "ordering": ["-day", "dimension", "key"],
+                "indexes": [
+                    models.Index(
+                        fields=["dimension", "day"],
+                        name="turnaround__dimensi_0db8d2_idx",
+                    )
+                ],
+                "unique_together": {("day", "dimension", "key")},
+            },
+        ),
+    ]
@@ -1,3 +1,49 @@
 from django.db import models
 
-# Reports don't need models - they generate dynamic reports
+# Most reports are generated dynamically; the rollup tables below back the
+# reports that would otherwise scan large history tables.
+
+
+class TurnaroundRollup(models.Model):
+    """Daily turnaround-time distribution for one test, category, priority or lab."""
+    
+    DIMENSION_CHOICES = [
+        ('test', 'Test'),
+        ('category', 'Test Category'),
+        ('priority', 'Sample Priority'),
+        ('lab', 'Processing Lab'),
+    ]
+    
+    day = models.DateField(help_text='Day the assignments were completed')
+    dimension = models.CharField(max_length=20, choices=DIMENSION_CHOICES)
+    key = models.CharField(max_length=100, help_text='Test id, category, priority or lab id')
+    count = models.IntegerField(default=0)
+    
+    # Hours, from TestAssignment assigned/started/completed dates
+    wait_p50 = models.FloatField(null=True, blank=True)
+    wait_p90 = models.FloatField(null=True, blank=True)
+    wait_p99 = models.FloatField(null=True, blank=True)
+    processing_p50 = models.FloatField(null=True, blank=True)
+    processing_p90 = models.FloatField(null=True, blank=True)
+    processing_p99 = models.FloatField(null=True, blank=True)
+    total_p50 = models.FloatField(null=True, blank=True)
+    total_p90 = models.FloatField(null=True, blank=True)
+    total_p99 = models.FloatField(null=True, blank=True)
+    
+    # Log-spaced bucket counts so percentiles can be merged across days
+    wait_histogram = models.JSONField(default=list)
+    processing_histogram = models.JSONField(default=list)
+    total_histogram = models.JSONField(default=list)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.day} {self.dimension}={self.key} ({self.count})"
+    
+    class Meta:
+        db_table = 'turnaround_rollups'
+        ordering = ['-day', 'dimension', 'key']
+        unique_together = ['day', 'dimension', 'key']
+        indexes = [
+            models.Index(fields=['dimension', 'day']),
+        ]
@@ -0,0 +1,300 @@
+"""Turnaround-time (TAT) analytics over completed test assignments."""
+from datetime import datetime, time, timedelta
+
+import numpy as np
+from django.db import transaction
+from django.db.models import DurationField, ExpressionWrapper, F, Max, Min
+from django.utils import timezone
+
+
+PERCENTILES = (50, 90, 99)
+METRICS = ('wait', 'processing', 'total')
+
+# Field of the per-assignment row each dimension groups on.
+DIMENSION_FIELDS = {
+    'test': 'test_id',
+    'category': 'test__category',
+    'priority': 'sample__priority',
+    'lab': 'sample__processing_lab_id',
+}
+
+# Histogram bucket lower edges in hours: [0, 1 minute) then log-spaced up to
+# 180 days; the last bucket is open-ended.
+HISTOGRAM_EDGES = np.concatenate(([0.0], np.geomspace(1 / 60, 24 * 180, 63)))
+HISTOGRAM_BUCKETS = len(HISTOGRAM_EDGES)
+
+
+def _duration(end_field, start_field):
+    return ExpressionWrapper(F(end_field) - F(start_field), output_field=DurationField())
+
+
+def _hours(values):
+    """Convert a sequence of timedeltas (or None) to float hours with NaN gaps."""
+    durations = np.array(values, dtype='timedelta64[us]')
+    hours = durations.astype('float64') / 3.6e9
+    hours[np.isnat(durations)] = np.nan
+    hours[hours < 0] = np.nan
+    return hours
+
+
+def _buckets(hours):
+    """Histogram bucket index per value (-1 for NaN)."""
+    buckets = np.searchsorted(HISTOGRAM_EDGES, np.nan_to_num(hours, nan=0.0), side='right') - 1
+    buckets[np.isnan(hours)] = -1
+    return buckets
+
+
+def _load_day(day):
+    """
+    Load one day's completed assignments as NumPy arrays.
+
+    Returns:
+        Dictionary with one array per dimension and per metric, or None
+    """
+    from tests.models import TestAssignment
+
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    end = start + timedelta(days=1)
+
+    rows = list(
+        TestAssignment.objects.filter(
+            status='completed',
+            completed_date__gte=start,
+            completed_date__lt=end
+        ).annotate(
+            wait=_duration('started_date', 'assigned_date'),
+            processing=_duration('completed_date', 'started_date'),
+            total=_duration('completed_date', 'assigned_date'),
+        ).values_list(*DIMENSION_FIELDS.values(), *METRICS)
+    )
+    if not rows:
+        return None
+
+    columns = list(zip(*rows))
+    arrays = {}
+    for i, dimension in enumerate(DIMENSION_FIELDS):
+        arrays[dimension] = np.array(['' if v is None else str(v) for v in columns[i]])
+    for i, metric in enumerate(METRICS, start=len(DIMENSION_FIELDS)):
+        arrays[metric] = _hours(columns[i])
+    return arrays
+
+
+def _summarise(keys, metrics):
+    """
+    Percentiles and histograms of each metric, grouped by key.
+
+    Histograms for all groups are built in one bincount per metric;
+    percentiles are taken per group over the group's sorted slice.
+
+    Returns:
+        Dictionary of key to {count, <metric>_p50.., <metric>_histogram}
+    """
+    groups, inverse = np.unique(keys, return_inverse=True)
+    order = np.argsort(inverse, kind='stable')
+    bounds = np.searchsorted(inverse[order], np.arange(len(groups) + 1))
+
+    summary = {
+        str(key): {'count': int(bounds[g + 1] - bounds[g])}
+        for g, key in enumerate(groups)
+    }
+
+    for metric, values in metrics.items():
+        buckets = _buckets(values)
+        valid = buckets >= 0
+        histograms = np.bincount(
+            inverse[valid] * HISTOGRAM_BUCKETS + buckets[valid],
+            minlength=len(groups) * HISTOGRAM_BUCKETS
+        ).reshape(len(groups), HISTOGRAM_BUCKETS)
+
+        for g, key in enumerate(groups):
+            group_values = values[order[bounds[g]:bounds[g + 1]]]
+            group_values = group_values[~np.isnan(group_values)]
+            if group_values.size:
+                pcts = np.percentile(group_values, PERCENTILES)
+            else:
+                pcts = [None] * len(PERCENTILES)
+            for p, value in zip(PERCENTILES, pcts):
+                summary[key][f'{metric}_p{p}'] = None if value is None else float(value)
+            summary[key][f'{metric}_histogram'] = histograms[g].tolist()
+
+    return summary
+
+
+def rollup_day(day):
+    """
+    Recompute the TurnaroundRollup rows for one day.
+
+    Args:
+        day: date
+
+    Returns:
+        Number of rollup rows written
+    """
+    from reports.models import TurnaroundRollup
+
+    arrays = _load_day(day)
+    rollups = []
+    if arrays is not None:
+        metrics = {metric: arrays[metric] for metric in METRICS}
+        for dimension in DIMENSION_FIELDS:
+            keys = arrays[dimension]
+            present = keys != ''
+            summary = _summarise(keys[present], {m: v[present] for m, v in metrics.items()})
+            rollups.extend(
+                TurnaroundRollup(day=day, dimension=dimension, key=key, **values)
+                for key, values in summary.items()
+            )
+
+    with transaction.atomic():
+        TurnaroundRollup.objects.filter(day=day).delete()
+        TurnaroundRollup.objects.bulk_create(rollups)
+
+    return len(rollups)
+
+
+def update_turnaround_rollups(since=None, until=None):
+    """
+    Bring the daily rollups up to date.
+
+    By default only days from the most recent rollup onward are recomputed
+    (that day may have been partial); with an empty table everything since
+    the first completion is rolled up.
+
+    Args:
+        since: Optional first day to recompute
+        until: Optional last day to recompute (defaults to today)
+
+    Returns:
+        Number of days recomputed
+    """
+    from reports.models import TurnaroundRollup
+    from tests.models import TestAssignment
+
+    until = until or timezone.localdate()
+    if since is None:
+        since = TurnaroundRollup.objects.aggregate(last=Max('day'))['last']
+    if since is None:
+        first = TestAssignment.objects.filter(
+            status='completed'
+        ).aggregate(first=Min('completed_date'))['first']
+        if first is None:
+            return 0
+        since = timezone.localdate(first)
+
+    day = since
+    days = 0
+    while day <= until:
+        rollup_day(day)
+        day += timedelta(days=1)
+        days += 1
+    return days
+
+
+def _histogram_percentile(histogram, cumulative, percentile):
+    """Interpolate a percentile (in log space) from bucket counts."""
+    total = cumulative[-1]
+    target = percentile / 100 * total
+    bucket = int(np.searchsorted(cumulative, target))
+    lower = HISTOGRAM_EDGES[bucket]
+    if bucket + 1 >= HISTOGRAM_BUCKETS:
+        return float(lower)
+    upper = HISTOGRAM_EDGES[bucket + 1]
+    fraction = (target - (cumulative[bucket] - histogram[bucket])) / histogram[bucket]
+    if lower <= 0:
+        return float(upper * fraction)
+    return float(lower * (upper / lower) ** fraction)
+
+
+def get_turnaround_report(dimension, start_date, end_date):
+    """
+    TAT percentiles per key of a dimension over a date range.
+
+    Reads only the rollup table; daily histograms are summed with NumPy and
+    percentiles are interpolated from the merged buckets.
+
+    Args:
+        dimension: One of 'test', 'category', 'priority', 'lab'
+        start_date: First day (inclusive)
+        end_date: Last day (inclusive)
+
+    Returns:
+        List of dictionaries with key, label, count and p50/p90/p99 hours
+        for wait, processing and total time, busiest first
+    """
+    from reports.models import TurnaroundRollup
+
+    rows = list(
+        TurnaroundRollup.objects.filter(
+            dimension=dimension,
+            day__gte=start_date,
+            day__lte=end_date
+        ).values_list('key', 'count', *[f'{m}_histogram' for m in METRICS])
+    )
+    if not rows:
+        return []
+
+    keys = np.array([row[0] for row in rows])
+    groups, inverse = np.unique(keys, return_inverse=True)
+    counts = np.bincount(inverse, weights=[row[1] for row in rows], minlength=len(groups))
+
+    report = [{'key': str(key), 'count': int(counts[g])} for g, key in enumerate(groups)]
+    for i, metric in enumerate(METRICS, start=2):
+        histograms = np.zeros((len(groups), HISTOGRAM_BUCKETS), dtype=np.int64)
+        np.add.at(histograms, inverse, np.array([row[i] or [0] * HISTOGRAM_BUCKETS for row in rows]))
+        cumulative = np.cumsum(histograms, axis=1)
+        for g, entry in enumerate(report):
+            for p in PERCENTILES:
+                entry[f'{metric}_p{p}'] = (
+                    _histogram_percentile(histograms[g], cumulative[g], p)
+                    if cumulative[g, -1] else None
+                )
+
+    labels = _labels(dimension, [entry['key'] for entry in report])
+    for entry in report:
+        entry['label'] = labels.get(entry['key'], entry['key'])
+
+    report.sort(key=lambda entry: entry['count'], reverse=True)
+    return report
+
+
+def get_turnaround_trend(dimension, key, start_date, end_date):
+    """
+    Daily exact TAT percentiles for one key of a dimension.
+
+    Returns:
+        QuerySet of TurnaroundRollup rows ordered by day
+    """
+    from reports.models import TurnaroundRollup
+
+    return TurnaroundRollup.objects.filter(
+        dimension=dimension,
+        key=key,
+        day__gte=start_date,
+        day__lte=end_date
+    ).order_by('day')
+
+
+def _labels(dimension, keys):
+    """Human-readable names for rollup keys."""
+    if dimension == 'test':
+        from tests.catalog import get_catalog
+        catalog = get_catalog()
+        labels = {}
+        for key in keys:
+            test = catalog.get(int(key))
+            if test:
+                labels[key] = f"{test.code} - {test.name}"
+        return labels
+    if dimension == 'category':
+        from tests.models import Test
+        return dict(Test.CATEGORY_CHOICES)
+    if dimension == 'priority':
+        from samples.models import Sample
+        return dict(Sample.PRIORITY_CHOICES)
+    if dimension == 'lab':
+        from labs.models import Lab
+        return {
+            str(pk): name
+            for pk, name in Lab.objects.filter(id__in=keys).values_list('id', 'name')
+        }
+    return {}
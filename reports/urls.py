@@ -9,4 +9,5 @@ urlpatterns = [
     path('tests/', views.test_report, name='test_report'),
     path('inventory/', views.inventory_report, name='inventory_report'),
     path('instruments/', views.instrument_report, name='instrument_report'),
+    path('turnaround/', views.turnaround_report, name='turnaround_report'),
 ]
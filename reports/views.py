@@ -2,11 +2,14 @@ from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
 from django.http import HttpResponse
 from django.db.models import Count, Q
+from django.utils.dateparse import parse_date
 from datetime import datetime, timedelta
 from samples.models import Sample
 from tests.models import TestAssignment
 from inventory.models import Reagent, StockItem
 from instruments.models import Instrument
+from .models import TurnaroundRollup
+from .tat import get_turnaround_report, get_turnaround_trend
 import csv
 
 
@@ -196,3 +199,58 @@ def instrument_report(request):
     }
     
     return render(request, 'reports/instrument_report.html', context)
+
+
+def _parse_date(value):
+    """A YYYY-MM-DD GET parameter as a date, or None if missing or malformed."""
+    try:
+        return parse_date(value or '')
+    except ValueError:
+        return None
+
+
+@login_required
+def turnaround_report(request):
+    """Turnaround-time percentiles from the daily rollup table."""
+    today = datetime.now().date()
+    start_date = _parse_date(request.GET.get('start_date')) or today - timedelta(days=30)
+    end_date = _parse_date(request.GET.get('end_date')) or today
+    dimension = request.GET.get('dimension', 'test')
+    key = request.GET.get('key', '')
+    export = request.GET.get('export')
+    
+    if dimension not in dict(TurnaroundRollup.DIMENSION_CHOICES):
+        dimension = 'test'
+    
+    rows = get_turnaround_report(dimension, start_date, end_date)
+    
+    if export == 'csv':
+        response = HttpResponse(content_type='text/csv')
+        response['Content-Disposition'] = 'attachment; filename="turnaround_report.csv"'
+        
+        writer = csv.writer(response)
+        writer.writerow(['Group', 'Completed', 'Wait P50', 'Wait P90', 'Wait P99',
+                         'Processing P50', 'Processing P90', 'Processing P99',
+                         'Total P50', 'Total P90', 'Total P99'])
+        
+        for row in rows:
+            writer.writerow([
+                row['label'], row['count'],
+                row['wait_p50'], row['wait_p90'], row['wait_p99'],
+                row['processing_p50'], row['processing_p90'], row['processing_p99'],
+                row['total_p50'], row['total_p90'], row['total_p99'],
+            ])
+        
+        return response
+    
+    context = {
+        'rows': rows,
+        'trend': get_turnaround_trend(dimension, key, start_date, end_date) if key else None,
+        'dimensions': TurnaroundRollup.DIMENSION_CHOICES,
+        'dimension': dimension,
+        'key': key,
+        'start_date': start_date.isoformat(),
+        'end_date': end_date.isoformat(),
+    }
+    
+    return render(request, 'reports/turnaround_report.html', context)
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import TestResult, ParameterResult
+from .models import TestResult, ParameterResult, InstrumentImport, LatestParameterValue
 
 
 class ParameterResultInline(admin.TabularInline):
@@ -18,6 +18,20 @@ class TestResultAdmin(admin.ModelAdmin):
 
 @admin.register(ParameterResult)
 class ParameterResultAdmin(admin.ModelAdmin):
-    list_display = ['test_result', 'parameter', 'value_numeric', 'value_text', 'is_abnormal']
-    list_filter = ['is_abnormal']
+    list_display = ['test_result', 'parameter', 'value_numeric', 'value_text', 'flag', 'is_abnormal']
+    list_filter = ['is_abnormal', 'flag']
     search_fields = ['test_result__test_assignment__sample__sample_id', 'parameter__name']
+
+
+@admin.register(InstrumentImport)
+class InstrumentImportAdmin(admin.ModelAdmin):
+    list_display = ['id', 'file', 'format', 'status', 'rows_parsed', 'values_imported', 'values_skipped', 'uploaded_by', 'uploaded_at']
+    list_filter = ['status', 'format', 'uploaded_at']
+    readonly_fields = ['uploaded_by', 'uploaded_at', 'started_at', 'finished_at', 'rows_parsed', 'values_imported', 'values_skipped', 'error_message']
+
+
+@admin.register(LatestParameterValue)
+class LatestParameterValueAdmin(admin.ModelAdmin):
+    list_display = ['source', 'parameter', 'value_numeric', 'value_text', 'observed_at']
+    search_fields = ['source__name', 'source__code', 'parameter__name']
+    readonly_fields = ['source', 'parameter', 'test_result', 'value_numeric', 'value_text', 'observed_at']
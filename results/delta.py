@@ -0,0 +1,306 @@
+"""Delta checks against each patient's previous approved value."""
+from collections import namedtuple
+from datetime import datetime, time
+
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+
+
+BATCH_SIZE = 500
+
+DeltaCheck = namedtuple('DeltaCheck', [
+    'parameter_id', 'parameter_name', 'previous', 'current', 'change', 'percent',
+    'previous_date', 'failed',
+])
+
+
+def _observed_at(received_date, received_time):
+    """Sample receipt as an aware datetime (ordering key for 'latest')."""
+    return timezone.make_aware(datetime.combine(received_date, received_time or time.min))
+
+
+def update_latest_values(result_ids):
+    """
+    Record approved results as the latest value per (source, parameter).
+
+    A stored value is only replaced by one from a later sample, so approving
+    an older sample never hides a newer value. Reads are two queries per
+    batch of results; writes are bulk_create/bulk_update.
+
+    Args:
+        result_ids: Iterable of approved TestResult primary keys
+
+    Returns:
+        Number of latest-value rows written
+    """
+    from .models import LatestParameterValue, ParameterResult
+
+    result_ids = list(result_ids)
+    written = 0
+    for start in range(0, len(result_ids), BATCH_SIZE):
+        rows = ParameterResult.objects.filter(
+            test_result_id__in=result_ids[start:start + BATCH_SIZE],
+            test_result__status='approved',
+            test_result__test_assignment__sample__source_ref__isnull=False
+        ).order_by().values_list(
+            'test_result__test_assignment__sample__source_ref_id', 'parameter_id', 'test_result_id',
+            'value_numeric', 'value_text',
+            'test_result__test_assignment__sample__received_date',
+            'test_result__test_assignment__sample__received_time',
+        )
+
+        candidates = {}
+        for source_id, parameter_id, result_id, numeric, text, received_date, received_time in rows:
+            if numeric is None and not text:
+                continue
+            candidate = (_observed_at(received_date, received_time), result_id, numeric, text)
+            key = (source_id, parameter_id)
+            if key not in candidates or candidate[:2] > candidates[key][:2]:
+                candidates[key] = candidate
+        if not candidates:
+            continue
+
+        existing = {
+            (latest.source_id, latest.parameter_id): latest
+            for latest in LatestParameterValue.objects.filter(
+                source_id__in={key[0] for key in candidates},
+                parameter_id__in={key[1] for key in candidates}
+            )
+        }
+
+        to_create = []
+        to_update = []
+        for (source_id, parameter_id), (observed_at, result_id, numeric, text) in candidates.items():
+            latest = existing.get((source_id, parameter_id))
+            if latest is None:
+                latest = LatestParameterValue(source_id=source_id, parameter_id=parameter_id)
+                to_create.append(latest)
+            elif (observed_at, result_id) < (latest.observed_at, latest.test_result_id):
+                continue
+            else:
+                to_update.append(latest)
+            latest.test_result_id = result_id
+            latest.value_numeric = numeric
+            latest.value_text = text
+            latest.observed_at = observed_at
+
+        with transaction.atomic():
+            LatestParameterValue.objects.bulk_create(to_create, batch_size=BATCH_SIZE)
+            LatestParameterValue.objects.bulk_update(
+                to_update, ['test_result', 'value_numeric', 'value_text', 'observed_at'],
+                batch_size=BATCH_SIZE
+            )
+        written += len(to_create) + len(to_update)
+    return written
+
+
+def rebuild_latest_values():
+    """
+    Rebuild the latest-value table from all approved results.
+
+    Returns:
+        Number of latest-value rows written
+    """
+    from .models import LatestParameterValue, TestResult
+
+    with transaction.atomic():
+        LatestParameterValue.objects.all().delete()
+        result_ids = list(
+            TestResult.objects.filter(status='approved').order_by('id').values_list('id', flat=True)
+        )
+        return update_latest_values(result_ids)
+
+
+def restore_latest_values(pairs):
+    """
+    Recompute the latest values of (source id, parameter id) pairs.
+
+    Used when the result behind a latest value is deleted (its row goes
+    with it): the newest remaining approved value takes its place.
+
+    Returns:
+        Number of latest-value rows written
+    """
+    from .models import ParameterResult
+
+    pairs = set(pairs)
+    if not pairs:
+        return 0
+    result_ids = ParameterResult.objects.filter(
+        test_result__status='approved',
+        test_result__test_assignment__sample__source_ref_id__in={pair[0] for pair in pairs},
+        parameter_id__in={pair[1] for pair in pairs}
+    ).order_by().values_list('test_result_id', flat=True).distinct()
+    return update_latest_values(list(result_ids))
+
+
+def get_previous_values(pairs):
+    """
+    Latest approved values for (source id, parameter id) pairs in one query.
+
+    Returns:
+        Dictionary of pair to LatestParameterValue
+    """
+    from .models import LatestParameterValue
+
+    pairs = set(pairs)
+    if not pairs:
+        return {}
+    latest = LatestParameterValue.objects.filter(
+        source_id__in={pair[0] for pair in pairs},
+        parameter_id__in={pair[1] for pair in pairs}
+    )
+    return {
+        (row.source_id, row.parameter_id): row
+        for row in latest
+        if (row.source_id, row.parameter_id) in pairs
+    }
+
+
+def _values_before(rows):
+    """
+    Newest approved numeric value observed before each row's sample.
+
+    For results of samples older than the stored latest value (e.g. entered
+    late): one query reads the approved history of their patients up to
+    the newest of those samples.
+
+    Args:
+        rows: (result id, source id, parameter, value, observed_at) tuples
+
+    Returns:
+        List parallel to rows of unsaved LatestParameterValue instances (or
+        None where there is no earlier value)
+    """
+    from .models import LatestParameterValue, ParameterResult
+
+    history = {}
+    for source_id, parameter_id, result_id, numeric, received_date, received_time in ParameterResult.objects.filter(
+        test_result__status='approved',
+        test_result__test_assignment__sample__source_ref_id__in={row[1] for row in rows},
+        test_result__test_assignment__sample__received_date__lte=max(row[4] for row in rows).date(),
+        parameter_id__in={row[2].id for row in rows},
+        value_numeric__isnull=False
+    ).order_by().values_list(
+        'test_result__test_assignment__sample__source_ref_id', 'parameter_id', 'test_result_id',
+        'value_numeric',
+        'test_result__test_assignment__sample__received_date',
+        'test_result__test_assignment__sample__received_time',
+    ):
+        history.setdefault((source_id, parameter_id), []).append(
+            (_observed_at(received_date, received_time), result_id, numeric)
+        )
+
+    earlier = []
+    for result_id, source_id, parameter, value, observed_at in rows:
+        candidates = [
+            entry for entry in history.get((source_id, parameter.id), ())
+            if entry[:2] < (observed_at, result_id)
+        ]
+        if not candidates:
+            earlier.append(None)
+            continue
+        observed, previous_id, numeric = max(candidates, key=lambda entry: entry[:2])
+        earlier.append(LatestParameterValue(
+            source_id=source_id, parameter_id=parameter.id, test_result_id=previous_id,
+            value_numeric=numeric, observed_at=observed
+        ))
+    return earlier
+
+
+def evaluate_deltas(current, previous, absolute_limits, percent_limits, window_days, age_days):
+    """
+    Evaluate delta rules for a batch of value pairs.
+
+    All arguments are equal-length float arrays; NaN means "not set" for a
+    limit or window.
+
+    Returns:
+        Tuple of (change, percent change, failed) arrays
+    """
+    current = np.asarray(current, dtype=np.float64)
+    previous = np.asarray(previous, dtype=np.float64)
+    change = current - previous
+    with np.errstate(divide='ignore', invalid='ignore'):
+        percent = np.abs(change) / np.abs(previous) * 100
+    percent[(previous == 0) & (change == 0)] = 0.0
+
+    with np.errstate(invalid='ignore'):
+        failed = (np.abs(change) > absolute_limits) | (percent > percent_limits)
+        in_window = np.isnan(window_days) | (age_days <= window_days)
+    return change, percent, failed & in_window
+
+
+def delta_checks(results):
+    """
+    Compare pending results with each patient's previous approved values.
+
+    Previous values for the whole list come from one query and all rules
+    are evaluated in one vectorized pass.
+
+    Args:
+        results: TestResults with test_assignment__sample selected and
+                 parameter_results prefetched
+
+    Returns:
+        Dictionary of TestResult id to a list of DeltaCheck tuples (only
+        parameters with a numeric previous value and a delta rule)
+    """
+    from tests.catalog import get_catalog
+
+    catalog = get_catalog()
+    parameters = {}
+    rows = []
+    for result in results:
+        assignment = result.test_assignment
+        sample = assignment.sample
+        if not sample.source_ref_id:
+            continue
+        if assignment.test_id not in parameters:
+            parameters[assignment.test_id] = {p.id: p for p in catalog.parameters(assignment.test_id)}
+        for pr in result.parameter_results.all():
+            parameter = parameters[assignment.test_id].get(pr.parameter_id)
+            if parameter is None or pr.value_numeric is None or \
+                    (parameter.delta_absolute is None and parameter.delta_percent is None):
+                continue
+            rows.append((result.id, sample.source_ref_id, parameter, pr.value_numeric,
+                         _observed_at(sample.received_date, sample.received_time)))
+
+    previous = get_previous_values((row[1], row[2].id) for row in rows)
+    compared = []
+    late = []
+    for row in rows:
+        latest = previous.get((row[1], row[2].id))
+        if latest is not None and (latest.observed_at, latest.test_result_id) >= (row[4], row[0]):
+            # The latest value comes from this or a later sample.
+            late.append(row)
+        elif latest is not None and latest.value_numeric is not None:
+            compared.append(row + (latest,))
+    if late:
+        earlier = _values_before(late)
+        compared += [row + (earlier[i],) for i, row in enumerate(late) if earlier[i] is not None]
+    rows = compared
+    if not rows:
+        return {}
+
+    def column(values):
+        return np.array([np.nan if v is None else float(v) for v in values], dtype=np.float64)
+
+    change, percent, failed = evaluate_deltas(
+        column(row[3] for row in rows),
+        column(row[5].value_numeric for row in rows),
+        column(row[2].delta_absolute for row in rows),
+        column(row[2].delta_percent for row in rows),
+        column(row[2].delta_window_days for row in rows),
+        np.array([(row[4] - row[5].observed_at).total_seconds() / 86400 for row in rows]),
+    )
+
+    checks = {}
+    for i, (result_id, source_id, parameter, value, observed_at, latest) in enumerate(rows):
+        checks.setdefault(result_id, []).append(DeltaCheck(
+            parameter.id, parameter.name, latest.value_numeric, value,
+            float(change[i]), None if np.isinf(percent[i]) else float(percent[i]),
+            latest.observed_at, bool(failed[i]),
+        ))
+    return checks
@@ -0,0 +1,98 @@
+"""Streaming bulk export of parameter results."""
+import csv
+from datetime import datetime, time, timedelta
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+
+# Rows fetched per database round trip (server-side cursor on PostgreSQL).
+CHUNK_SIZE = 2000
+
+# (column header, ParameterResult lookup) in output order.
+EXPORT_COLUMNS = [
+    ('result_id', 'test_result_id'),
+    ('sample_id', 'test_result__test_assignment__sample__sample_id'),
+    ('source_code', 'test_result__test_assignment__sample__source_ref__code'),
+    ('source_name', 'test_result__test_assignment__sample__source_ref__name'),
+    ('lab', 'test_result__test_assignment__sample__processing_lab__name'),
+    ('test_code', 'test_result__test_assignment__test__code'),
+    ('test_name', 'test_result__test_assignment__test__name'),
+    ('parameter', 'parameter__name'),
+    ('parameter_code', 'parameter__code'),
+    ('value_numeric', 'value_numeric'),
+    ('value_text', 'value_text'),
+    ('unit', 'parameter__unit'),
+    ('flag', 'flag'),
+    ('is_abnormal', 'is_abnormal'),
+    ('status', 'test_result__status'),
+    ('entered_date', 'test_result__entered_date'),
+    ('reviewed_by', 'test_result__reviewed_by__username'),
+    ('reviewed_date', 'test_result__reviewed_date'),
+]
+
+EXPORT_FORMATS = ('csv', 'ndjson')
+
+
+def export_queryset(start_date=None, end_date=None, test_id=None, lab_id=None, source_id=None,
+                    status='approved'):
+    """
+    Build the export projection as one joined values_list() query.
+
+    The date range applies to the review date for approved results and to
+    the entry date otherwise.
+
+    Args:
+        start_date: Optional first day (inclusive)
+        end_date: Optional last day (inclusive)
+        test_id: Optional Test primary key
+        lab_id: Optional processing Lab primary key
+        source_id: Optional Source primary key
+        status: TestResult status to export ('' for all)
+
+    Returns:
+        QuerySet of tuples in EXPORT_COLUMNS order
+    """
+    from .models import ParameterResult
+
+    rows = ParameterResult.objects.all()
+    if status:
+        rows = rows.filter(test_result__status=status)
+    date_field = 'test_result__reviewed_date' if status == 'approved' else 'test_result__entered_date'
+    if start_date:
+        rows = rows.filter(**{f'{date_field}__gte': timezone.make_aware(datetime.combine(start_date, time.min))})
+    if end_date:
+        rows = rows.filter(**{f'{date_field}__lt': timezone.make_aware(
+            datetime.combine(end_date + timedelta(days=1), time.min)
+        )})
+    if test_id:
+        rows = rows.filter(test_result__test_assignment__test_id=test_id)
+    if lab_id:
+        rows = rows.filter(test_result__test_assignment__sample__processing_lab_id=lab_id)
+    if source_id:
+        rows = rows.filter(test_result__test_assignment__sample__source_ref_id=source_id)
+
+    return rows.order_by('id').values_list(*[field for header, field in EXPORT_COLUMNS])
+
+
+class _Echo:
+    """File-like object whose write() returns the line, for csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(rows):
+    """Yield CSV lines: a header, then one line per row."""
+    writer = csv.writer(_Echo())
+    yield writer.writerow([header for header, field in EXPORT_COLUMNS])
+    for row in rows.iterator(chunk_size=CHUNK_SIZE):
+        yield writer.writerow(row)
+
+
+def stream_ndjson(rows):
+    """Yield one JSON object per line."""
+    headers = [header for header, field in EXPORT_COLUMNS]
+    encoder = DjangoJSONEncoder()
+    for row in rows.iterator(chunk_size=CHUNK_SIZE):
+        yield encoder.encode(dict(zip(headers, row))) + '\n'
@@ -0,0 +1,178 @@
+"""Background processing of uploaded instrument files."""
+import io
+import logging
+from itertools import islice
+
+from django.utils import timezone
+
+from .parsers import detect_format, get_parser
+from .utils import parse_numeric, save_worklist_results
+
+
+logger = logging.getLogger(__name__)
+
+# Parsed values resolved and written per round trip.
+CHUNK_SIZE = 1000
+
+OPEN_STATUSES = ['assigned', 'in_progress']
+
+# Uploads with other extensions (e.g. PDF reports) are stored but not parsed.
+PARSEABLE_EXTENSIONS = ('.csv', '.tsv', '.txt', '.dat', '.astm', '.asc')
+
+
+def is_parseable(filename):
+    """Whether an uploaded file looks like a text instrument export."""
+    return filename.lower().endswith(PARSEABLE_EXTENSIONS)
+
+
+def queue_instrument_import(file, user, test_result=None, format='auto'):
+    """
+    Record an uploaded file for the import worker.
+
+    Args:
+        file: Uploaded file, or the name of an already-stored file
+        user: Uploading user
+        test_result: Optional TestResult to restrict the import to
+        format: Parser name or 'auto'
+
+    Returns:
+        InstrumentImport instance
+    """
+    from .models import InstrumentImport
+
+    return InstrumentImport.objects.create(
+        file=file,
+        format=format,
+        test_result=test_result,
+        uploaded_by=user
+    )
+
+
+def process_pending_imports(limit=None):
+    """
+    Process queued imports, oldest first.
+
+    Returns:
+        Number of imports processed by this call
+    """
+    from .models import InstrumentImport
+
+    pending = InstrumentImport.objects.filter(status='pending').order_by('uploaded_at')
+    if limit:
+        pending = pending[:limit]
+    return sum(1 for pk in list(pending.values_list('id', flat=True)) if process_import(pk))
+
+
+def process_import(import_id):
+    """
+    Parse one instrument file and write its values as draft results.
+
+    The job is claimed with a conditional UPDATE so concurrent workers never
+    process the same file twice. Values are read in chunks of CHUNK_SIZE;
+    each chunk resolves its sample IDs to open assignments in one query and
+    is written with save_worklist_results(), one batch per test.
+
+    Args:
+        import_id: InstrumentImport primary key
+
+    Returns:
+        True if this call processed the import, False if it was already claimed
+    """
+    from .models import InstrumentImport
+
+    claimed = InstrumentImport.objects.filter(pk=import_id, status='pending').update(
+        status='processing', started_at=timezone.now()
+    )
+    if not claimed:
+        return False
+
+    job = InstrumentImport.objects.select_related(
+        'uploaded_by', 'test_result'
+    ).get(pk=import_id)
+    totals = {'rows_parsed': 0, 'values_imported': 0, 'values_skipped': 0}
+
+    try:
+        with job.file.open('rb') as raw:
+            stream = io.TextIOWrapper(raw, encoding='utf-8-sig', errors='replace', newline='')
+            file_format = job.format
+            if file_format == 'auto':
+                file_format = detect_format(stream.read(4096))
+                stream.seek(0)
+            values = get_parser(file_format).parse(stream)
+
+            while True:
+                chunk = list(islice(values, CHUNK_SIZE))
+                if not chunk:
+                    break
+                imported, skipped = _import_chunk(job, chunk)
+                totals['rows_parsed'] += len(chunk)
+                totals['values_imported'] += imported
+                totals['values_skipped'] += skipped
+    except Exception as e:
+        logger.exception('Instrument import #%s failed', import_id)
+        InstrumentImport.objects.filter(pk=import_id).update(
+            status='failed', finished_at=timezone.now(), error_message=str(e), **totals
+        )
+        return True
+
+    InstrumentImport.objects.filter(pk=import_id).update(
+        status='completed', finished_at=timezone.now(), error_message='', **totals
+    )
+    return True
+
+
+def _import_chunk(job, chunk):
+    """
+    Map one chunk of parsed values onto open assignments and save them.
+
+    Returns:
+        Tuple of (values imported, values skipped)
+    """
+    from tests.catalog import get_catalog
+    from tests.models import TestAssignment
+
+    assignments = TestAssignment.objects.filter(
+        sample__sample_id__in={value.sample_id for value in chunk},
+        status__in=OPEN_STATUSES
+    )
+    if job.test_result_id:
+        assignments = assignments.filter(pk=job.test_result.test_assignment_id)
+
+    by_sample = {}
+    for assignment_id, test_id, sample_id in assignments.values_list('id', 'test_id', 'sample__sample_id'):
+        by_sample.setdefault(sample_id, []).append((assignment_id, test_id))
+
+    catalog = get_catalog()
+    note = f'Imported from instrument file #{job.pk}'
+    entries_by_test = {}
+    skipped = 0
+    for value in chunk:
+        target = _match(by_sample.get(value.sample_id, ()), value.code.strip().upper(), catalog)
+        if target is None:
+            skipped += 1
+            continue
+        assignment_id, test_id, parameter = target
+        try:
+            submitted = {'value_numeric': parse_numeric(value.value), 'notes': note}
+        except ValueError:
+            submitted = {'value_numeric': None, 'value_text': value.value, 'notes': note}
+        if submitted['value_numeric'] is None and not submitted.get('value_text'):
+            skipped += 1
+            continue
+        entries_by_test.setdefault(test_id, {}).setdefault(assignment_id, {})[parameter.id] = submitted
+
+    imported = 0
+    for test_id, entries in entries_by_test.items():
+        saved = save_worklist_results(test_id, entries, job.uploaded_by)
+        imported += sum(len(entries[assignment_id]) for assignment_id in saved)
+        skipped += sum(len(cells) for assignment_id, cells in entries.items() if assignment_id not in saved)
+    return imported, skipped
+
+
+def _match(assignments, code, catalog):
+    """First open assignment of the sample whose test has a parameter with this code."""
+    for assignment_id, test_id in assignments:
+        parameter = catalog.parameter_codes(test_id).get(code)
+        if parameter is not None:
+            return assignment_id, test_id, parameter
+    return None
@@ -0,0 +1,148 @@
+"""Filtering and keyset pagination for result lists."""
+import base64
+import json
+from datetime import datetime, time, timedelta
+
+from django.db.models import Count, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+
+PAGE_SIZE = 50
+
+# GET parameter to TestResult lookup for the simple equality filters.
+FILTER_LOOKUPS = {
+    'test': 'test_assignment__test_id',
+    'technician': 'entered_by_id',
+    'reviewer': 'reviewed_by_id',
+}
+
+
+def get_filters(params):
+    """
+    Read the supported filters from a GET QueryDict.
+
+    Returns:
+        Dictionary of filter name to cleaned value (only those set)
+    """
+    filters = {}
+    for name in FILTER_LOOKUPS:
+        value = params.get(name, '')
+        if value.isdigit():
+            filters[name] = int(value)
+    sample = params.get('sample', '').strip()
+    if sample:
+        filters['sample'] = sample
+    for name in ('start_date', 'end_date'):
+        try:
+            value = parse_date(params.get(name, ''))
+        except ValueError:
+            value = None
+        if value:
+            filters[name] = value
+    return filters
+
+
+def apply_filters(queryset, filters, date_field):
+    """Apply filters from get_filters(); the date range applies to date_field."""
+    for name, lookup in FILTER_LOOKUPS.items():
+        if name in filters:
+            queryset = queryset.filter(**{lookup: filters[name]})
+    if 'sample' in filters:
+        queryset = queryset.filter(test_assignment__sample__sample_id__startswith=filters['sample'])
+    if 'start_date' in filters:
+        queryset = queryset.filter(**{
+            f'{date_field}__gte': timezone.make_aware(datetime.combine(filters['start_date'], time.min))
+        })
+    if 'end_date' in filters:
+        queryset = queryset.filter(**{
+            f'{date_field}__lt': timezone.make_aware(
+                datetime.combine(filters['end_date'] + timedelta(days=1), time.min)
+            )
+        })
+    return queryset
+
+
+def status_counts(queryset):
+    """Number of results per status in one grouped query."""
+    return dict(
+        queryset.order_by().values_list('status').annotate(count=Count('id'))
+    )
+
+
+def encode_cursor(value, pk):
+    payload = json.dumps([value.isoformat(), pk]).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return (datetime, pk) from a cursor, or None if it is malformed."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        value, pk = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        value = parse_datetime(value)
+        if value is None:
+            return None
+        return value, int(pk)
+    except (ValueError, TypeError, json.JSONDecodeError):
+        return None
+
+
+def keyset_page(queryset, date_field, after=None, before=None, page_size=PAGE_SIZE):
+    """
+    One page of a queryset ordered newest first by (date_field, id).
+
+    Instead of OFFSET, the page continues from the last row seen, so each
+    page is an index range scan whatever its depth.
+
+    Args:
+        queryset: Filtered queryset (rows with a NULL date_field are excluded)
+        date_field: Name of the ordering datetime field
+        after: Cursor of the last row of the previous page (older rows)
+        before: Cursor of the first row of the next page (newer rows)
+        page_size: Rows per page
+
+    Returns:
+        Dictionary with 'items', 'next_cursor' and 'previous_cursor'
+    """
+    queryset = queryset.filter(**{f'{date_field}__isnull': False})
+    position = decode_cursor(before or after or '')
+    backwards = bool(before) and position is not None
+
+    if position is not None:
+        value, pk = position
+        if backwards:
+            queryset = queryset.filter(
+                Q(**{f'{date_field}__gt': value}) | Q(**{date_field: value, 'id__gt': pk})
+            ).order_by(date_field, 'id')
+        else:
+            queryset = queryset.filter(
+                Q(**{f'{date_field}__lt': value}) | Q(**{date_field: value, 'id__lt': pk})
+            ).order_by(f'-{date_field}', '-id')
+    else:
+        queryset = queryset.order_by(f'-{date_field}', '-id')
+
+    items = list(queryset[:page_size + 1])
+    has_more = len(items) > page_size
+    items = items[:page_size]
+    if backwards:
+        items.reverse()
+
+    def cursor_of(item):
+        return encode_cursor(getattr(item, date_field), item.id)
+
+    next_cursor = previous_cursor = None
+    if items:
+        if has_more or backwards:
+            next_cursor = cursor_of(items[-1])
+        if position is not None and (not backwards or has_more):
+            previous_cursor = cursor_of(items[0])
+    return {'items': items, 'next_cursor': next_cursor, 'previous_cursor': previous_cursor}
+
+
+def filter_query(params, *exclude):
+    """Current GET filters without the pagination cursors, for page links."""
+    query = params.copy()
+    for key in ('after', 'before') + exclude:
+        query.pop(key, None)
+    return query.urlencode()
@@ -0,0 +1,39 @@
+from datetime import datetime, time, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from results.models import TestResult
+from results.pdf import generate_reports
+
+
+class Command(BaseCommand):
+    help = 'Render PDF reports for results approved on a day (default today) in parallel.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='Review date as YYYY-MM-DD (default: today).')
+        parser.add_argument(
+            '--processes',
+            type=int,
+            help='Number of rendering processes (default: REPORT_PDF_WORKERS).',
+        )
+
+    def handle(self, *args, **options):
+        day = timezone.localdate()
+        if options['date']:
+            day = parse_date(options['date'])
+            if day is None:
+                raise CommandError('Invalid --date; use YYYY-MM-DD.')
+
+        start = timezone.make_aware(datetime.combine(day, time.min))
+        result_ids = TestResult.objects.filter(
+            status='approved',
+            reviewed_date__gte=start,
+            reviewed_date__lt=start + timedelta(days=1)
+        ).order_by('id').values_list('id', flat=True)
+
+        rendered, cached = generate_reports(list(result_ids), processes=options['processes'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Rendered {rendered} report(s); {cached} already up to date.'
+        ))
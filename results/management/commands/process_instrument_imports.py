@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from results.imports import process_pending_imports
+
+
+class Command(BaseCommand):
+    help = 'Parse queued instrument files into draft results (runs as a worker unless --once).'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Process the current queue and exit.',
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=5.0,
+            help='Seconds to wait between polls when the queue is empty.',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            processed = process_pending_imports()
+            if processed:
+                self.stdout.write(self.style.SUCCESS(f'Processed {processed} instrument file(s).'))
+            if options['once']:
+                break
+            if not processed:
+                time.sleep(options['sleep'])
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from results.delta import rebuild_latest_values
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the latest approved value per source and parameter used by delta checks.'
+
+    def handle(self, *args, **options):
+        written = rebuild_latest_values()
+        self.stdout.write(self.style.SUCCESS(f'Recorded {written} latest value(s).'))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from results.utils import reflag_parameter_results
+
+
+class Command(BaseCommand):
+    help = 'Re-evaluate abnormal/critical flags of stored results against current reference ranges.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--test',
+            type=int,
+            action='append',
+            dest='tests',
+            help='Only re-flag results of this test id (may be repeated).',
+        )
+
+    def handle(self, *args, **options):
+        changed = reflag_parameter_results(test_ids=options['tests'])
+        self.stdout.write(self.style.SUCCESS(f'Updated flags on {changed} parameter result(s).'))
@@ -0,0 +1,89 @@
+# Generated by Django 4.2.30 on 2026-10-19 07:22
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("results", "0002_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="InstrumentImport",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("file", models.FileField(upload_to="instrument_files/%Y/%m/%d/")),
+                (
+                    "format",
+                    models.CharField(
+                        choices=[
+                            ("auto", "Auto-detect"),
+                            ("delimited", "Delimited (CSV/TSV)"),
+                            ("fixed_width", "Fixed Width"),
+                            ("astm", "ASTM E1394"),
+                        ],
+                        default="auto",
+                        max_length=20,
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "Pending"),
+                            ("processing", "Processing"),
+                            ("completed", "Completed"),
+                            ("failed", "Failed"),
+                        ],
+                        db_index=True,
+                        default="pending",
+                        max_length=20,
+                    ),
+                ),
+                ("uploaded_at", models.DateTimeField(auto_now_add=True)),
+                ("started_at", models.DateTimeField(blank=True, null=True)),
+                ("finished_at", models.DateTimeField(blank=True, null=True)),
+                ("rows_parsed", models.IntegerField(default=0)),
+                ("values_imported", models.IntegerField(default=0)),
+                ("values_skipped", models.IntegerField(default=0)),
+                ("error_message", models.TextField(blank=True)),
+                (
+                    "test_result",
+                    models.ForeignKey(
+                        blank=True,
+                        help_text="Limit the import to this result's assignment",
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="instrument_imports",
+                        to="results.testresult",
+                    ),
+                ),
+                (
+                    "uploaded_by",
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="instrument_imports",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "instrument_imports",
+                "ordering": ["-uploaded_at"],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.30 on 2026-10-19 07:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("results", "0003_instrumentimport"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="parameterresult",
+            name="flag",
+            field=models.CharField(
+                blank=True,
+                choices=[
+                    ("", "Normal"),
+                    ("L", "Low"),
+                    ("H", "High"),
+                    ("LL", "Critical Low"),
+                    ("HH", "Critical High"),
+                    ("A", "Abnormal"),
+                ],
+                max_length=2,
+            ),
+        ),
+    ]
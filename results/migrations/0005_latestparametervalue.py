@@ -0,0 +1,69 @@
+# Generated by Django 4.2.30 on 2026-10-19 07:26
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("labs", "0002_source"),
+        ("tests", "0009_testparameter_delta_absolute_and_more"),
+        ("results", "0004_parameterresult_flag"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LatestParameterValue",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "value_numeric",
+                    models.DecimalField(
+                        blank=True, decimal_places=4, max_digits=15, null=True
+                    ),
+                ),
+                ("value_text", models.CharField(blank=True, max_length=500)),
+                (
+                    "observed_at",
+                    models.DateTimeField(help_text="When the sample was received"),
+                ),
+                (
+                    "parameter",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="latest_values",
+                        to="tests.testparameter",
+                    ),
+                ),
+                (
+                    "source",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="latest_parameter_values",
+                        to="labs.source",
+                    ),
+                ),
+                (
+                    "test_result",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="results.testresult",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "latest_parameter_values",
+                "unique_together": {("source", "parameter")},
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-19 07:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("results", "0005_latestparametervalue"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="testresult",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.30 on 2026-10-19 07:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("results", "0006_testresult_updated_at"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="testresult",
+            index=models.Index(
+                fields=["status", "entered_date"], name="test_result_status_7a0a98_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="testresult",
+            index=models.Index(
+                fields=["status", "reviewed_date"], name="test_result_status_a86691_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="testresult",
+            index=models.Index(
+                fields=["entered_date"], name="test_result_entered_c389e2_idx"
+            ),
+        ),
+    ]
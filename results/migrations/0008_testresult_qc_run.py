@@ -0,0 +1,27 @@
+# Generated by Django 4.2.30 on 2026-10-19 07:35
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("qc", "0001_initial"),
+        ("results", "0007_testresult_list_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="testresult",
+            name="qc_run",
+            field=models.ForeignKey(
+                blank=True,
+                help_text="QC run covering this result; a rejected run blocks approval",
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="patient_results",
+                to="qc.qcrun",
+            ),
+        ),
+    ]
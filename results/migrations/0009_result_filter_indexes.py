@@ -0,0 +1,34 @@
+# Generated by Django 4.2.30 on 2026-10-19 08:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("results", "0008_testresult_qc_run"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="testresult",
+            index=models.Index(
+                fields=["entered_by", "entered_date"],
+                name="test_result_entered_8f5b96_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="testresult",
+            index=models.Index(
+                fields=["entered_by", "reviewed_date"],
+                name="test_result_entered_b4548b_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="testresult",
+            index=models.Index(
+                fields=["reviewed_by", "reviewed_date"],
+                name="test_result_reviewe_297750_idx",
+            ),
+        ),
+    ]
@@ -34,9 +34,18 @@ class TestResult(models.Model):
     )
     entered_date = models.DateTimeField(auto_now_add=True)
     reviewed_date = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
     comments = models.TextField(blank=True)
     reviewer_comments = models.TextField(blank=True)
     instrument_file = models.FileField(upload_to='instrument_files/%Y/%m/%d/', blank=True, null=True)
+    qc_run = models.ForeignKey(
+        'qc.QCRun',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='patient_results',
+        help_text='QC run covering this result; a rejected run blocks approval'
+    )
     
     def __str__(self):
         return f"Result for {self.test_assignment}"
@@ -44,29 +53,129 @@ class TestResult(models.Model):
     class Meta:
         db_table = 'test_results'
         ordering = ['-entered_date']
+        indexes = [
+            models.Index(fields=['status', 'entered_date']),
+            models.Index(fields=['status', 'reviewed_date']),
+            models.Index(fields=['entered_date']),
+            # Technician and reviewer filters, in each list's keyset order.
+            models.Index(fields=['entered_by', 'entered_date']),
+            models.Index(fields=['entered_by', 'reviewed_date']),
+            models.Index(fields=['reviewed_by', 'reviewed_date']),
+        ]
 
 
 class ParameterResult(models.Model):
     """Individual parameter results."""
+    
+    FLAG_CHOICES = [
+        ('', 'Normal'),
+        ('L', 'Low'),
+        ('H', 'High'),
+        ('LL', 'Critical Low'),
+        ('HH', 'Critical High'),
+        ('A', 'Abnormal'),
+    ]
+    
     test_result = models.ForeignKey(TestResult, on_delete=models.CASCADE, related_name='parameter_results')
     parameter = models.ForeignKey(TestParameter, on_delete=models.CASCADE)
     value_numeric = models.DecimalField(max_digits=15, decimal_places=4, null=True, blank=True)
     value_text = models.CharField(max_length=500, blank=True)
     is_abnormal = models.BooleanField(default=False)
+    flag = models.CharField(max_length=2, choices=FLAG_CHOICES, blank=True)
     notes = models.TextField(blank=True)
     
     def __str__(self):
         return f"{self.parameter.name}: {self.value_numeric or self.value_text}"
     
-    def check_abnormal(self):
-        """Check if result is outside reference range."""
-        if self.value_numeric and self.parameter.reference_range_min and self.parameter.reference_range_max:
-            if self.value_numeric < self.parameter.reference_range_min or \
-               self.value_numeric > self.parameter.reference_range_max:
-                self.is_abnormal = True
-            else:
-                self.is_abnormal = False
+    @property
+    def is_critical(self):
+        return self.flag in ('LL', 'HH')
+    
+    def check_abnormal(self, demographics=None):
+        """
+        Flag this result against its parameter's reference ranges.
+        
+        Uses the compiled ranges of tests.reference; to flag many results
+        at once use tests.reference.flag_parameter_results instead.
+        
+        Args:
+            demographics: Optional (sex code, age in days) of the patient
+        """
+        from tests.reference import flag_parameter_results
+        flag_parameter_results([self], {self.test_result_id: demographics} if demographics else None)
     
     class Meta:
         db_table = 'parameter_results'
         ordering = ['parameter__order', 'parameter__name']
+
+
+class InstrumentImport(models.Model):
+    """An uploaded instrument export waiting to be parsed into draft results."""
+    
+    FORMAT_CHOICES = [
+        ('auto', 'Auto-detect'),
+        ('delimited', 'Delimited (CSV/TSV)'),
+        ('fixed_width', 'Fixed Width'),
+        ('astm', 'ASTM E1394'),
+    ]
+    
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+    
+    file = models.FileField(upload_to='instrument_files/%Y/%m/%d/')
+    format = models.CharField(max_length=20, choices=FORMAT_CHOICES, default='auto')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending', db_index=True)
+    test_result = models.ForeignKey(
+        TestResult,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='instrument_imports',
+        help_text='Limit the import to this result\'s assignment'
+    )
+    uploaded_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='instrument_imports'
+    )
+    uploaded_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    rows_parsed = models.IntegerField(default=0)
+    values_imported = models.IntegerField(default=0)
+    values_skipped = models.IntegerField(default=0)
+    error_message = models.TextField(blank=True)
+    
+    def __str__(self):
+        return f"Instrument import #{self.pk} ({self.get_status_display()})"
+    
+    class Meta:
+        db_table = 'instrument_imports'
+        ordering = ['-uploaded_at']
+
+
+class LatestParameterValue(models.Model):
+    """
+    Most recent approved value of a parameter for a source (patient).
+    
+    Denormalized from ParameterResult on approval so delta checks need one
+    indexed lookup instead of walking result, assignment and sample.
+    """
+    source = models.ForeignKey('labs.Source', on_delete=models.CASCADE, related_name='latest_parameter_values')
+    parameter = models.ForeignKey(TestParameter, on_delete=models.CASCADE, related_name='latest_values')
+    test_result = models.ForeignKey(TestResult, on_delete=models.CASCADE, related_name='+')
+    value_numeric = models.DecimalField(max_digits=15, decimal_places=4, null=True, blank=True)
+    value_text = models.CharField(max_length=500, blank=True)
+    observed_at = models.DateTimeField(help_text='When the sample was received')
+    
+    def __str__(self):
+        return f"{self.source} - {self.parameter.name}: {self.value_numeric or self.value_text}"
+    
+    class Meta:
+        db_table = 'latest_parameter_values'
+        unique_together = ['source', 'parameter']
@@ -0,0 +1,203 @@
+"""
+Instrument export parsers.
+
+Each parser reads a text stream line by line and yields ParsedValue rows,
+so run files of any size are parsed in constant memory. New formats are
+added with the register_parser decorator.
+"""
+import csv
+import re
+from collections import namedtuple
+
+from django.conf import settings
+
+
+ParsedValue = namedtuple('ParsedValue', ['line', 'sample_id', 'code', 'value', 'unit'])
+
+PARSERS = {}
+
+SAMPLE_ID_COLUMNS = {'sample_id', 'sample', 'sampleid', 'sample id', 'specimen', 'specimen_id', 'barcode'}
+CODE_COLUMNS = {'code', 'parameter', 'analyte', 'test_code', 'assay'}
+VALUE_COLUMNS = {'value', 'result', 'result_value'}
+UNIT_COLUMNS = {'unit', 'units'}
+
+# Default fixed-width layout as {field: (start, end)} character offsets.
+DEFAULT_FIXED_WIDTH_COLUMNS = {
+    'sample_id': (0, 20),
+    'code': (20, 30),
+    'value': (30, 45),
+    'unit': (45, 55),
+}
+
+
+def register_parser(name):
+    """Class decorator adding a parser to the registry under a format name."""
+    def decorator(cls):
+        cls.name = name
+        PARSERS[name] = cls
+        return cls
+    return decorator
+
+
+def get_parser(name):
+    """
+    Return a parser instance for a format name.
+
+    Raises:
+        ValueError: If the format is unknown
+    """
+    try:
+        return PARSERS[name]()
+    except KeyError:
+        raise ValueError(f'Unknown instrument file format "{name}"')
+
+
+def detect_format(head):
+    """
+    Guess the format of a file from its first few kilobytes.
+
+    Args:
+        head: Decoded text from the start of the file
+
+    Returns:
+        Format name
+    """
+    stripped = head.lstrip('\x02\x05 \r\n0123456789')
+    if stripped.startswith('H|') or stripped.startswith('H\\'):
+        return 'astm'
+    try:
+        csv.Sniffer().sniff(head.split('\n', 1)[0], delimiters=',;\t|')
+        return 'delimited'
+    except csv.Error:
+        return 'fixed_width'
+
+
+@register_parser('delimited')
+class DelimitedParser:
+    """
+    CSV/TSV exports with a header row.
+
+    Long layout: one row per value with sample, code and value columns.
+    Wide layout: one row per sample and one column per parameter code.
+    """
+
+    def parse(self, stream):
+        head = stream.readline()
+        if not head:
+            return
+        try:
+            dialect = csv.Sniffer().sniff(head, delimiters=',;\t|')
+        except csv.Error:
+            dialect = csv.excel
+        header = [column.strip() for column in next(csv.reader([head], dialect))]
+        lowered = [column.lower() for column in header]
+
+        sample_col = _find_column(lowered, SAMPLE_ID_COLUMNS)
+        if sample_col is None:
+            raise ValueError('No sample ID column found in header')
+        code_col = _find_column(lowered, CODE_COLUMNS)
+        value_col = _find_column(lowered, VALUE_COLUMNS)
+        unit_col = _find_column(lowered, UNIT_COLUMNS)
+
+        reader = csv.reader(stream, dialect)
+        for line, row in enumerate(reader, start=2):
+            if not row or len(row) <= sample_col:
+                continue
+            sample_id = row[sample_col].strip()
+            if not sample_id:
+                continue
+            if code_col is not None and value_col is not None:
+                yield ParsedValue(
+                    line, sample_id, _cell(row, code_col), _cell(row, value_col),
+                    _cell(row, unit_col) if unit_col is not None else ''
+                )
+            else:
+                for index, code in enumerate(header):
+                    if index != sample_col and code and _cell(row, index):
+                        yield ParsedValue(line, sample_id, code, _cell(row, index), '')
+
+
+@register_parser('fixed_width')
+class FixedWidthParser:
+    """Fixed-column exports; layout from INSTRUMENT_FIXED_WIDTH_COLUMNS."""
+
+    def __init__(self, columns=None):
+        self.columns = columns or getattr(settings, 'INSTRUMENT_FIXED_WIDTH_COLUMNS',
+                                          DEFAULT_FIXED_WIDTH_COLUMNS)
+
+    def parse(self, stream):
+        columns = self.columns
+        for line, text in enumerate(stream, start=1):
+            text = text.rstrip('\r\n')
+            if not text.strip():
+                continue
+            fields = {name: text[start:end].strip() for name, (start, end) in columns.items()}
+            if fields.get('sample_id') and fields.get('code'):
+                yield ParsedValue(line, fields['sample_id'], fields['code'],
+                                  fields.get('value', ''), fields.get('unit', ''))
+
+
+@register_parser('astm')
+class ASTMParser:
+    """
+    ASTM E1394 record streams (H, P, O, R, ... L records).
+
+    The specimen ID comes from the most recent order (O) record; each
+    result (R) record yields the analyte code from its universal test ID
+    (^^^CODE), the value and the units. Low-level framing (STX, frame
+    numbers, checksums) is stripped if present.
+    """
+
+    FRAME = re.compile(r'^\x02?[0-7]?')
+
+    def parse(self, stream):
+        field, component = '|', '^'
+        sample_id = None
+        for line, record in enumerate(self._records(stream), start=1):
+            record = self.FRAME.sub('', record, count=1)
+            record = record.split('\x17', 1)[0].split('\x03', 1)[0]
+            if not record:
+                continue
+            kind = record[0]
+            if kind == 'H' and len(record) > 2:
+                field, component = record[1], record[3] if len(record) > 3 else '^'
+                continue
+            fields = record.split(field)
+            if kind == 'O':
+                sample_id = _field(fields, 2).split(component)[0].strip() or None
+            elif kind == 'R' and sample_id:
+                # Universal test ID: the analyte code is the fourth component
+                # (^^^CODE^dilution...); a bare field is the code itself.
+                components = _field(fields, 2).split(component)
+                code = (components[3] if len(components) > 3 else components[0]).strip()
+                if code:
+                    yield ParsedValue(line, sample_id, code,
+                                      _field(fields, 3).strip(), _field(fields, 4).strip())
+            elif kind == 'L':
+                sample_id = None
+
+    @staticmethod
+    def _records(stream):
+        """Split on CR as well as LF; ASTM records are CR-terminated."""
+        pending = ''
+        for chunk in stream:
+            pending += chunk
+            *records, pending = re.split(r'[\r\n]+', pending)
+            yield from records
+        if pending:
+            yield pending
+
+
+def _find_column(columns, names):
+    for index, column in enumerate(columns):
+        if column in names:
+            return index
+    return None
+
+
+def _cell(row, index):
+    return row[index].strip() if index is not None and index < len(row) else ''
+
+
+def _field(fields, index):
+    return fields[index] if index < len(fields) else ''
@@ -0,0 +1,276 @@
+"""
+PDF result reports.
+
+Report data is loaded in the web/worker process with a few joined queries
+and handed to a process pool as plain dictionaries; the pool only renders
+bytes, so child processes never touch the database. Rendered files are
+kept in the default storage under a name derived from the result's
+content version, so repeat downloads are served without re-rendering and
+any edit or review produces a new file.
+"""
+import hashlib
+import io
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as RenderTimeout
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+
+REPORT_DIR = 'reports'
+
+# Results loaded per batch when generating many reports.
+BATCH_SIZE = 200
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _workers():
+    return getattr(settings, 'REPORT_PDF_WORKERS', 2)
+
+
+def _render_timeout():
+    return getattr(settings, 'REPORT_PDF_TIMEOUT', 30)
+
+
+def get_pool():
+    """Shared process pool for rendering (created on first use)."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ProcessPoolExecutor(
+                    max_workers=_workers(),
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+    return _pool
+
+
+def content_version(*parts):
+    """Short stable hash of the values that determine a report's content."""
+    digest = hashlib.sha1('|'.join('' if p is None else str(p) for p in parts).encode())
+    return digest.hexdigest()[:16]
+
+
+def _version_of(report):
+    # Parameter rows are hashed too: flags and reference ranges can change
+    # (e.g. reflag_parameter_results) without touching the TestResult.
+    return content_version(*[
+        (result['id'], result['status'], result['reviewed_date'], result['updated_at'],
+         [tuple(row.values()) for row in result['parameters']])
+        for result in report['results']
+    ])
+
+
+def load_reports(result_ids=None, sample_id=None):
+    """
+    Load report data for results, or for every result of one sample.
+
+    Args:
+        result_ids: Iterable of TestResult primary keys (one report each)
+        sample_id: Sample primary key (one report for all its results)
+
+    Returns:
+        List of report dictionaries with 'kind', 'key', 'version',
+        'sample' and 'results' entries
+    """
+    from .models import ParameterResult, TestResult
+
+    results = TestResult.objects.order_by('test_assignment__test__name')
+    if sample_id is not None:
+        results = results.filter(test_assignment__sample_id=sample_id)
+    else:
+        results = results.filter(id__in=list(result_ids))
+    results = list(results.values(
+        'id', 'status', 'reviewed_date', 'updated_at', 'entered_date', 'comments',
+        'reviewer_comments',
+        'test_assignment__test__code', 'test_assignment__test__name',
+        'test_assignment__sample_id', 'test_assignment__sample__sample_id',
+        'test_assignment__sample__sample_type', 'test_assignment__sample__received_date',
+        'test_assignment__sample__source_ref__name', 'test_assignment__sample__source_ref__code',
+        'entered_by__first_name', 'entered_by__last_name',
+        'reviewed_by__first_name', 'reviewed_by__last_name',
+    ))
+
+    parameters = {}
+    for row in ParameterResult.objects.filter(
+        test_result_id__in=[r['id'] for r in results]
+    ).order_by('parameter__order', 'parameter__name').values(
+        'test_result_id', 'parameter__name', 'parameter__unit', 'value_numeric', 'value_text',
+        'flag', 'parameter__reference_range_min', 'parameter__reference_range_max',
+        'parameter__reference_range_text',
+    ):
+        parameters.setdefault(row['test_result_id'], []).append(row)
+
+    for result in results:
+        result['parameters'] = parameters.get(result['id'], [])
+
+    def sample_of(result):
+        return {
+            'id': result['test_assignment__sample_id'],
+            'sample_id': result['test_assignment__sample__sample_id'],
+            'sample_type': result['test_assignment__sample__sample_type'],
+            'received_date': result['test_assignment__sample__received_date'],
+            'source': result['test_assignment__sample__source_ref__name'] or '',
+            'source_code': result['test_assignment__sample__source_ref__code'] or '',
+        }
+
+    if sample_id is not None:
+        if not results:
+            return []
+        reports = [{'kind': 'samples', 'key': sample_id, 'sample': sample_of(results[0]), 'results': results}]
+    else:
+        reports = [
+            {'kind': 'results', 'key': result['id'], 'sample': sample_of(result), 'results': [result]}
+            for result in results
+        ]
+    for report in reports:
+        report['version'] = _version_of(report)
+    return reports
+
+
+def report_path(report):
+    return f"{REPORT_DIR}/{report['kind']}/{report['key']}/{report['version']}.pdf"
+
+
+def render_pdf(report):
+    """
+    Render one report to PDF bytes.
+
+    Pure function of the report dictionary, safe to run in a child process.
+    """
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.lib.units import mm
+    from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+    styles = getSampleStyleSheet()
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=A4, leftMargin=15 * mm, rightMargin=15 * mm,
+                            topMargin=15 * mm, bottomMargin=15 * mm,
+                            title=f"Results {report['sample']['sample_id']}")
+
+    sample = report['sample']
+    story = [
+        Paragraph('Laboratory Result Report', styles['Title']),
+        Table([
+            ['Sample ID', sample['sample_id'], 'Received', str(sample['received_date'] or '')],
+            ['Source', f"{sample['source']} {sample['source_code']}".strip(), 'Sample Type', sample['sample_type']],
+        ], colWidths=[28 * mm, 62 * mm, 28 * mm, 62 * mm]),
+        Spacer(1, 6 * mm),
+    ]
+
+    for result in report['results']:
+        story.append(Paragraph(
+            escape(f"{result['test_assignment__test__code']} - {result['test_assignment__test__name']}"),
+            styles['Heading2']
+        ))
+        rows = [['Parameter', 'Result', 'Unit', 'Reference Range', 'Flag']]
+        for p in result['parameters']:
+            value = p['value_numeric'] if p['value_numeric'] is not None else p['value_text']
+            low, high = p['parameter__reference_range_min'], p['parameter__reference_range_max']
+            if low is not None and high is not None:
+                ref_range = f'{low} - {high}'
+            else:
+                ref_range = p['parameter__reference_range_text']
+            rows.append([p['parameter__name'], '' if value is None else str(value),
+                         p['parameter__unit'], ref_range, p['flag']])
+        table = Table(rows, colWidths=[55 * mm, 30 * mm, 25 * mm, 50 * mm, 20 * mm], repeatRows=1)
+        style = [
+            ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
+            ('GRID', (0, 0), (-1, -1), 0.25, colors.grey),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ]
+        for i, p in enumerate(result['parameters'], start=1):
+            if p['flag']:
+                style.append(('TEXTCOLOR', (1, i), (1, i), colors.red))
+                style.append(('TEXTCOLOR', (4, i), (4, i), colors.red))
+        table.setStyle(TableStyle(style))
+        story.append(table)
+
+        entered_by = f"{result['entered_by__first_name'] or ''} {result['entered_by__last_name'] or ''}".strip()
+        reviewed_by = f"{result['reviewed_by__first_name'] or ''} {result['reviewed_by__last_name'] or ''}".strip()
+        footer = f"Status: {result['status'].replace('_', ' ').title()}. Entered by {entered_by or '-'}"
+        if result['reviewed_date']:
+            footer += f"; reviewed by {reviewed_by or '-'} on {result['reviewed_date']:%Y-%m-%d %H:%M}"
+        story.append(Paragraph(escape(footer + '.'), styles['Normal']))
+        if result['comments']:
+            story.append(Paragraph(escape(f"Comments: {result['comments']}"), styles['Normal']))
+        if result['reviewer_comments']:
+            story.append(Paragraph(escape(f"Reviewer comments: {result['reviewer_comments']}"), styles['Normal']))
+        story.append(Spacer(1, 5 * mm))
+
+    doc.build(story)
+    return buffer.getvalue()
+
+
+def _store(report, content):
+    """Save a rendered report and drop older versions of it."""
+    path = report_path(report)
+    if not default_storage.exists(path):
+        default_storage.save(path, ContentFile(content))
+    directory = path.rsplit('/', 1)[0]
+    try:
+        _, files = default_storage.listdir(directory)
+    except (FileNotFoundError, NotImplementedError):
+        return path
+    for name in files:
+        if name != f"{report['version']}.pdf":
+            default_storage.delete(f'{directory}/{name}')
+    return path
+
+
+def get_report_pdf(report):
+    """
+    Return the storage path of a rendered report, rendering it if needed.
+
+    Rendering runs in the shared process pool; the caller waits at most
+    REPORT_PDF_TIMEOUT seconds (concurrent.futures.TimeoutError), and a
+    report that finishes later is still stored for the next request.
+    """
+    path = report_path(report)
+    if default_storage.exists(path):
+        return path
+    future = get_pool().submit(render_pdf, report)
+    try:
+        pdf = future.result(timeout=_render_timeout())
+    except RenderTimeout:
+        # Keep the file for the next request once rendering finishes.
+        future.add_done_callback(lambda f: f.exception() is None and _store(report, f.result()))
+        raise
+    return _store(report, pdf)
+
+
+def generate_reports(result_ids, processes=None):
+    """
+    Render reports for many results in parallel across processes.
+
+    Reports whose current version is already stored are skipped.
+
+    Args:
+        result_ids: Iterable of TestResult primary keys
+        processes: Optional number of worker processes
+
+    Returns:
+        Tuple of (reports rendered, reports already cached)
+    """
+    result_ids = list(result_ids)
+    rendered = cached = 0
+    with ProcessPoolExecutor(max_workers=processes or _workers(),
+                             mp_context=multiprocessing.get_context('spawn')) as pool:
+        for start in range(0, len(result_ids), BATCH_SIZE):
+            reports = []
+            for report in load_reports(result_ids[start:start + BATCH_SIZE]):
+                if default_storage.exists(report_path(report)):
+                    cached += 1
+                else:
+                    reports.append(report)
+            for report, content in zip(reports, pool.map(render_pdf, reports, chunksize=8)):
+                _store(report, content)
+                rendered += 1
+    return rendered, cached
@@ -0,0 +1,99 @@
+"""Approval and rejection of results pending review."""
+from django.db import transaction
+from django.db.models import Case, F, TextField, Value, When
+from django.utils import timezone
+
+
+BATCH_SIZE = 500
+
+
+def review_results_bulk(result_ids, approve, user, comments=None):
+    """
+    Approve or reject many results in one transaction.
+
+    Results still pending review are locked (SELECT ... FOR UPDATE) and
+    moved with one UPDATE per batch; their assignments follow with one more
+    UPDATE. Results that are no longer pending (e.g. approved meanwhile by
+    another reviewer) are left untouched and reported as skipped, so a
+    result is never approved twice. Results whose QC run was rejected
+    cannot be approved and are reported as blocked.
+
+    Args:
+        result_ids: Iterable of TestResult primary keys
+        approve: True to approve, False to reject
+        user: Reviewing user
+        comments: Optional dictionary of result id to reviewer comments
+
+    Returns:
+        Dictionary with 'reviewed', 'skipped' and 'blocked' lists of result
+        ids ('blocked' ones are also in 'skipped')
+    """
+    from tests.estimation import schedule_queue_refresh
+    from tests.models import TestAssignment
+    from tests.utils import recompute_test_cost_statistics
+    from .delta import update_latest_values
+    from .models import TestResult
+
+    result_ids = list(dict.fromkeys(int(pk) for pk in result_ids))
+    comments = comments or {}
+    now = timezone.now()
+
+    reviewed = []
+    blocked = []
+    assignment_ids = []
+    test_ids = set()
+    with transaction.atomic():
+        for start in range(0, len(result_ids), BATCH_SIZE):
+            batch = result_ids[start:start + BATCH_SIZE]
+            rows = list(
+                TestResult.objects.select_for_update(of=('self',)).filter(
+                    id__in=batch,
+                    status='pending_review'
+                ).values_list('id', 'test_assignment_id', 'test_assignment__test_id', 'qc_run__status')
+            )
+            if approve:
+                blocked.extend(row[0] for row in rows if row[3] == 'rejected')
+                rows = [row for row in rows if row[3] != 'rejected']
+            if not rows:
+                continue
+            ids = [row[0] for row in rows]
+
+            commented = [
+                When(pk=pk, then=Value(comments[pk]))
+                for pk in ids if comments.get(pk)
+            ]
+            TestResult.objects.filter(id__in=ids, status='pending_review').update(
+                status='approved' if approve else 'rejected',
+                reviewed_by=user,
+                reviewed_date=now,
+                updated_at=now,
+                reviewer_comments=Case(*commented, default=F('reviewer_comments'), output_field=TextField())
+                if commented else F('reviewer_comments'),
+            )
+            reviewed.extend(ids)
+            for pk, assignment_id, test_id, qc_status in rows:
+                assignment_ids.append(assignment_id)
+                test_ids.add(test_id)
+
+        for start in range(0, len(assignment_ids), BATCH_SIZE):
+            batch = assignment_ids[start:start + BATCH_SIZE]
+            if approve:
+                TestAssignment.objects.filter(id__in=batch).update(status='completed', completed_date=now)
+            else:
+                TestAssignment.objects.filter(id__in=batch).update(status='assigned')
+
+        # QuerySet.update() bypasses TestAssignment.save(), which normally
+        # keeps cost statistics and queue estimates current.
+        if approve and test_ids:
+            recompute_test_cost_statistics(test_ids=test_ids)
+            update_latest_values(reviewed)
+        if not approve:
+            for test_id in test_ids:
+                schedule_queue_refresh(test_id)
+
+    reviewed_set = set(reviewed)
+    return {
+        'reviewed': reviewed,
+        'skipped': [pk for pk in result_ids if pk not in reviewed_set],
+        'blocked': blocked,
+    }
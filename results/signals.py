@@ -0,0 +1,17 @@
+"""Signal handlers for the results app."""
+from django.db import transaction
+from django.db.models.signals import pre_delete
+from django.dispatch import receiver
+
+from .models import LatestParameterValue, TestResult
+
+
+@receiver(pre_delete, sender=TestResult)
+def restore_latest_values_on_delete(sender, instance, **kwargs):
+    """Fall back to the previous approved values when a latest value's result is deleted."""
+    pairs = list(
+        LatestParameterValue.objects.filter(test_result=instance).values_list('source_id', 'parameter_id')
+    )
+    if pairs:
+        from .delta import restore_latest_values
+        transaction.on_commit(lambda: restore_latest_values(pairs))
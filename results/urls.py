@@ -6,9 +6,15 @@ app_name = 'results'
 urlpatterns = [
     path('', views.result_list, name='result_list'),
     path('enter/<int:assignment_id>/', views.enter_result, name='enter_result'),
+    path('worklist/<int:test_id>/', views.worklist_entry, name='worklist_entry'),
+    path('imports/', views.instrument_imports, name='instrument_imports'),
     path('review/', views.review_results, name='review_results'),
+    path('review/bulk/', views.bulk_review, name='bulk_review'),
     path('approve/<int:pk>/', views.approve_result, name='approve_result'),
     path('reject/<int:pk>/', views.reject_result, name='reject_result'),
     path('approved/', views.approved_results, name='approved_results'),
+    path('export/', views.export_results, name='export_results'),
+    path('pdf/<int:pk>/', views.result_pdf, name='result_pdf'),
+    path('pdf/sample/<int:sample_pk>/', views.sample_pdf, name='sample_pdf'),
     path('export/<int:pk>/', views.export_result, name='export_result'),
 ]
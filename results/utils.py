@@ -0,0 +1,249 @@
+"""Utility functions for result entry."""
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.utils import timezone
+
+
+PARAMETER_RESULT_FIELDS = ['value_numeric', 'value_text', 'is_abnormal', 'flag', 'notes']
+
+BATCH_SIZE = 500
+
+
+def parse_numeric(value):
+    """
+    Parse a submitted numeric value.
+    
+    Args:
+        value: String from a form or JSON payload (may be empty)
+    
+    Returns:
+        Decimal, or None if empty
+    
+    Raises:
+        ValueError: If the value is not a number
+    """
+    if value is None or str(value).strip() == '':
+        return None
+    try:
+        number = Decimal(str(value).strip())
+    except InvalidOperation:
+        raise ValueError(f'"{value}" is not a number')
+    if not number.is_finite():
+        raise ValueError(f'"{value}" is not a number')
+    return number
+
+
+def save_parameter_results(result, parameters, values):
+    """
+    Write all parameter results of a TestResult in one batch.
+    
+    Existing rows are fetched in one query, abnormal flags are evaluated
+    in one pass against the compiled reference ranges, and rows are
+    written with bulk_create/bulk_update, so the query count does not
+    depend on the number of parameters.
+    
+    Args:
+        result: Saved TestResult instance
+        parameters: Iterable of parameters (TestParameter or catalog entries)
+        values: Dictionary of parameter id to dict with optional
+                'value_numeric' (Decimal), 'value_text' and 'notes'
+    
+    Returns:
+        List of ParameterResult instances, in parameter order
+    """
+    from tests.reference import flag_parameter_results, get_demographics
+    from .models import ParameterResult
+    
+    existing = {pr.parameter_id: pr for pr in result.parameter_results.all()}
+    
+    to_create = []
+    to_update = []
+    saved = []
+    for parameter in parameters:
+        submitted = values.get(parameter.id)
+        param_result = existing.get(parameter.id)
+        if submitted is None and param_result is not None:
+            saved.append(param_result)
+            continue
+        
+        if param_result is None:
+            param_result = ParameterResult(test_result=result, parameter_id=parameter.id)
+            to_create.append(param_result)
+        else:
+            to_update.append(param_result)
+        _apply_values(param_result, submitted or {})
+        saved.append(param_result)
+    
+    demographics = get_demographics([result.test_assignment_id])
+    flag_parameter_results(to_create + to_update, {
+        result.id: patient for patient in demographics.values()
+    })
+    
+    with transaction.atomic():
+        ParameterResult.objects.bulk_create(to_create)
+        ParameterResult.objects.bulk_update(to_update, PARAMETER_RESULT_FIELDS)
+    
+    return saved
+
+
+def save_worklist_results(test_id, entries, user, submit=False, qc_run_id=None):
+    """
+    Write results for many assignments of one test in one transaction.
+    
+    Missing TestResults and ParameterResults are bulk-created, existing
+    ones bulk-updated, and on submit all results and assignments move to
+    review with two UPDATE statements. Only assignments of this test that
+    are still open ('assigned' or 'in_progress') are written.
+    
+    Args:
+        test_id: Test primary key
+        entries: Dictionary of assignment id to a values dictionary as
+                 accepted by save_parameter_results()
+        user: User entering the results
+        submit: Submit the results for review instead of saving drafts
+        qc_run_id: Optional QCRun primary key covering these results
+                   (defaults to the test's latest recent run)
+    
+    Returns:
+        List of assignment ids that were saved
+    """
+    from qc.utils import latest_run_id
+    from tests.catalog import get_catalog
+    from tests.estimation import schedule_queue_refresh
+    from tests.models import TestAssignment
+    from tests.reference import flag_parameter_results, get_demographics
+    from .models import TestResult, ParameterResult
+    
+    parameters = get_catalog().parameters(test_id)
+    if qc_run_id is None:
+        qc_run_id = latest_run_id(test_id)
+    assignment_ids = list(
+        TestAssignment.objects.filter(
+            test_id=test_id,
+            id__in=list(entries),
+            status__in=['assigned', 'in_progress']
+        ).values_list('id', flat=True)
+    )
+    if not assignment_ids:
+        return []
+    
+    with transaction.atomic():
+        results = {
+            r.test_assignment_id: r
+            for r in TestResult.objects.filter(test_assignment_id__in=assignment_ids)
+        }
+        missing = [a for a in assignment_ids if a not in results]
+        if missing:
+            TestResult.objects.bulk_create([
+                TestResult(test_assignment_id=a, entered_by=user) for a in missing
+            ])
+            results.update(
+                (r.test_assignment_id, r)
+                for r in TestResult.objects.filter(test_assignment_id__in=missing)
+            )
+        
+        existing = {
+            (pr.test_result_id, pr.parameter_id): pr
+            for pr in ParameterResult.objects.filter(
+                test_result_id__in=[r.id for r in results.values()]
+            )
+        }
+        
+        to_create = []
+        to_update = []
+        for assignment_id in assignment_ids:
+            result = results[assignment_id]
+            values = entries[assignment_id]
+            for parameter in parameters:
+                submitted = values.get(parameter.id)
+                if submitted is None:
+                    continue
+                param_result = existing.get((result.id, parameter.id))
+                if param_result is None:
+                    param_result = ParameterResult(test_result=result, parameter_id=parameter.id)
+                    to_create.append(param_result)
+                else:
+                    to_update.append(param_result)
+                _apply_values(param_result, submitted)
+        
+        demographics = get_demographics(assignment_ids)
+        flag_parameter_results(to_create + to_update, {
+            results[assignment_id].id: patient for assignment_id, patient in demographics.items()
+        })
+        
+        ParameterResult.objects.bulk_create(to_create, batch_size=BATCH_SIZE)
+        ParameterResult.objects.bulk_update(to_update, PARAMETER_RESULT_FIELDS, batch_size=BATCH_SIZE)
+        
+        # update() bypasses auto_now, so bump updated_at explicitly
+        result_updates = {'updated_at': timezone.now()}
+        if submit:
+            result_updates['status'] = 'pending_review'
+        if qc_run_id:
+            result_updates['qc_run_id'] = qc_run_id
+        TestResult.objects.filter(test_assignment_id__in=assignment_ids).update(**result_updates)
+        if submit:
+            TestAssignment.objects.filter(id__in=assignment_ids).update(status='waiting_review')
+    
+    if submit:
+        schedule_queue_refresh(test_id)
+    
+    return assignment_ids
+
+
+def _apply_values(param_result, submitted):
+    """Copy submitted values onto a ParameterResult (flags are set in batch afterwards)."""
+    if submitted.get('value_numeric') is not None:
+        param_result.value_numeric = submitted['value_numeric']
+    if submitted.get('value_text'):
+        param_result.value_text = submitted['value_text']
+    param_result.notes = submitted.get('notes', '')
+
+
+def reflag_parameter_results(test_ids=None):
+    """
+    Re-evaluate flags of stored parameter results against current ranges.
+    
+    Results are read in chunks with their patient demographics and only
+    rows whose flag changed are written back.
+    
+    Args:
+        test_ids: Optional iterable of Test ids to limit the pass to
+    
+    Returns:
+        Number of parameter results whose flag changed
+    """
+    from tests.reference import flag_parameter_results, patient_demographics
+    from .models import ParameterResult
+    
+    queryset = ParameterResult.objects.order_by('id').only(
+        'id', 'test_result_id', 'parameter_id', 'value_numeric', 'value_text', 'is_abnormal', 'flag'
+    )
+    if test_ids is not None:
+        queryset = queryset.filter(parameter__test_id__in=list(test_ids))
+    
+    changed = 0
+    last_id = 0
+    while True:
+        chunk = list(queryset.filter(id__gt=last_id)[:BATCH_SIZE * 10])
+        if not chunk:
+            break
+        last_id = chunk[-1].id
+        
+        demographics = {
+            row[0]: patient_demographics(*row[1:])
+            for row in ParameterResult.objects.filter(id__in=[pr.id for pr in chunk]).values_list(
+                'test_result_id',
+                'test_result__test_assignment__sample__source_ref__gender',
+                'test_result__test_assignment__sample__source_ref__date_of_birth',
+                'test_result__test_assignment__sample__received_date',
+            ).order_by().distinct()
+        }
+        
+        before = {pr.id: (pr.flag, pr.is_abnormal) for pr in chunk}
+        flag_parameter_results(chunk, demographics)
+        updated = [pr for pr in chunk if (pr.flag, pr.is_abnormal) != before[pr.id]]
+        ParameterResult.objects.bulk_update(updated, ['flag', 'is_abnormal'], batch_size=BATCH_SIZE)
+        changed += len(updated)
+    
+    return changed
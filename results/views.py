@@ -1,29 +1,63 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.utils import timezone
-from django.http import HttpResponse
+from django.http import HttpResponse, JsonResponse, Http404, StreamingHttpResponse, FileResponse
+from django.core.files.storage import default_storage
+from concurrent.futures import TimeoutError as RenderTimeout
+from django.utils.dateparse import parse_date
+from django.db import transaction
+from django.db.models import Q
+import json
 from tests.models import TestAssignment
-from .models import TestResult, ParameterResult
+from tests.catalog import get_catalog
+from labs.models import Lab
+from qc.utils import get_recent_runs, latest_run_id
+from users.models import User
+from .models import TestResult, ParameterResult, InstrumentImport
+from .utils import parse_numeric, save_parameter_results, save_worklist_results
+from .imports import is_parseable, queue_instrument_import
+from .review import review_results_bulk
+from .delta import delta_checks
+from .export import EXPORT_FORMATS, export_queryset, stream_csv, stream_ndjson
+from .pdf import get_report_pdf, load_reports
+from .listing import apply_filters, filter_query, get_filters, keyset_page, status_counts
+
+
+# Maximum number of assignments shown on one worklist grid (four 96-well plates).
+WORKLIST_LIMIT = 384
 
 
 @login_required
 def result_list(request):
-    """List all results."""
-    results = TestResult.objects.select_related(
-        'test_assignment__sample',
-        'test_assignment__test',
-        'entered_by'
-    ).order_by('-entered_date')
+    """List results, newest first, with filters and keyset pagination."""
+    filters = get_filters(request.GET)
+    results = apply_filters(TestResult.objects.all(), filters, 'entered_date')
+    counts = status_counts(results)
     
     status_filter = request.GET.get('status', '')
     if status_filter:
         results = results.filter(status=status_filter)
     
+    page = keyset_page(
+        results.select_related('test_assignment__sample', 'test_assignment__test', 'entered_by'),
+        'entered_date',
+        after=request.GET.get('after'),
+        before=request.GET.get('before')
+    )
+    
     context = {
-        'results': results,
-        'statuses': TestResult.STATUS_CHOICES,
+        'results': page['items'],
+        'page': page,
+        'statuses': [
+            (value, label, counts.get(value, 0)) for value, label in TestResult.STATUS_CHOICES
+        ],
+        'total_count': sum(counts.values()),
         'status_filter': status_filter,
+        'filters': filters,
+        'query': filter_query(request.GET),
+        'filter_query': filter_query(request.GET, 'status'),
+        'tests': get_catalog().active_tests(),
+        'users': _result_users(),
     }
     
     return render(request, 'results/result_list.html', context)
@@ -33,9 +67,10 @@ def result_list(request):
 def enter_result(request, assignment_id):
     """Enter results for a test assignment."""
     assignment = get_object_or_404(
-        TestAssignment.objects.select_related('sample', 'test').prefetch_related('test__parameters'),
+        TestAssignment.objects.select_related('sample', 'test'),
         pk=assignment_id
     )
+    parameters = get_catalog().parameters(assignment.test_id)
     
     # Get or create result
     result, created = TestResult.objects.get_or_create(
@@ -50,25 +85,19 @@ def enter_result(request, assignment_id):
         if 'instrument_file' in request.FILES:
             result.instrument_file = request.FILES['instrument_file']
         
-        # Handle parameter results
-        for parameter in assignment.test.parameters.all():
-            value_numeric = request.POST.get(f'param_numeric_{parameter.id}')
-            value_text = request.POST.get(f'param_text_{parameter.id}')
-            param_notes = request.POST.get(f'param_notes_{parameter.id}', '')
-            
-            param_result, _ = ParameterResult.objects.get_or_create(
-                test_result=result,
-                parameter=parameter
-            )
-            
-            if value_numeric:
-                param_result.value_numeric = value_numeric
-                param_result.check_abnormal()
-            if value_text:
-                param_result.value_text = value_text
-            
-            param_result.notes = param_notes
-            param_result.save()
+        # Collect parameter results
+        values = {}
+        for parameter in parameters:
+            try:
+                value_numeric = parse_numeric(request.POST.get(f'param_numeric_{parameter.id}'))
+            except ValueError as e:
+                messages.error(request, f'{parameter.name}: {e}')
+                return redirect('results:enter_result', assignment_id=assignment.pk)
+            values[parameter.id] = {
+                'value_numeric': value_numeric,
+                'value_text': request.POST.get(f'param_text_{parameter.id}'),
+                'notes': request.POST.get(f'param_notes_{parameter.id}', ''),
+            }
         
         # Update status
         action = request.POST.get('action')
@@ -77,9 +106,21 @@ def enter_result(request, assignment_id):
         elif action == 'submit_review':
             result.status = 'pending_review'
             assignment.status = 'waiting_review'
-            assignment.save()
+            if result.qc_run_id is None:
+                result.qc_run_id = latest_run_id(assignment.test_id)
+        
+        with transaction.atomic():
+            save_parameter_results(result, parameters, values)
+            if action == 'submit_review':
+                assignment.save()
+            result.save()
+            
+            # Parse instrument exports in the background worker
+            if 'instrument_file' in request.FILES and action != 'submit_review' and \
+                    is_parseable(result.instrument_file.name):
+                queue_instrument_import(result.instrument_file.name, request.user, test_result=result)
+                messages.info(request, 'Instrument file queued; its values will be added to this draft.')
         
-        result.save()
         messages.success(request, 'Results saved successfully.')
         
         if action == 'submit_review':
@@ -89,6 +130,7 @@ def enter_result(request, assignment_id):
     context = {
         'assignment': assignment,
         'result': result,
+        'parameters': parameters,
         'parameter_results': {
             pr.parameter_id: pr for pr in result.parameter_results.all()
         }
@@ -97,6 +139,161 @@ def enter_result(request, assignment_id):
     return render(request, 'results/enter_result.html', context)
 
 
+@login_required
+def worklist_entry(request, test_id):
+    """Enter results for many assignments of one test in a single grid."""
+    test = get_catalog().get(test_id)
+    if test is None:
+        raise Http404('Test not found')
+    parameters = test.parameters
+    
+    if request.method == 'POST':
+        if request.content_type == 'application/json':
+            try:
+                payload = json.loads(request.body)
+                entries = _parse_worklist_json(payload.get('results', {}), parameters)
+            except (ValueError, AttributeError, TypeError) as e:
+                return JsonResponse({'success': False, 'error': str(e)}, status=400)
+            
+            saved = save_worklist_results(
+                test_id, entries, request.user,
+                submit=payload.get('action') == 'submit_review',
+                qc_run_id=_qc_run_id(payload.get('qc_run'), test_id)
+            )
+            return JsonResponse({'success': True, 'saved': saved})
+        
+        try:
+            entries = _parse_worklist_form(request.POST, parameters)
+        except ValueError as e:
+            messages.error(request, str(e))
+            return redirect('results:worklist_entry', test_id=test_id)
+        
+        action = request.POST.get('action')
+        saved = save_worklist_results(
+            test_id, entries, request.user,
+            submit=action == 'submit_review',
+            qc_run_id=_qc_run_id(request.POST.get('qc_run'), test_id)
+        )
+        messages.success(request, f'Results saved for {len(saved)} assignment(s).')
+        
+        if action == 'submit_review':
+            return redirect('results:review_results')
+        return redirect('results:worklist_entry', test_id=test_id)
+    
+    assignments = list(
+        TestAssignment.objects.filter(
+            test_id=test_id,
+            status__in=['assigned', 'in_progress']
+        ).select_related('sample').order_by('sample__sample_id')[:WORKLIST_LIMIT]
+    )
+    
+    # Pre-fill the grid with values entered so far
+    entered = {
+        (pr.test_result.test_assignment_id, pr.parameter_id): pr
+        for pr in ParameterResult.objects.filter(
+            test_result__test_assignment__in=assignments
+        ).select_related('test_result')
+    }
+    rows = [
+        {
+            'assignment': assignment,
+            'cells': [(parameter, entered.get((assignment.id, parameter.id))) for parameter in parameters],
+        }
+        for assignment in assignments
+    ]
+    
+    context = {
+        'test': test,
+        'parameters': parameters,
+        'rows': rows,
+        'qc_runs': get_recent_runs(test_id),
+    }
+    
+    return render(request, 'results/worklist_entry.html', context)
+
+
+@login_required
+def instrument_imports(request):
+    """Upload instrument files for background parsing and list recent imports."""
+    if request.method == 'POST':
+        upload = request.FILES.get('instrument_file')
+        file_format = request.POST.get('format', 'auto')
+        if upload is None:
+            messages.error(request, 'Please choose a file to upload.')
+        elif file_format not in dict(InstrumentImport.FORMAT_CHOICES):
+            messages.error(request, 'Unknown file format.')
+        else:
+            job = queue_instrument_import(upload, request.user, format=file_format)
+            messages.success(request, f'Instrument file queued for import (#{job.pk}).')
+        return redirect('results:instrument_imports')
+    
+    imports = InstrumentImport.objects.select_related('uploaded_by')[:50]
+    
+    context = {
+        'imports': imports,
+        'formats': InstrumentImport.FORMAT_CHOICES,
+    }
+    
+    return render(request, 'results/instrument_imports.html', context)
+
+
+def _qc_run_id(value, test_id):
+    """The submitted QC run id if it is a recent run of this test, else its latest run."""
+    try:
+        pk = int(value)
+    except (TypeError, ValueError):
+        pk = None
+    if pk is not None and get_recent_runs(test_id).filter(pk=pk).exists():
+        return pk
+    return latest_run_id(test_id)
+
+
+def _parse_worklist_form(data, parameters):
+    """Collect numeric_<assignment>_<parameter> grid cells from a form POST."""
+    parameter_names = {parameter.id: parameter.name for parameter in parameters}
+    entries = {}
+    for key, value in data.items():
+        if not key.startswith('numeric_'):
+            continue
+        _, assignment_id, parameter_id = key.split('_')
+        assignment_id, parameter_id = int(assignment_id), int(parameter_id)
+        if parameter_id not in parameter_names:
+            continue
+        try:
+            value_numeric = parse_numeric(value)
+        except ValueError as e:
+            raise ValueError(f'{parameter_names[parameter_id]}: {e}')
+        if value_numeric is not None:
+            entries.setdefault(assignment_id, {})[parameter_id] = {'value_numeric': value_numeric}
+    return entries
+
+
+def _parse_worklist_json(results, parameters):
+    """
+    Collect grid cells from a JSON payload.
+    
+    Expects {"<assignment id>": {"<parameter id>": value}} where value is a
+    number, or an object with optional "numeric", "text" and "notes".
+    """
+    parameter_ids = {parameter.id for parameter in parameters}
+    entries = {}
+    for assignment_id, values in results.items():
+        cells = {}
+        for parameter_id, value in values.items():
+            parameter_id = int(parameter_id)
+            if parameter_id not in parameter_ids:
+                continue
+            if not isinstance(value, dict):
+                value = {'numeric': value}
+            cells[parameter_id] = {
+                'value_numeric': parse_numeric(value.get('numeric')),
+                'value_text': value.get('text', ''),
+                'notes': value.get('notes', ''),
+            }
+        entries[int(assignment_id)] = cells
+    return entries
+
+
 @login_required
 def review_results(request):
     """List results pending review."""
@@ -105,9 +302,16 @@ def review_results(request):
     ).select_related(
         'test_assignment__sample',
         'test_assignment__test',
-        'entered_by'
+        'entered_by',
+        'qc_run'
     ).prefetch_related('parameter_results')
     
+    results = list(results)
+    checks = delta_checks(results)
+    for result in results:
+        result.delta_checks = checks.get(result.id, [])
+        result.delta_failed = [check for check in result.delta_checks if check.failed]
+    
     return render(request, 'results/review_results.html', {'results': results})
 
 
@@ -116,18 +320,17 @@ def approve_result(request, pk):
     """Approve a result."""
     if request.method == 'POST':
         result = get_object_or_404(TestResult, pk=pk)
-        result.status = 'approved'
-        result.reviewed_by = request.user
-        result.reviewed_date = timezone.now()
-        result.reviewer_comments = request.POST.get('reviewer_comments', '')
-        result.save()
-        
-        # Update test assignment
-        result.test_assignment.status = 'completed'
-        result.test_assignment.completed_date = timezone.now()
-        result.test_assignment.save()
-        
-        messages.success(request, 'Result approved successfully.')
+        outcome = review_results_bulk(
+            [result.pk], True, request.user,
+            comments={result.pk: _reviewer_comments(request.POST, result.pk)}
+        )
+        
+        if outcome['reviewed']:
+            messages.success(request, 'Result approved successfully.')
+        elif outcome['blocked']:
+            messages.error(request, 'This result cannot be released: its QC run was rejected.')
+        else:
+            messages.warning(request, 'This result has already been reviewed.')
         return redirect('results:review_results')
     
     return redirect('results:result_list')
@@ -138,35 +341,104 @@ def reject_result(request, pk):
     """Reject a result."""
     if request.method == 'POST':
         result = get_object_or_404(TestResult, pk=pk)
-        result.status = 'rejected'
-        result.reviewed_by = request.user
-        result.reviewed_date = timezone.now()
-        result.reviewer_comments = request.POST.get('reviewer_comments', '')
-        result.save()
+        outcome = review_results_bulk(
+            [result.pk], False, request.user,
+            comments={result.pk: _reviewer_comments(request.POST, result.pk)}
+        )
         
-        # Update test assignment
-        result.test_assignment.status = 'assigned'
-        result.test_assignment.save()
-        
-        messages.warning(request, 'Result rejected. Please re-enter the results.')
+        if outcome['reviewed']:
+            messages.warning(request, 'Result rejected. Please re-enter the results.')
+        else:
+            messages.warning(request, 'This result has already been reviewed.')
         return redirect('results:review_results')
     
     return redirect('results:result_list')
 
 
+def _reviewer_comments(data, pk):
+    """Comments from a single-result form or from that result's row of the review queue."""
+    return data.get('reviewer_comments', data.get(f'reviewer_comments_{pk}', '')).strip()
+
+
+@login_required
+def bulk_review(request):
+    """Approve or reject all selected results at once."""
+    if request.method == 'POST':
+        if not request.user.has_permission('can_approve_results'):
+            messages.error(request, 'You do not have permission to review results.')
+            return redirect('results:review_results')
+        
+        action = request.POST.get('action')
+        if action not in ('approve', 'reject'):
+            messages.error(request, 'Invalid review action.')
+            return redirect('results:review_results')
+        
+        try:
+            result_ids = [int(pk) for pk in request.POST.getlist('result_ids')]
+        except ValueError:
+            result_ids = []
+        if not result_ids:
+            messages.error(request, 'No results selected.')
+            return redirect('results:review_results')
+        
+        comments = {pk: _reviewer_comments(request.POST, pk) for pk in result_ids}
+        outcome = review_results_bulk(result_ids, action == 'approve', request.user, comments=comments)
+        
+        verb = 'approved' if action == 'approve' else 'rejected'
+        if outcome['reviewed']:
+            messages.success(request, f"{len(outcome['reviewed'])} result(s) {verb}.")
+        if outcome['blocked']:
+            messages.error(
+                request,
+                f"{len(outcome['blocked'])} result(s) cannot be released because their QC run was rejected."
+            )
+        already_reviewed = len(outcome['skipped']) - len(outcome['blocked'])
+        if already_reviewed:
+            messages.warning(
+                request,
+                f"{already_reviewed} result(s) were already reviewed and have been skipped."
+            )
+    
+    return redirect('results:review_results')
+
+
 @login_required
 def approved_results(request):
-    """List approved results."""
-    results = TestResult.objects.filter(
-        status='approved'
-    ).select_related(
-        'test_assignment__sample',
-        'test_assignment__test',
-        'entered_by',
-        'reviewed_by'
-    ).order_by('-reviewed_date')
+    """List approved results, most recently reviewed first, with keyset pagination."""
+    filters = get_filters(request.GET)
+    results = apply_filters(TestResult.objects.filter(status='approved'), filters, 'reviewed_date')
     
-    return render(request, 'results/approved_results.html', {'results': results})
+    page = keyset_page(
+        results.select_related(
+            'test_assignment__sample',
+            'test_assignment__test',
+            'entered_by',
+            'reviewed_by'
+        ),
+        'reviewed_date',
+        after=request.GET.get('after'),
+        before=request.GET.get('before')
+    )
+    
+    context = {
+        'results': page['items'],
+        'page': page,
+        'filters': filters,
+        'query': filter_query(request.GET),
+        'tests': get_catalog().active_tests(),
+        'users': _result_users(),
+        'labs': Lab.objects.filter(is_active=True).order_by('name'),
+    }
+    
+    return render(request, 'results/approved_results.html', context)
+
+
+def _result_users():
+    """Users who can enter or review results, for the filter dropdowns."""
+    return User.objects.filter(
+        Q(role__can_enter_results=True) | Q(role__can_approve_results=True),
+        is_active=True
+    ).order_by('first_name', 'last_name', 'username')
 
 
 @login_required
@@ -194,14 +466,79 @@ def export_result(request, pk):
     writer.writerow(['Parameter', 'Value', 'Unit', 'Reference Range', 'Status'])
     
     for pr in result.parameter_results.all():
-        value = pr.value_numeric if pr.value_numeric else pr.value_text
+        value = pr.value_numeric if pr.value_numeric is not None else pr.value_text
         ref_range = ''
-        if pr.parameter.reference_range_min and pr.parameter.reference_range_max:
+        if pr.parameter.reference_range_min is not None and pr.parameter.reference_range_max is not None:
             ref_range = f"{pr.parameter.reference_range_min} - {pr.parameter.reference_range_max}"
         elif pr.parameter.reference_range_text:
             ref_range = pr.parameter.reference_range_text
         
-        status = 'Abnormal' if pr.is_abnormal else 'Normal'
+        status = pr.get_flag_display() if pr.flag else ('Abnormal' if pr.is_abnormal else 'Normal')
         writer.writerow([pr.parameter.name, value, pr.parameter.unit, ref_range, status])
     
     return response
+
+
+@login_required
+def export_results(request):
+    """Stream all matching parameter results as CSV or NDJSON."""
+    export_format = request.GET.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        return HttpResponse('Unsupported export format.', status=400)
+    
+    try:
+        start_date = parse_date(request.GET.get('start_date', ''))
+        end_date = parse_date(request.GET.get('end_date', ''))
+    except ValueError:
+        return HttpResponse('Invalid date.', status=400)
+    
+    filters = {}
+    for name in ('test', 'lab', 'source'):
+        value = request.GET.get(name, '')
+        if value:
+            if not value.isdigit():
+                return HttpResponse(f'Invalid {name}.', status=400)
+            filters[f'{name}_id'] = int(value)
+    
+    rows = export_queryset(
+        start_date=start_date,
+        end_date=end_date,
+        status=request.GET.get('status', 'approved'),
+        **filters
+    )
+    
+    if export_format == 'ndjson':
+        response = StreamingHttpResponse(stream_ndjson(rows), content_type='application/x-ndjson')
+    else:
+        response = StreamingHttpResponse(stream_csv(rows), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="results_export.{export_format}"'
+    return response
+
+
+@login_required
+def result_pdf(request, pk):
+    """Download a result report as PDF."""
+    reports = load_reports(result_ids=[pk])
+    if not reports:
+        raise Http404('Result not found')
+    return _serve_report(reports[0], f'result_{reports[0]["sample"]["sample_id"]}_{pk}.pdf')
+
+
+@login_required
+def sample_pdf(request, sample_pk):
+    """Download all results of a sample as one PDF report."""
+    reports = load_reports(sample_id=sample_pk)
+    if not reports:
+        raise Http404('No results for this sample')
+    return _serve_report(reports[0], f'results_{reports[0]["sample"]["sample_id"]}.pdf')
+
+
+def _serve_report(report, filename):
+    """Serve a cached report, rendering it in the worker pool on first request."""
+    try:
+        path = get_report_pdf(report)
+    except RenderTimeout:
+        response = HttpResponse('The report is being generated. Please try again shortly.', status=503)
+        response['Retry-After'] = '10'
+        return response
+    return FileResponse(default_storage.open(path, 'rb'), content_type='application/pdf', filename=filename)
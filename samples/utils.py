@@ -130,28 +130,18 @@ def calculate_expected_completion(sample):
     """
     Calculate expected completion date based on assigned tests.
     
+    Assignment estimates are kept queue-aware by tests.estimation, so the
+    sample completes when its latest assignment does.
+    
     Args:
         sample: Sample instance
     
     Returns:
         datetime of expected completion
     """
-    from tests.models import TestAssignment
-    
-    test_assignments = sample.test_assignments.all()
-    
-    if not test_assignments:
-        return None
-    
-    # Find the latest expected completion among all assigned tests
-    latest_completion = None
-    
-    for assignment in test_assignments:
-        if assignment.expected_completion:
-            if not latest_completion or assignment.expected_completion > latest_completion:
-                latest_completion = assignment.expected_completion
+    from tests.estimation import estimate_sample_completion
     
-    return latest_completion
+    return estimate_sample_completion(sample)
 
 
 def get_sample_workload_report(start_date=None, end_date=None):
@@ -39,4 +39,31 @@ document.addEventListener('DOMContentLoaded', function() {
             }
         });
     }
+    
+    // Search box suggestions (inputs with data-autocomplete-url and a datalist)
+    document.querySelectorAll('input[data-autocomplete-url]').forEach(input => {
+        const list = document.getElementById(input.getAttribute('list'));
+        let timer = null;
+        input.addEventListener('input', function() {
+            clearTimeout(timer);
+            const query = this.value.trim();
+            if (!query || !list) {
+                return;
+            }
+            timer = setTimeout(() => {
+                const url = input.dataset.autocompleteUrl + '&q=' + encodeURIComponent(query);
+                fetch(url, {credentials: 'same-origin'})
+                    .then(response => response.json())
+                    .then(data => {
+                        list.innerHTML = '';
+                        (data.results || []).forEach(result => {
+                            const option = document.createElement('option');
+                            option.value = result.name;
+                            option.label = [result.code, result.detail].filter(Boolean).join(' - ');
+                            list.appendChild(option);
+                        });
+                    });
+            }, 150);
+        });
+    });
 });
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Test, TestParameter, TestAssignment, ReagentUsage
+from .models import Test, TestParameter, TestAssignment, TestCostStatistics, ReagentUsage, ReferenceRange
 
 
 class TestParameterInline(admin.TabularInline):
@@ -7,6 +7,11 @@ class TestParameterInline(admin.TabularInline):
     extra = 1
 
 
+class ReferenceRangeInline(admin.TabularInline):
+    model = ReferenceRange
+    extra = 1
+
+
 class ReagentUsageInline(admin.TabularInline):
     model = ReagentUsage
     extra = 0
@@ -66,3 +71,21 @@ class ReagentUsageAdmin(admin.ModelAdmin):
     list_filter = ['used_date', 'reagent']
     search_fields = ['test_assignment__sample__sample_id', 'reagent__name']
     readonly_fields = ['used_by', 'used_date', 'total_cost']
+
+
+@admin.register(TestCostStatistics)
+class TestCostStatisticsAdmin(admin.ModelAdmin):
+    list_display = ['test', 'completed_count', 'cost_count', 'total_cost', 'min_cost',
+                   'max_cost', 'updated_at']
+    search_fields = ['test__name', 'test__code']
+    readonly_fields = ['test', 'completed_count', 'cost_count', 'total_cost', 'sum_of_squares',
+                      'min_cost', 'max_cost', 'updated_at']
+
+
+@admin.register(TestParameter)
+class TestParameterAdmin(admin.ModelAdmin):
+    list_display = ['name', 'test', 'code', 'unit', 'reference_range_min', 'reference_range_max',
+                   'critical_low', 'critical_high']
+    list_filter = ['test']
+    search_fields = ['name', 'code', 'test__name', 'test__code']
+    inlines = [ReferenceRangeInline]
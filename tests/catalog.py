@@ -0,0 +1,200 @@
+"""In-process cache of the test catalog (tests, parameters and reference ranges)."""
+import threading
+import time
+import uuid
+from collections import namedtuple
+from types import MappingProxyType
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+
+CATALOG_VERSION_KEY = 'tests:catalog_version'
+
+
+class CatalogParameter(namedtuple('CatalogParameter', [
+    'id', 'test_id', 'name', 'code', 'unit', 'reference_range_min',
+    'reference_range_max', 'reference_range_text', 'critical_low',
+    'critical_high', 'delta_absolute', 'delta_percent',
+    'delta_window_days', 'order',
+])):
+    """Immutable snapshot of a TestParameter."""
+    __slots__ = ()
+
+    @property
+    def pk(self):
+        return self.id
+
+
+class CatalogTest(namedtuple('CatalogTest', [
+    'id', 'name', 'code', 'category', 'description', 'turnaround_time',
+    'estimated_cost', 'billable_amount', 'is_active', 'parameters',
+])):
+    """Immutable snapshot of a Test with its ordered parameters."""
+    __slots__ = ()
+
+    @property
+    def pk(self):
+        return self.id
+
+    def get_category_display(self):
+        from tests.models import Test
+        return dict(Test.CATEGORY_CHOICES).get(self.category, self.category)
+
+
+class TestCatalog:
+    """
+    Read-only view of all tests keyed by id and code.
+
+    Instances are never mutated; a catalog edit produces a new instance.
+    """
+
+    def __init__(self, tests, version):
+        self.version = version
+        self.loaded_at = time.monotonic()
+        self._tests = tuple(tests)
+        self._by_id = MappingProxyType({t.id: t for t in self._tests})
+        self._by_code = MappingProxyType({t.code: t for t in self._tests})
+        self._active = tuple(t for t in self._tests if t.is_active)
+        self._parameter_codes = MappingProxyType({
+            t.id: MappingProxyType(_parameter_code_map(t.parameters)) for t in self._tests
+        })
+
+    def __len__(self):
+        return len(self._tests)
+    
+    def __iter__(self):
+        return iter(self._tests)
+
+    def get(self, test_id):
+        """Return the CatalogTest for an id, or None."""
+        return self._by_id.get(test_id)
+
+    def get_by_code(self, code):
+        """Return the CatalogTest for a test code, or None."""
+        return self._by_code.get(code)
+
+    def active_tests(self, category=None):
+        """Return active tests ordered by name, optionally for one category."""
+        if category:
+            return tuple(t for t in self._active if t.category == category)
+        return self._active
+
+    def parameters(self, test_id):
+        """Return the ordered parameters of a test (empty tuple if unknown)."""
+        test = self._by_id.get(test_id)
+        return test.parameters if test else ()
+
+    def parameter_codes(self, test_id):
+        """
+        Map upper-cased instrument codes to a test's parameters.
+
+        Parameters without a code can also be matched by name.
+        """
+        return self._parameter_codes.get(test_id, MappingProxyType({}))
+
+
+def _parameter_code_map(parameters):
+    codes = {}
+    for parameter in parameters:
+        codes.setdefault(parameter.name.strip().upper(), parameter)
+    for parameter in parameters:
+        if parameter.code:
+            codes[parameter.code.strip().upper()] = parameter
+    return codes
+
+
+_catalog = None
+_lock = threading.Lock()
+
+
+def _max_age():
+    return getattr(settings, 'TEST_CATALOG_MAX_AGE', 300)
+
+
+def _current_version():
+    """Read the shared version stamp, initialising it if missing."""
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        cache.add(CATALOG_VERSION_KEY, uuid.uuid4().hex, timeout=None)
+        version = cache.get(CATALOG_VERSION_KEY)
+    return version
+
+
+def _load_catalog(version):
+    """Build a TestCatalog from the database in two queries."""
+    from tests.models import Test, TestParameter
+
+    parameters_by_test = {}
+    parameter_rows = TestParameter.objects.order_by('test_id', 'order', 'name').values_list(
+        'id', 'test_id', 'name', 'code', 'unit', 'reference_range_min',
+        'reference_range_max', 'reference_range_text', 'critical_low',
+        'critical_high', 'delta_absolute', 'delta_percent',
+        'delta_window_days', 'order',
+    )
+    for row in parameter_rows:
+        parameters_by_test.setdefault(row[1], []).append(CatalogParameter(*row))
+
+    tests = []
+    test_rows = Test.objects.order_by('name').values_list(
+        'id', 'name', 'code', 'category', 'description', 'turnaround_time',
+        'estimated_cost', 'billable_amount', 'is_active',
+    )
+    for row in test_rows:
+        tests.append(CatalogTest(*row, parameters=tuple(parameters_by_test.get(row[0], ()))))
+
+    return TestCatalog(tests, version)
+
+
+def get_catalog():
+    """
+    Return the current test catalog.
+
+    The catalog is cached per process and reloaded only when the shared
+    version stamp changes (or after TEST_CATALOG_MAX_AGE seconds, as a
+    safety net for per-process cache backends, which the tests.W001 system
+    check warns about).
+
+    Returns:
+        TestCatalog instance
+    """
+    global _catalog
+
+    version = _current_version()
+    catalog = _catalog
+    if catalog is not None and catalog.version == version and \
+            time.monotonic() - catalog.loaded_at < _max_age():
+        return catalog
+
+    with _lock:
+        catalog = _catalog
+        if catalog is None or catalog.version != version or \
+                time.monotonic() - catalog.loaded_at >= _max_age():
+            catalog = _load_catalog(version)
+            _catalog = catalog
+    return catalog
+
+
+def bump_catalog_version():
+    """Invalidate every worker's catalog once the current transaction commits."""
+    def _bump():
+        global _catalog
+        cache.set(CATALOG_VERSION_KEY, uuid.uuid4().hex, timeout=None)
+        _catalog = None
+
+    transaction.on_commit(_bump)
+
+
+def get_turnaround_time(test_id):
+    """
+    Return the turnaround time (hours) for a test without querying.
+
+    Args:
+        test_id: Test primary key
+
+    Returns:
+        Turnaround time in hours, or None if the test is unknown
+    """
+    test = get_catalog().get(test_id)
+    return test.turnaround_time if test else None
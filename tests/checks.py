@@ -0,0 +1,36 @@
+"""
+System checks for settings the test catalog depends on.
+"""
+from django.conf import settings
+from django.core.checks import Warning, register
+
+PER_PROCESS_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register()
+def check_shared_cache(app_configs, **kwargs):
+    """
+    Warn when the default cache is not shared between processes.
+
+    The test catalog, inventory forecasts and search autocomplete invalidate
+    their cached answers by changing a version stamp in the default cache.
+    With a per-process backend the other web and worker processes never see
+    the change and keep serving stale answers until their entries expire.
+    """
+    backend = settings.CACHES.get('default', {}).get('BACKEND')
+    if backend not in PER_PROCESS_CACHES:
+        return []
+    return [
+        Warning(
+            f"The default cache backend {backend} is not shared between processes.",
+            hint=(
+                "Cached catalog, forecast and search answers are only invalidated in "
+                "the process that changed them. Use the database cache (the default) "
+                "or Redis/Memcached by setting CACHE_BACKEND."
+            ),
+            id='tests.W001',
+        )
+    ]
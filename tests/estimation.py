@@ -0,0 +1,203 @@
+"""Queue-aware expected completion estimates for test assignments."""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .scheduler import PRIORITY_RANK
+
+
+# Assignments still waiting on the bench; waiting_review items keep their estimate.
+QUEUE_STATUSES = ['assigned', 'in_progress']
+
+# Estimates that move by less than this are not rewritten.
+ESTIMATE_TOLERANCE = timedelta(minutes=15)
+
+DEFAULT_TURNAROUND_HOURS = 24
+
+UPDATE_BATCH_SIZE = 500
+
+
+def _window_days():
+    return getattr(settings, 'COMPLETION_ESTIMATE_WINDOW_DAYS', 14)
+
+
+def get_test_throughput(test_id):
+    """
+    Historical completions per hour for a test.
+
+    Measured over the last COMPLETION_ESTIMATE_WINDOW_DAYS days and cached
+    for an hour, so queue refreshes do not re-aggregate history.
+
+    Args:
+        test_id: Test primary key
+
+    Returns:
+        Completions per hour as a float (0.0 with no history)
+    """
+    from tests.models import TestAssignment
+
+    key = f'tests:throughput:{test_id}'
+    rate = cache.get(key)
+    if rate is None:
+        days = _window_days()
+        completed = TestAssignment.objects.filter(
+            test_id=test_id,
+            status='completed',
+            completed_date__gte=timezone.now() - timedelta(days=days)
+        ).count()
+        rate = completed / (days * 24.0)
+        cache.set(key, rate, 60 * 60)
+    return rate
+
+
+def _queue_order(row):
+    """Bench order: started work first, then sample priority, then arrival."""
+    assignment_id, status, assigned_date, expected_completion, sample_id, priority = row
+    return (
+        status != 'in_progress',
+        PRIORITY_RANK.get(priority, PRIORITY_RANK['normal']),
+        assigned_date,
+        assignment_id,
+    )
+
+
+def estimate_queue(rows, turnaround_hours, throughput, now):
+    """
+    Predict completion times for one test's open queue.
+
+    Each assignment finishes no earlier than its nominal turnaround time
+    after assignment, and no earlier than the time the bench needs to
+    clear everything ahead of it at its historical throughput. Tests with
+    no recent history fall back to the nominal turnaround.
+
+    Args:
+        rows: (id, status, assigned_date, expected_completion, sample_id,
+              priority) tuples for open assignments of one test
+        turnaround_hours: Nominal turnaround time in hours
+        throughput: Historical completions per hour
+        now: Reference time
+
+    Returns:
+        Dictionary of assignment id to predicted completion datetime
+    """
+    turnaround = timedelta(hours=turnaround_hours)
+
+    estimates = {}
+    for position, row in enumerate(sorted(rows, key=_queue_order)):
+        assignment_id, status, assigned_date, *_ = row
+        estimate = assigned_date + turnaround
+        if throughput > 0:
+            estimate = max(estimate, now + timedelta(hours=position / throughput))
+        estimates[assignment_id] = estimate
+    return estimates
+
+
+def refresh_test_queue(test_id, now=None):
+    """
+    Recompute expected completion for every open assignment of one test.
+
+    Only rows whose estimate moved by more than ESTIMATE_TOLERANCE are
+    written, and the affected samples' expected_completion_date is updated
+    to their latest assignment estimate.
+
+    Args:
+        test_id: Test primary key
+        now: Optional reference time (defaults to now)
+
+    Returns:
+        Number of assignments whose estimate changed
+    """
+    from tests.catalog import get_turnaround_time
+    from tests.models import TestAssignment
+
+    now = now or timezone.now()
+    turnaround_hours = get_turnaround_time(test_id) or DEFAULT_TURNAROUND_HOURS
+
+    rows = list(
+        TestAssignment.objects.filter(
+            test_id=test_id,
+            status__in=QUEUE_STATUSES
+        ).values_list('id', 'status', 'assigned_date', 'expected_completion',
+                      'sample_id', 'sample__priority')
+    )
+    if not rows:
+        return 0
+
+    estimates = estimate_queue(rows, turnaround_hours, get_test_throughput(test_id), now)
+
+    changed = []
+    sample_ids = set()
+    for assignment_id, status, assigned_date, current, sample_id, priority in rows:
+        estimate = estimates[assignment_id]
+        if current is None or abs(estimate - current) > ESTIMATE_TOLERANCE:
+            changed.append(TestAssignment(id=assignment_id, expected_completion=estimate))
+            sample_ids.add(sample_id)
+
+    with transaction.atomic():
+        TestAssignment.objects.bulk_update(changed, ['expected_completion'],
+                                           batch_size=UPDATE_BATCH_SIZE)
+        update_sample_expected_completion(sample_ids)
+
+    return len(changed)
+
+
+def refresh_all_queues(now=None):
+    """
+    Refresh estimates for every test that has open assignments.
+
+    Returns:
+        Number of assignments whose estimate changed
+    """
+    from tests.models import TestAssignment
+
+    test_ids = TestAssignment.objects.filter(
+        status__in=QUEUE_STATUSES
+    ).values_list('test_id', flat=True).distinct().order_by()
+
+    return sum(refresh_test_queue(test_id, now=now) for test_id in list(test_ids))
+
+
+def update_sample_expected_completion(sample_ids):
+    """
+    Set Sample.expected_completion_date to the latest assignment estimate.
+
+    Args:
+        sample_ids: Iterable of Sample primary keys
+    """
+    from samples.models import Sample
+    from tests.models import TestAssignment
+
+    sample_ids = list(sample_ids)
+    samples = []
+    for start in range(0, len(sample_ids), UPDATE_BATCH_SIZE):
+        latest = TestAssignment.objects.filter(
+            sample_id__in=sample_ids[start:start + UPDATE_BATCH_SIZE]
+        ).values('sample_id').annotate(latest=Max('expected_completion')).order_by()
+        samples.extend(
+            Sample(id=row['sample_id'],
+                   expected_completion_date=timezone.localdate(row['latest']) if row['latest'] else None)
+            for row in latest
+        )
+    Sample.objects.bulk_update(samples, ['expected_completion_date'], batch_size=UPDATE_BATCH_SIZE)
+
+
+def estimate_sample_completion(sample):
+    """
+    Latest expected completion across a sample's assignments.
+
+    Args:
+        sample: Sample instance
+
+    Returns:
+        datetime of expected completion, or None
+    """
+    return sample.test_assignments.aggregate(latest=Max('expected_completion'))['latest']
+
+
+def schedule_queue_refresh(test_id):
+    """Refresh one test's queue after the current transaction commits."""
+    transaction.on_commit(lambda: refresh_test_queue(test_id))
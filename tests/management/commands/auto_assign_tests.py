@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+
+from tests.scheduler import auto_assign_tests
+
+
+class Command(BaseCommand):
+    help = 'Assign unassigned tests to technicians by urgency and current load.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--max-load',
+            type=int,
+            default=None,
+            help='Maximum number of open assignments per technician.',
+        )
+        parser.add_argument(
+            '--technician',
+            type=int,
+            action='append',
+            dest='technicians',
+            help='Restrict to this technician id (may be repeated).',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Show the plan without saving it.',
+        )
+
+    def handle(self, *args, **options):
+        summary = auto_assign_tests(
+            max_load=options['max_load'],
+            technician_ids=options['technicians'],
+            dry_run=options['dry_run'],
+        )
+
+        for tech_id, count in sorted(summary['per_technician'].items()):
+            self.stdout.write(f'Technician {tech_id}: {count} test(s)')
+        self.stdout.write(
+            f"Assigned {summary['assigned']} test(s); "
+            f"{summary['unassigned_remaining']} left unassigned."
+        )
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING('Dry run - nothing was saved.'))
+        else:
+            self.stdout.write(self.style.SUCCESS('Done.'))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from tests.utils import recompute_test_cost_statistics, update_test_estimated_costs
+
+
+class Command(BaseCommand):
+    help = 'Rebuild per-test cost statistics and optionally refresh estimated costs.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--update-estimates',
+            action='store_true',
+            help='Also copy the mean actual cost into Test.estimated_cost.',
+        )
+
+    def handle(self, *args, **options):
+        rows = recompute_test_cost_statistics()
+        self.stdout.write(f'Rebuilt cost statistics for {rows} test(s).')
+
+        if options['update_estimates']:
+            updated = update_test_estimated_costs()
+            self.stdout.write(f'Updated estimated cost for {updated} test(s).')
+
+        self.stdout.write(self.style.SUCCESS('Done.'))
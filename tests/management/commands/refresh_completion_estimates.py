@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from tests.estimation import refresh_all_queues, refresh_test_queue
+
+
+class Command(BaseCommand):
+    help = 'Recompute queue-aware expected completion times for open test assignments.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--test',
+            type=int,
+            action='append',
+            dest='tests',
+            help='Only refresh this test id (may be repeated).',
+        )
+
+    def handle(self, *args, **options):
+        if options['tests']:
+            changed = sum(refresh_test_queue(test_id) for test_id in options['tests'])
+        else:
+            changed = refresh_all_queues()
+
+        self.stdout.write(self.style.SUCCESS(f'Updated {changed} expected completion time(s).'))
@@ -0,0 +1,109 @@
+# Generated by Django 4.2.30 on 2026-10-19 07:13
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def populate_cost_statistics(apps, schema_editor):
+    TestAssignment = apps.get_model("tests", "TestAssignment")
+    TestCostStatistics = apps.get_model("tests", "TestCostStatistics")
+
+    rows = (
+        TestAssignment.objects.filter(status="completed")
+        .values("test_id")
+        .annotate(
+            completed_count=models.Count("id"),
+            cost_count=models.Count("actual_cost"),
+            total_cost=models.Sum("actual_cost"),
+            sum_of_squares=models.Sum(
+                models.F("actual_cost") * models.F("actual_cost"),
+                output_field=models.DecimalField(max_digits=28, decimal_places=4),
+            ),
+            min_cost=models.Min("actual_cost"),
+            max_cost=models.Max("actual_cost"),
+        )
+        .order_by()
+    )
+    TestCostStatistics.objects.bulk_create(
+        [
+            TestCostStatistics(
+                test_id=row["test_id"],
+                completed_count=row["completed_count"],
+                cost_count=row["cost_count"],
+                total_cost=row["total_cost"] or 0,
+                sum_of_squares=row["sum_of_squares"] or 0,
+                min_cost=row["min_cost"],
+                max_cost=row["max_cost"],
+            )
+            for row in rows
+        ]
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tests", "0004_merge_20251115_1217"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TestCostStatistics",
+            fields=[
+                (
+                    "test",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="cost_statistics",
+                        serialize=False,
+                        to="tests.test",
+                    ),
+                ),
+                (
+                    "completed_count",
+                    models.IntegerField(
+                        default=0, help_text="Number of completed assignments"
+                    ),
+                ),
+                (
+                    "cost_count",
+                    models.IntegerField(
+                        default=0,
+                        help_text="Number of completed assignments with an actual cost",
+                    ),
+                ),
+                (
+                    "total_cost",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=16),
+                ),
+                (
+                    "sum_of_squares",
+                    models.DecimalField(
+                        decimal_places=4,
+                        default=0,
+                        help_text="Sum of squared actual costs (for variance)",
+                        max_digits=28,
+                    ),
+                ),
+                (
+                    "min_cost",
+                    models.DecimalField(
+                        blank=True, decimal_places=2, max_digits=10, null=True
+                    ),
+                ),
+                (
+                    "max_cost",
+                    models.DecimalField(
+                        blank=True, decimal_places=2, max_digits=10, null=True
+                    ),
+                ),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name_plural": "Test cost statistics",
+                "db_table": "test_cost_statistics",
+            },
+        ),
+        migrations.RunPython(populate_cost_statistics, migrations.RunPython.noop),
+    ]
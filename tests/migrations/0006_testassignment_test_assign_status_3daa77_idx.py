@@ -0,0 +1,20 @@
+# Generated by Django 4.2.30 on 2026-10-19 07:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tests", "0005_testcoststatistics"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="testassignment",
+            index=models.Index(
+                fields=["status", "completed_date"],
+                name="test_assign_status_3daa77_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.30 on 2026-10-19 07:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tests", "0006_testassignment_test_assign_status_3daa77_idx"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="testparameter",
+            name="code",
+            field=models.CharField(
+                blank=True,
+                help_text='Analyte code used by instruments/LIS (e.g., "GLU")',
+                max_length=50,
+            ),
+        ),
+    ]
@@ -0,0 +1,123 @@
+# Generated by Django 4.2.30 on 2026-10-19 07:25
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tests", "0007_testparameter_code"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="testparameter",
+            name="critical_high",
+            field=models.DecimalField(
+                blank=True,
+                decimal_places=2,
+                help_text="Values above this are critical",
+                max_digits=10,
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="testparameter",
+            name="critical_low",
+            field=models.DecimalField(
+                blank=True,
+                decimal_places=2,
+                help_text="Values below this are critical",
+                max_digits=10,
+                null=True,
+            ),
+        ),
+        migrations.CreateModel(
+            name="ReferenceRange",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "sex",
+                    models.CharField(
+                        blank=True,
+                        choices=[
+                            ("", "Any"),
+                            ("M", "Male"),
+                            ("F", "Female"),
+                            ("O", "Other"),
+                        ],
+                        max_length=1,
+                    ),
+                ),
+                (
+                    "age_min_days",
+                    models.IntegerField(
+                        blank=True,
+                        help_text="Minimum age in days (inclusive)",
+                        null=True,
+                    ),
+                ),
+                (
+                    "age_max_days",
+                    models.IntegerField(
+                        blank=True,
+                        help_text="Maximum age in days (exclusive)",
+                        null=True,
+                    ),
+                ),
+                (
+                    "low",
+                    models.DecimalField(
+                        blank=True, decimal_places=2, max_digits=10, null=True
+                    ),
+                ),
+                (
+                    "high",
+                    models.DecimalField(
+                        blank=True, decimal_places=2, max_digits=10, null=True
+                    ),
+                ),
+                (
+                    "critical_low",
+                    models.DecimalField(
+                        blank=True, decimal_places=2, max_digits=10, null=True
+                    ),
+                ),
+                (
+                    "critical_high",
+                    models.DecimalField(
+                        blank=True, decimal_places=2, max_digits=10, null=True
+                    ),
+                ),
+                (
+                    "normal_text",
+                    models.CharField(
+                        blank=True,
+                        help_text='Acceptable text results separated by "|" (e.g., "Negative|Trace")',
+                        max_length=200,
+                    ),
+                ),
+                (
+                    "parameter",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="reference_ranges",
+                        to="tests.testparameter",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "test_reference_ranges",
+                "ordering": ["parameter", "sex", "age_min_days"],
+            },
+        ),
+    ]
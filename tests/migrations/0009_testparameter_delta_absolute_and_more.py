@@ -0,0 +1,44 @@
+# Generated by Django 4.2.30 on 2026-10-19 07:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tests", "0008_testparameter_critical_high_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="testparameter",
+            name="delta_absolute",
+            field=models.DecimalField(
+                blank=True,
+                decimal_places=2,
+                help_text="Flag changes larger than this amount",
+                max_digits=10,
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="testparameter",
+            name="delta_percent",
+            field=models.DecimalField(
+                blank=True,
+                decimal_places=2,
+                help_text="Flag changes larger than this percentage",
+                max_digits=6,
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="testparameter",
+            name="delta_window_days",
+            field=models.IntegerField(
+                blank=True,
+                help_text="Only compare with values from the last N days",
+                null=True,
+            ),
+        ),
+    ]
@@ -1,3 +1,4 @@
+from decimal import Decimal
 from django.db import models
 from django.conf import settings
 from samples.models import Sample
@@ -44,11 +45,25 @@ class TestParameter(models.Model):
     """Parameters for each test."""
     test = models.ForeignKey(Test, on_delete=models.CASCADE, related_name='parameters')
     name = models.CharField(max_length=200)
+    code = models.CharField(max_length=50, blank=True,
+                            help_text='Analyte code used by instruments/LIS (e.g., "GLU")')
     unit = models.CharField(max_length=50, blank=True)
     reference_range_min = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     reference_range_max = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     reference_range_text = models.CharField(max_length=200, blank=True, 
                                             help_text='Text reference range (e.g., "Negative", "Positive")')
+    critical_low = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True,
+                                       help_text='Values below this are critical')
+    critical_high = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True,
+                                        help_text='Values above this are critical')
+    
+    # Delta check against the patient's previous approved value
+    delta_absolute = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True,
+                                         help_text='Flag changes larger than this amount')
+    delta_percent = models.DecimalField(max_digits=6, decimal_places=2, null=True, blank=True,
+                                        help_text='Flag changes larger than this percentage')
+    delta_window_days = models.IntegerField(null=True, blank=True,
+                                            help_text='Only compare with values from the last N days')
     order = models.IntegerField(default=0)
     
     def __str__(self):
@@ -59,6 +74,42 @@ class TestParameter(models.Model):
         ordering = ['test', 'order', 'name']
 
 
+class ReferenceRange(models.Model):
+    """
+    Age/sex-specific reference range for a parameter.
+    
+    The most specific range matching a patient applies; the parameter's own
+    reference_range_* and critical_* fields are the fallback for everyone.
+    """
+    
+    SEX_CHOICES = [
+        ('', 'Any'),
+        ('M', 'Male'),
+        ('F', 'Female'),
+        ('O', 'Other'),
+    ]
+    
+    parameter = models.ForeignKey(TestParameter, on_delete=models.CASCADE, related_name='reference_ranges')
+    sex = models.CharField(max_length=1, choices=SEX_CHOICES, blank=True)
+    age_min_days = models.IntegerField(null=True, blank=True,
+                                       help_text='Minimum age in days (inclusive)')
+    age_max_days = models.IntegerField(null=True, blank=True,
+                                       help_text='Maximum age in days (exclusive)')
+    low = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    high = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    critical_low = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    critical_high = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    normal_text = models.CharField(max_length=200, blank=True,
+                                   help_text='Acceptable text results separated by "|" (e.g., "Negative|Trace")')
+    
+    def __str__(self):
+        return f"{self.parameter} ({self.get_sex_display()}, {self.age_min_days}-{self.age_max_days} days)"
+    
+    class Meta:
+        db_table = 'test_reference_ranges'
+        ordering = ['parameter', 'sex', 'age_min_days']
+
+
 class TestAssignment(models.Model):
     """Assignment of tests to samples."""
     
@@ -101,9 +152,29 @@ class TestAssignment(models.Model):
     
     notes = models.TextField(blank=True)
     
+    # (test_id, completed, actual_cost) as last loaded or saved; used to keep
+    # TestCostStatistics up to date incrementally.
+    _loaded_cost_state = (None, False, None)
+    # Status as last loaded or saved; a change re-estimates the test's queue.
+    _loaded_status = None
+    
     def __str__(self):
         return f"{self.sample.sample_id} - {self.test.code}"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_cost_state = instance._cost_state()
+        instance._loaded_status = instance.__dict__.get('status')
+        return instance
+    
+    def _cost_state(self):
+        """Return the part of this assignment that feeds cost statistics."""
+        status = self.__dict__.get('status')
+        if status != 'completed':
+            return (self.__dict__.get('test_id'), False, None)
+        return (self.__dict__.get('test_id'), True, self.__dict__.get('actual_cost'))
+    
     @property
     def is_overdue(self):
         """Check if test has passed its deadline."""
@@ -135,17 +206,88 @@ class TestAssignment(models.Model):
         return None
     
     def save(self, *args, **kwargs):
-        """Auto-calculate expected completion if not provided."""
-        if not self.expected_completion and self.test.turnaround_time:
-            from datetime import timedelta
-            from django.utils import timezone
-            self.expected_completion = timezone.now() + timedelta(hours=self.test.turnaround_time)
+        """
+        Auto-calculate expected completion if not provided.
+        
+        The nominal turnaround-based estimate is replaced by a queue-aware
+        one (see tests.estimation) once the save commits.
+        """
+        queue_changed = self._state.adding or self.status != self._loaded_status
+        if not self.expected_completion:
+            from tests.catalog import get_turnaround_time
+            turnaround_time = get_turnaround_time(self.test_id)
+            if turnaround_time is None:
+                turnaround_time = self.test.turnaround_time
+            if turnaround_time:
+                from datetime import timedelta
+                from django.utils import timezone
+                self.expected_completion = timezone.now() + timedelta(hours=turnaround_time)
         super().save(*args, **kwargs)
+        
+        cost_state = self._cost_state()
+        if cost_state != self._loaded_cost_state:
+            from tests.utils import record_assignment_cost_change
+            record_assignment_cost_change(self._loaded_cost_state, cost_state)
+            self._loaded_cost_state = cost_state
+        
+        if queue_changed:
+            from tests.estimation import schedule_queue_refresh
+            schedule_queue_refresh(self.test_id)
+            self._loaded_status = self.status
     
     class Meta:
         db_table = 'test_assignments'
         ordering = ['-assigned_date']
         unique_together = ['sample', 'test']
+        indexes = [
+            models.Index(fields=['status', 'completed_date']),
+        ]
+
+
+class TestCostStatistics(models.Model):
+    """Running cost statistics per test, maintained as assignments complete."""
+    test = models.OneToOneField(Test, on_delete=models.CASCADE, primary_key=True,
+                                related_name='cost_statistics')
+    completed_count = models.IntegerField(default=0,
+                                          help_text='Number of completed assignments')
+    cost_count = models.IntegerField(default=0,
+                                     help_text='Number of completed assignments with an actual cost')
+    total_cost = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    sum_of_squares = models.DecimalField(max_digits=28, decimal_places=4, default=0,
+                                         help_text='Sum of squared actual costs (for variance)')
+    min_cost = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    max_cost = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"Cost statistics for {self.test.code}"
+    
+    @property
+    def mean_cost(self):
+        """Average actual cost per completed test."""
+        if self.cost_count:
+            return self.total_cost / self.cost_count
+        return None
+    
+    @property
+    def variance(self):
+        """Sample variance of actual costs."""
+        if self.cost_count > 1:
+            n = self.cost_count
+            return (self.sum_of_squares - self.total_cost * self.total_cost / n) / (n - 1)
+        return None
+    
+    @property
+    def std_dev(self):
+        """Sample standard deviation of actual costs."""
+        variance = self.variance
+        if variance is not None:
+            return max(variance, Decimal('0')).sqrt()
+        return None
+    
+    class Meta:
+        db_table = 'test_cost_statistics'
+        verbose_name_plural = 'Test cost statistics'
 
 
 class ReagentUsage(models.Model):
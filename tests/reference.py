@@ -0,0 +1,268 @@
+"""
+Reference-range engine for parameter results.
+
+Each parameter's ranges (its own limits plus any age/sex-specific
+ReferenceRange rows) are compiled once per catalog version into NumPy
+arrays, so a batch of results is flagged with array comparisons instead
+of per-row lookups.
+"""
+import re
+import threading
+
+import numpy as np
+
+
+FLAG_NORMAL = ''
+FLAG_LOW = 'L'
+FLAG_HIGH = 'H'
+FLAG_CRITICAL_LOW = 'LL'
+FLAG_CRITICAL_HIGH = 'HH'
+FLAG_ABNORMAL = 'A'
+
+# Patient sex codes; 0 (unknown) only matches ranges that apply to any sex.
+SEX_CODES = {'M': 1, 'F': 2, 'O': 3}
+
+_RANGE_TEXT = re.compile(r'^\s*(-?\d+(?:\.\d+)?)\s*-\s*(-?\d+(?:\.\d+)?)\s*$')
+_BOUND_TEXT = re.compile(r'^\s*([<>])=?\s*(-?\d+(?:\.\d+)?)\s*$')
+
+
+def _float(value):
+    return np.nan if value is None else float(value)
+
+
+def _categories(text):
+    """Acceptable text results from "Negative|Trace"-style text (none if it holds numbers)."""
+    if not text or any(c.isdigit() for c in text):
+        return frozenset()
+    return frozenset(part.strip().lower() for part in re.split(r'[|,]', text) if part.strip())
+
+
+def _text_limits(text):
+    """Numeric (low, high) from "4.0-11.0", "<200" or ">40" style text."""
+    text = text or ''
+    match = _RANGE_TEXT.match(text)
+    if match:
+        return float(match.group(1)), float(match.group(2))
+    match = _BOUND_TEXT.match(text)
+    if match:
+        value = float(match.group(2))
+        return (np.nan, value) if match.group(1) == '<' else (value, np.nan)
+    return np.nan, np.nan
+
+
+class CompiledRanges:
+    """
+    All ranges of one parameter as parallel arrays, most specific first.
+
+    The last row is the parameter's default range, which matches everyone.
+    """
+
+    __slots__ = ('sex', 'age_min', 'age_max', 'low', 'high',
+                 'critical_low', 'critical_high', 'categories')
+
+    def __init__(self, rows):
+        self.sex = np.array([row['sex'] for row in rows], dtype=np.int8)
+        self.age_min = np.array([row['age_min'] for row in rows], dtype=np.float64)
+        self.age_max = np.array([row['age_max'] for row in rows], dtype=np.float64)
+        self.low = np.array([row['low'] for row in rows], dtype=np.float64)
+        self.high = np.array([row['high'] for row in rows], dtype=np.float64)
+        self.critical_low = np.array([row['critical_low'] for row in rows], dtype=np.float64)
+        self.critical_high = np.array([row['critical_high'] for row in rows], dtype=np.float64)
+        self.categories = tuple(row['categories'] for row in rows)
+
+    def match(self, sexes, ages):
+        """
+        Index of the applicable range for each patient.
+
+        Args:
+            sexes: int array of SEX_CODES (0 for unknown)
+            ages: float array of ages in days (NaN for unknown)
+
+        Returns:
+            int array of row indices
+        """
+        sexes = np.asarray(sexes)[:, None]
+        ages = np.asarray(ages, dtype=np.float64)[:, None]
+        matches = (
+            ((self.sex == 0) | (self.sex == sexes))
+            & (np.isneginf(self.age_min) | (ages >= self.age_min))
+            & (np.isposinf(self.age_max) | (ages < self.age_max))
+        )
+        # The default row always matches, so argmax finds a True in every row.
+        return matches.argmax(axis=1)
+
+    def flag(self, values, texts, sexes, ages):
+        """
+        Flag a batch of results of this parameter.
+
+        Args:
+            values: float array of numeric results (NaN when absent)
+            texts: Sequence of text results ('' when absent)
+            sexes: int array of SEX_CODES
+            ages: float array of ages in days
+
+        Returns:
+            Array of flag strings
+        """
+        values = np.asarray(values, dtype=np.float64)
+        rule = self.match(sexes, ages)
+
+        flags = np.full(len(values), FLAG_NORMAL, dtype='<U2')
+        # Comparisons with NaN (missing value or limit) are False.
+        with np.errstate(invalid='ignore'):
+            flags[values < self.low[rule]] = FLAG_LOW
+            flags[values > self.high[rule]] = FLAG_HIGH
+            flags[values < self.critical_low[rule]] = FLAG_CRITICAL_LOW
+            flags[values > self.critical_high[rule]] = FLAG_CRITICAL_HIGH
+
+        for i in np.flatnonzero(np.isnan(values)):
+            categories = self.categories[rule[i]]
+            text = (texts[i] or '').strip().lower()
+            if text and categories and text not in categories:
+                flags[i] = FLAG_ABNORMAL
+        return flags
+
+
+def compile_ranges(parameter, ranges=()):
+    """
+    Compile a parameter's ranges.
+
+    Args:
+        parameter: TestParameter or catalog entry (supplies the default range)
+        ranges: ReferenceRange instances or dictionaries with the same fields
+
+    Returns:
+        CompiledRanges instance
+    """
+    low, high = _float(parameter.reference_range_min), _float(parameter.reference_range_max)
+    if np.isnan(low) and np.isnan(high):
+        low, high = _text_limits(parameter.reference_range_text)
+    default_categories = _categories(parameter.reference_range_text)
+
+    rows = []
+    for r in ranges:
+        get = r.get if isinstance(r, dict) else lambda name, r=r: getattr(r, name)
+        rows.append({
+            'sex': SEX_CODES.get(get('sex'), 0),
+            'age_min': -np.inf if get('age_min_days') is None else float(get('age_min_days')),
+            'age_max': np.inf if get('age_max_days') is None else float(get('age_max_days')),
+            'low': _float(get('low')),
+            'high': _float(get('high')),
+            'critical_low': _float(get('critical_low')),
+            'critical_high': _float(get('critical_high')),
+            'categories': _categories(get('normal_text')) or default_categories,
+        })
+    # Sex-specific before any-sex, then the narrowest age band first.
+    rows.sort(key=lambda row: (row['sex'] == 0, row['age_max'] - row['age_min']))
+
+    rows.append({
+        'sex': 0,
+        'age_min': -np.inf,
+        'age_max': np.inf,
+        'low': low,
+        'high': high,
+        'critical_low': _float(getattr(parameter, 'critical_low', None)),
+        'critical_high': _float(getattr(parameter, 'critical_high', None)),
+        'categories': default_categories,
+    })
+    return CompiledRanges(rows)
+
+
+_rules = (None, {})
+_lock = threading.Lock()
+
+
+def get_compiled_ranges(parameter_id):
+    """
+    Return the CompiledRanges for a parameter.
+
+    All parameters are compiled together (one query for ReferenceRange rows)
+    and kept until the test catalog is reloaded; range edits bump the
+    catalog version.
+    """
+    global _rules
+    from tests.catalog import get_catalog
+
+    catalog = get_catalog()
+    loaded_for, rules = _rules
+    if loaded_for is not catalog:
+        with _lock:
+            loaded_for, rules = _rules
+            if loaded_for is not catalog:
+                rules = _compile_catalog(catalog)
+                _rules = (catalog, rules)
+    return rules.get(parameter_id)
+
+
+def _compile_catalog(catalog):
+    from tests.models import ReferenceRange
+
+    ranges = {}
+    for row in ReferenceRange.objects.values(
+        'parameter_id', 'sex', 'age_min_days', 'age_max_days', 'low', 'high',
+        'critical_low', 'critical_high', 'normal_text',
+    ):
+        ranges.setdefault(row['parameter_id'], []).append(row)
+
+    return {
+        parameter.id: compile_ranges(parameter, ranges.get(parameter.id, ()))
+        for test in catalog
+        for parameter in test.parameters
+    }
+
+
+def patient_demographics(gender, date_of_birth, received_date):
+    """(sex code, age in days or NaN) from a source's gender/date of birth and a receipt date."""
+    age = np.nan
+    if date_of_birth and received_date:
+        age = float((received_date - date_of_birth).days)
+    return SEX_CODES.get(gender, 0), age
+
+
+def get_demographics(assignment_ids):
+    """
+    Patient sex and age (at sample receipt) for assignments, in one query.
+
+    Returns:
+        Dictionary of assignment id to (sex code, age in days or NaN)
+    """
+    from tests.models import TestAssignment
+
+    rows = TestAssignment.objects.filter(id__in=list(assignment_ids)).values_list(
+        'id', 'sample__source_ref__gender', 'sample__source_ref__date_of_birth', 'sample__received_date'
+    )
+    return {row[0]: patient_demographics(*row[1:]) for row in rows}
+
+
+def flag_parameter_results(param_results, demographics=None):
+    """
+    Set flag and is_abnormal on ParameterResult instances in place.
+
+    Results are grouped by parameter and each group is flagged in one
+    vectorized pass. Nothing is saved.
+
+    Args:
+        param_results: Iterable of ParameterResult instances
+        demographics: Optional dictionary of TestResult id to
+                      (sex code, age in days); unknown patients get the
+                      ranges that apply to everyone
+    """
+    demographics = demographics or {}
+    by_parameter = {}
+    for param_result in param_results:
+        by_parameter.setdefault(param_result.parameter_id, []).append(param_result)
+
+    for parameter_id, group in by_parameter.items():
+        compiled = get_compiled_ranges(parameter_id)
+        if compiled is None:
+            continue
+        patients = [demographics.get(pr.test_result_id, (0, np.nan)) for pr in group]
+        flags = compiled.flag(
+            [np.nan if pr.value_numeric is None else float(pr.value_numeric) for pr in group],
+            [pr.value_text for pr in group],
+            [patient[0] for patient in patients],
+            [patient[1] for patient in patients],
+        )
+        for param_result, flag in zip(group, flags.tolist()):
+            param_result.flag = flag
+            param_result.is_abnormal = flag != FLAG_NORMAL
@@ -0,0 +1,138 @@
+"""Automatic technician assignment for unassigned tests."""
+import heapq
+from datetime import datetime, timezone as dt_timezone
+
+from django.db import transaction
+from django.db.models import Count
+
+
+# Lower rank is scheduled first.
+PRIORITY_RANK = {
+    'urgent': 0,
+    'high': 1,
+    'normal': 2,
+    'low': 3,
+}
+
+OPEN_STATUSES = ['assigned', 'in_progress']
+
+UPDATE_BATCH_SIZE = 500
+
+_FAR_FUTURE = datetime.max.replace(tzinfo=dt_timezone.utc)
+
+
+def _load_snapshot(technician_ids=None):
+    """
+    Load everything the scheduler needs in three queries.
+
+    Returns:
+        Tuple of (technician ids, {technician id: open load},
+        list of unassigned (id, deadline, expected_completion, priority) rows)
+    """
+    from tests.models import TestAssignment
+    from users.models import User
+
+    technicians = User.objects.filter(role__can_enter_results=True, is_active=True)
+    if technician_ids is not None:
+        technicians = technicians.filter(id__in=technician_ids)
+    technicians = list(technicians.values_list('id', flat=True))
+
+    load = dict.fromkeys(technicians, 0)
+    open_counts = TestAssignment.objects.filter(
+        assigned_to_id__in=technicians,
+        status__in=OPEN_STATUSES
+    ).values('assigned_to_id').annotate(count=Count('id')).order_by()
+    for row in open_counts:
+        load[row['assigned_to_id']] = row['count']
+
+    unassigned = list(
+        TestAssignment.objects.filter(
+            assigned_to__isnull=True,
+            status='assigned'
+        ).values_list('id', 'deadline', 'expected_completion', 'sample__priority')
+    )
+
+    return technicians, load, unassigned
+
+
+def _urgency_key(row):
+    """Sort key: sample priority first, then the earliest due time."""
+    assignment_id, deadline, expected_completion, priority = row
+    due = deadline or expected_completion or _FAR_FUTURE
+    return (PRIORITY_RANK.get(priority, PRIORITY_RANK['normal']), due, assignment_id)
+
+
+def plan_assignments(technicians, load, unassigned, max_load=None):
+    """
+    Distribute unassigned tests over technicians.
+
+    Tests are taken most-urgent first and each goes to the technician with
+    the smallest open load (a min-heap keyed on load), so the whole plan is
+    O(n log n + n log m) for n tests and m technicians.
+
+    Args:
+        technicians: List of technician ids
+        load: Dictionary of technician id to current open assignment count
+        unassigned: List of (id, deadline, expected_completion, priority) rows
+        max_load: Optional cap on open assignments per technician
+
+    Returns:
+        Dictionary of technician id to list of assignment ids
+    """
+    heap = [(load.get(tech_id, 0), tech_id) for tech_id in technicians]
+    heapq.heapify(heap)
+    plan = {}
+
+    for row in sorted(unassigned, key=_urgency_key):
+        if not heap:
+            break
+        tech_load, tech_id = heapq.heappop(heap)
+        if max_load is not None and tech_load >= max_load:
+            # The least-loaded technician is full, so everyone is.
+            break
+        plan.setdefault(tech_id, []).append(row[0])
+        heapq.heappush(heap, (tech_load + 1, tech_id))
+
+    return plan
+
+
+def auto_assign_tests(max_load=None, technician_ids=None, dry_run=False):
+    """
+    Assign every unassigned test to a technician who can enter results.
+
+    Writes are batched UPDATEs per technician that only touch rows still
+    unassigned, so a manual assignment made meanwhile is never overwritten.
+
+    Args:
+        max_load: Optional cap on open assignments per technician
+        technician_ids: Optional list restricting the technician pool
+        dry_run: Plan without writing anything
+
+    Returns:
+        Dictionary with the number assigned, the per-technician breakdown
+        and the number left unassigned
+    """
+    from tests.models import TestAssignment
+
+    technicians, load, unassigned = _load_snapshot(technician_ids)
+    plan = plan_assignments(technicians, load, unassigned, max_load=max_load)
+
+    assigned = {}
+    if dry_run:
+        assigned = {tech_id: len(ids) for tech_id, ids in plan.items()}
+    else:
+        with transaction.atomic():
+            for tech_id, assignment_ids in plan.items():
+                assigned[tech_id] = 0
+                for start in range(0, len(assignment_ids), UPDATE_BATCH_SIZE):
+                    assigned[tech_id] += TestAssignment.objects.filter(
+                        id__in=assignment_ids[start:start + UPDATE_BATCH_SIZE],
+                        assigned_to__isnull=True
+                    ).update(assigned_to_id=tech_id)
+
+    total_assigned = sum(assigned.values())
+    return {
+        'assigned': total_assigned,
+        'per_technician': assigned,
+        'unassigned_remaining': len(unassigned) - total_assigned,
+    }
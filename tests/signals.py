@@ -0,0 +1,29 @@
+"""Signal handlers for the tests app."""
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .catalog import bump_catalog_version
+from .models import Test, TestParameter, TestAssignment, ReferenceRange
+
+
+@receiver(post_save, sender=Test)
+@receiver(post_delete, sender=Test)
+@receiver(post_save, sender=TestParameter)
+@receiver(post_delete, sender=TestParameter)
+@receiver(post_save, sender=ReferenceRange)
+@receiver(post_delete, sender=ReferenceRange)
+def invalidate_test_catalog(sender, **kwargs):
+    """Bump the catalog version whenever a test, parameter or range changes."""
+    bump_catalog_version()
+
+
+@receiver(post_delete, sender=TestAssignment)
+def remove_assignment(sender, instance, **kwargs):
+    """Drop a deleted assignment from its test's queue and cost statistics."""
+    from .estimation import schedule_queue_refresh
+    schedule_queue_refresh(instance.test_id)
+    
+    cost_state = instance._cost_state()
+    if cost_state[1]:
+        from .utils import record_assignment_cost_change
+        record_assignment_cost_change(cost_state, (None, False, None))
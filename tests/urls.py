@@ -10,5 +10,6 @@ urlpatterns = [
     path('types/<int:pk>/edit/', views.test_type_edit, name='test_type_edit'),
     path('assign/', views.assign_test, name='assign_test'),
     path('workflow/', views.test_workflow, name='test_workflow'),
+    path('auto-assign/', views.auto_assign, name='auto_assign'),
     path('assignment/<int:pk>/update-status/', views.update_assignment_status, name='update_assignment_status'),
 ]
@@ -1,6 +1,8 @@
 """Utility functions for test cost management."""
 from decimal import Decimal
-from django.db.models import Sum, Avg
+from django.db import models, transaction
+from django.db.models import Sum, Count, Min, Max, F, Value
+from django.db.models.functions import Coalesce, Least, Greatest
 from django.utils import timezone
 
 
@@ -31,6 +33,9 @@ def record_reagent_usage(test_assignment, reagent, quantity_used, user=None, not
     """
     Record reagent usage for a test assignment.
     
+    Stock is decremented atomically through the inventory ledger; use
+    inventory.ledger.record_reagent_usages() to record many usages at once.
+    
     Args:
         test_assignment: TestAssignment instance
         reagent: Reagent instance
@@ -41,34 +46,16 @@ def record_reagent_usage(test_assignment, reagent, quantity_used, user=None, not
     Returns:
         ReagentUsage instance
     """
-    from tests.models import ReagentUsage
-    from inventory.models import InventoryTransaction
-    
-    # Create reagent usage record
-    usage = ReagentUsage.objects.create(
-        test_assignment=test_assignment,
-        reagent=reagent,
-        quantity_used=quantity_used,
-        used_by=user,
-        notes=notes
-    )
+    from inventory.ledger import ReagentUse, record_reagent_usages
     
-    # Create inventory transaction for stock reduction
-    transaction = InventoryTransaction.objects.create(
-        transaction_type='out',
-        reagent=reagent,
-        quantity=quantity_used,
-        unit_cost=reagent.unit_cost,
-        reason=f'Used for test {test_assignment.test.code} on sample {test_assignment.sample.sample_id}',
-        performed_by=user
+    usage, = record_reagent_usages(
+        [ReagentUse(test_assignment.id, reagent.id, quantity_used, notes)], user=user
     )
     
-    # Update reagent quantity
-    reagent.quantity -= Decimal(str(quantity_used))
-    reagent.save()
-    
-    # Recalculate test assignment cost
-    calculate_test_assignment_cost(test_assignment)
+    # Keep the caller's instances in step with the database.
+    reagent.refresh_from_db(fields=['quantity', 'updated_at'])
+    test_assignment.refresh_from_db(fields=['actual_cost'])
+    test_assignment._loaded_cost_state = test_assignment._cost_state()
     
     return usage
 
@@ -77,6 +64,9 @@ def get_test_cost_report(test, start_date=None, end_date=None):
     """
     Generate cost report for a specific test type.
     
+    Without a date range the report is read from the test's running
+    TestCostStatistics row; with a date range a single aggregate query is run.
+    
     Args:
         test: Test instance
         start_date: Optional start date
@@ -85,7 +75,11 @@ def get_test_cost_report(test, start_date=None, end_date=None):
     Returns:
         Dictionary with cost statistics
     """
-    from tests.models import TestAssignment
+    from tests.models import TestAssignment, TestCostStatistics
+    
+    if not start_date and not end_date:
+        stats = TestCostStatistics.objects.filter(test=test).first() or TestCostStatistics(test=test)
+        return _build_cost_report(test, stats, start_date, end_date)
     
     assignments = TestAssignment.objects.filter(test=test)
     
@@ -95,18 +89,36 @@ def get_test_cost_report(test, start_date=None, end_date=None):
         assignments = assignments.filter(assigned_date__lte=end_date)
     
     # Only completed tests
-    completed_assignments = assignments.filter(status='completed')
+    totals = assignments.filter(status='completed').aggregate(**_cost_aggregates())
+    stats = TestCostStatistics(test=test, **{k: v for k, v in totals.items() if v is not None})
     
-    total_tests = completed_assignments.count()
+    return _build_cost_report(test, stats, start_date, end_date)
+
+
+def get_all_test_cost_reports():
+    """
+    Generate cost reports for every active test from the running statistics.
     
-    # Calculate costs
-    total_actual_cost = completed_assignments.aggregate(
-        total=Sum('actual_cost')
-    )['total'] or Decimal('0.00')
+    Returns:
+        List of dictionaries with cost statistics, one per active test
+    """
+    from tests.models import Test, TestCostStatistics
+    
+    stats_by_test = {
+        stats.test_id: stats for stats in TestCostStatistics.objects.filter(test__is_active=True)
+    }
     
-    avg_cost_per_test = completed_assignments.aggregate(
-        avg=Avg('actual_cost')
-    )['avg'] or Decimal('0.00')
+    return [
+        _build_cost_report(test, stats_by_test.get(test.id) or TestCostStatistics(test=test))
+        for test in Test.objects.filter(is_active=True)
+    ]
+
+
+def _build_cost_report(test, stats, start_date=None, end_date=None):
+    """Turn a TestCostStatistics row (saved or not) into a cost report dict."""
+    total_tests = stats.completed_count
+    total_actual_cost = stats.total_cost or Decimal('0.00')
+    avg_cost_per_test = stats.mean_cost or Decimal('0.00')
     
     # Calculate estimated vs actual
     total_estimated = test.estimated_cost * total_tests if test.estimated_cost else Decimal('0.00')
@@ -124,6 +136,9 @@ def get_test_cost_report(test, start_date=None, end_date=None):
         'total_tests_completed': total_tests,
         'total_actual_cost': total_actual_cost,
         'average_cost_per_test': avg_cost_per_test,
+        'min_cost': stats.min_cost,
+        'max_cost': stats.max_cost,
+        'cost_std_dev': stats.std_dev,
         'estimated_cost_per_test': test.estimated_cost,
         'total_estimated_cost': total_estimated,
         'cost_variance': variance,
@@ -133,6 +148,121 @@ def get_test_cost_report(test, start_date=None, end_date=None):
     }
 
 
+def _cost_aggregates():
+    """Aggregates matching the TestCostStatistics fields."""
+    return {
+        'completed_count': Count('id'),
+        'cost_count': Count('actual_cost'),
+        'total_cost': Sum('actual_cost'),
+        'sum_of_squares': Sum(
+            F('actual_cost') * F('actual_cost'),
+            output_field=models.DecimalField(max_digits=28, decimal_places=4)
+        ),
+        'min_cost': Min('actual_cost'),
+        'max_cost': Max('actual_cost'),
+    }
+
+
+def recompute_test_cost_statistics(test_ids=None):
+    """
+    Rebuild TestCostStatistics from completed assignments.
+    
+    Uses one grouped aggregation over TestAssignment and writes the rows
+    back with bulk_create/bulk_update.
+    
+    Args:
+        test_ids: Optional iterable of Test ids to limit the rebuild to
+    
+    Returns:
+        Number of statistics rows written
+    """
+    from tests.models import Test, TestAssignment, TestCostStatistics
+    
+    assignments = TestAssignment.objects.filter(status='completed')
+    tests = Test.objects.all()
+    existing = TestCostStatistics.objects.all()
+    if test_ids is not None:
+        test_ids = list(test_ids)
+        assignments = assignments.filter(test_id__in=test_ids)
+        tests = tests.filter(id__in=test_ids)
+        existing = existing.filter(test_id__in=test_ids)
+    
+    totals_by_test = {
+        row.pop('test_id'): row
+        for row in assignments.values('test_id').annotate(**_cost_aggregates()).order_by()
+    }
+    existing = {stats.test_id: stats for stats in existing}
+    
+    to_create = []
+    to_update = []
+    for test_id in tests.values_list('id', flat=True):
+        totals = totals_by_test.get(test_id, {})
+        stats = existing.get(test_id) or TestCostStatistics(test_id=test_id)
+        stats.completed_count = totals.get('completed_count') or 0
+        stats.cost_count = totals.get('cost_count') or 0
+        stats.total_cost = totals.get('total_cost') or Decimal('0.00')
+        stats.sum_of_squares = totals.get('sum_of_squares') or Decimal('0.0000')
+        stats.min_cost = totals.get('min_cost')
+        stats.max_cost = totals.get('max_cost')
+        stats.updated_at = timezone.now()
+        (to_update if test_id in existing else to_create).append(stats)
+    
+    with transaction.atomic():
+        TestCostStatistics.objects.bulk_create(to_create)
+        TestCostStatistics.objects.bulk_update(to_update, [
+            'completed_count', 'cost_count', 'total_cost', 'sum_of_squares',
+            'min_cost', 'max_cost', 'updated_at',
+        ], batch_size=500)
+    
+    return len(to_create) + len(to_update)
+
+
+def record_assignment_cost_change(old_state, new_state):
+    """
+    Apply one assignment's change to the running cost statistics.
+    
+    States are (test_id, completed, actual_cost) tuples as produced by
+    TestAssignment._cost_state(). Additions are applied with F() updates;
+    removing a cost (which may have been the min or max) recomputes the
+    affected tests instead.
+    
+    Args:
+        old_state: State before the change
+        new_state: State after the change
+    """
+    from tests.models import TestCostStatistics
+    
+    old_test_id, old_completed, old_cost = old_state
+    new_test_id, new_completed, new_cost = new_state
+    
+    if old_completed and old_cost is not None:
+        recompute_test_cost_statistics(test_ids={old_test_id, new_test_id} - {None})
+        return
+    
+    with transaction.atomic():
+        if old_completed:
+            TestCostStatistics.objects.filter(test_id=old_test_id).update(
+                completed_count=F('completed_count') - 1
+            )
+        
+        if new_completed:
+            TestCostStatistics.objects.get_or_create(test_id=new_test_id)
+            updates = {'completed_count': F('completed_count') + 1, 'updated_at': timezone.now()}
+            if new_cost is not None:
+                cost = Decimal(str(new_cost)).quantize(Decimal('0.01'))
+                cost_value = Value(cost, output_field=models.DecimalField(max_digits=10, decimal_places=2))
+                updates.update(
+                    cost_count=F('cost_count') + 1,
+                    total_cost=F('total_cost') + cost_value,
+                    sum_of_squares=F('sum_of_squares') + Value(
+                        cost * cost, output_field=models.DecimalField(max_digits=28, decimal_places=4)
+                    ),
+                    min_cost=Least(Coalesce('min_cost', cost_value), cost_value),
+                    max_cost=Greatest(Coalesce('max_cost', cost_value), cost_value),
+                )
+            TestCostStatistics.objects.filter(test_id=new_test_id).update(**updates)
+
+
 def get_sample_total_cost(sample):
     """
     Calculate total cost for all tests on a sample.
@@ -256,28 +386,40 @@ def get_cost_per_sample_report(start_date=None, end_date=None):
     }
 
 
-def update_test_estimated_costs():
+def update_test_estimated_costs(recompute=False):
     """
     Update estimated costs for all tests based on historical actual costs.
     
+    Reads the running TestCostStatistics and writes all tests back with a
+    single bulk_update.
+    
+    Args:
+        recompute: Rebuild the statistics from assignments first
+    
     Returns:
         Number of tests updated
     """
-    from tests.models import Test, TestAssignment
-    
-    updated = 0
-    
-    for test in Test.objects.filter(is_active=True):
-        # Get average actual cost from completed test assignments
-        avg_cost = TestAssignment.objects.filter(
-            test=test,
-            status='completed',
-            actual_cost__isnull=False
-        ).aggregate(avg=Avg('actual_cost'))['avg']
-        
-        if avg_cost and avg_cost > 0:
-            test.estimated_cost = avg_cost
-            test.save()
-            updated += 1
-    
-    return updated
+    from tests.models import Test, TestCostStatistics
+    from tests.catalog import bump_catalog_version
+    
+    if recompute:
+        recompute_test_cost_statistics()
+    
+    tests = []
+    stats_rows = TestCostStatistics.objects.filter(
+        test__is_active=True,
+        cost_count__gt=0
+    ).select_related('test')
+    
+    for stats in stats_rows:
+        avg_cost = stats.mean_cost.quantize(Decimal('0.01'))
+        if avg_cost > 0:
+            stats.test.estimated_cost = avg_cost
+            stats.test.updated_at = timezone.now()
+            tests.append(stats.test)
+    
+    Test.objects.bulk_update(tests, ['estimated_cost', 'updated_at'], batch_size=500)
+    if tests:
+        bump_catalog_version()
+    
+    return len(tests)
@@ -3,6 +3,8 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.utils import timezone
 from .models import Test, TestParameter, TestAssignment
+from .catalog import get_catalog
+from .scheduler import auto_assign_tests
 from samples.models import Sample
 
 
@@ -29,11 +31,8 @@ def test_list(request):
 @login_required
 def test_type_list(request):
     """List all test types."""
-    tests = Test.objects.prefetch_related('parameters').filter(is_active=True)
-    
     category_filter = request.GET.get('category', '')
-    if category_filter:
-        tests = tests.filter(category=category_filter)
+    tests = get_catalog().active_tests(category=category_filter)
     
     context = {
         'tests': tests,
@@ -67,6 +66,7 @@ def test_type_create(request):
         param_names = request.POST.getlist('param_names[]')
         param_units = request.POST.getlist('param_units[]')
         param_ranges = request.POST.getlist('param_ranges[]')
+        param_codes = request.POST.getlist('param_codes[]')
         
         for i, name in enumerate(param_names):
             if name.strip():
@@ -74,6 +74,7 @@ def test_type_create(request):
                 TestParameter.objects.create(
                     test=test,
                     name=name,
+                    code=param_codes[i] if i < len(param_codes) else '',
                     unit=param_units[i] if i < len(param_units) else '',
                     reference_range_text=reference_range,
                     order=i
@@ -105,6 +106,7 @@ def test_type_edit(request, pk):
         param_names = request.POST.getlist('param_names[]')
         param_units = request.POST.getlist('param_units[]')
         param_ranges = request.POST.getlist('param_ranges[]')
+        param_codes = request.POST.getlist('param_codes[]')
         
         for i, name in enumerate(param_names):
             if name.strip():
@@ -112,6 +114,7 @@ def test_type_edit(request, pk):
                 TestParameter.objects.create(
                     test=test,
                     name=name,
+                    code=param_codes[i] if i < len(param_codes) else '',
                     unit=param_units[i] if i < len(param_units) else '',
                     reference_range_text=reference_range,
                     order=i
@@ -141,15 +144,18 @@ def assign_test(request):
         assigned_to_id = request.POST.get('assigned_to')
         
         sample = get_object_or_404(Sample, pk=sample_id)
+        catalog = get_catalog()
         
         for test_id in test_ids:
-            test = get_object_or_404(Test, pk=test_id)
+            test = catalog.get(int(test_id))
+            if test is None:
+                test = get_object_or_404(Test, pk=test_id)
             
             # Check if already assigned
-            if not TestAssignment.objects.filter(sample=sample, test=test).exists():
+            if not TestAssignment.objects.filter(sample=sample, test_id=test.id).exists():
                 TestAssignment.objects.create(
                     sample=sample,
-                    test=test,
+                    test_id=test.id,
                     assigned_to_id=assigned_to_id if assigned_to_id else None,
                     assigned_by=request.user
                 )
@@ -158,7 +164,7 @@ def assign_test(request):
         return redirect('samples:sample_detail', pk=sample.pk)
     
     samples = Sample.objects.filter(status__in=['registered', 'in_progress'])
-    tests = Test.objects.filter(is_active=True)
+    tests = get_catalog().active_tests()
     
     from users.models import User
     technicians = User.objects.filter(
@@ -214,3 +220,31 @@ def update_assignment_status(request, pk):
         return redirect('tests:test_workflow')
     
     return redirect('tests:test_list')
+
+
+@login_required
+def auto_assign(request):
+    """Distribute unassigned tests across technicians."""
+    if request.method == 'POST':
+        if not request.user.has_permission('can_assign_tests'):
+            messages.error(request, 'You do not have permission to assign tests.')
+            return redirect('tests:test_workflow')
+        
+        max_load = request.POST.get('max_load', '').strip()
+        if max_load and not max_load.isdigit():
+            messages.error(request, 'Maximum load must be a whole number.')
+            return redirect('tests:test_workflow')
+        summary = auto_assign_tests(max_load=int(max_load) if max_load else None)
+        
+        if summary['assigned']:
+            messages.success(
+                request,
+                f"{summary['assigned']} test(s) assigned across "
+                f"{len(summary['per_technician'])} technician(s)."
+            )
+        else:
+            messages.info(request, 'No tests were assigned.')
+        if summary['unassigned_remaining']:
+            messages.warning(request, f"{summary['unassigned_remaining']} test(s) remain unassigned.")
+    
+    return redirect('tests:test_workflow')